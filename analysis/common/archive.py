@@ -0,0 +1,267 @@
+"""
+Compressed, chunked archive of a CarDB (log_855.bin -> log_855.nfra).
+
+Every channel is cut into chunks of CHUNK_SNAPSHOTS snapshots, and every chunk
+is stored with whichever codec makes it smallest, then zlib-compressed:
+
+    rle    run lengths + run values      flags, states, LUT ids, constant channels
+    delta  zigzag deltas, narrowest int  counters, clocks, slowly varying ints
+    xor    float bits XOR the previous   slowly varying floats (sensors)
+    raw    the values themselves         anything else
+
+All codecs and the byte shuffle in front of zlib are whole-array numpy ops. The
+header keeps each chunk's time_since_startup range, so window() decodes only
+the chunks overlapping a time range.
+
+File layout: MAGIC, the JSON header length as a little-endian u64, the JSON
+header, then the chunk blobs.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import struct
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from analysis.common import derived
+from analysis.common.car_db import CarDB, car_snapshot_dtype, channel_paths
+from analysis.common.profiling import stage
+
+ARCHIVE_SUFFIX = ".nfra"
+MAGIC = b"NFRARCH1"
+CHUNK_SNAPSHOTS = 4096
+ZLIB_LEVEL = 6
+TIME_CHANNEL = "time.time_since_startup"
+
+_HEADER_LEN = struct.Struct("<Q")
+
+
+def archive_path(output_path: str) -> str:
+    """e.g. out/day/log_1.csv -> out/day/log_1.nfra"""
+    return os.path.splitext(output_path)[0] + ARCHIVE_SUFFIX
+
+
+# ——— Codecs ———
+def _shuffle(a: np.ndarray) -> bytes:
+    """Byte i of every value together, then byte i+1...: similar high bytes end up in long runs for zlib."""
+    return np.ascontiguousarray(a).view(np.uint8).reshape(-1, a.dtype.itemsize).T.tobytes()
+
+
+def _unshuffle(buf: bytes, dtype: np.dtype, n: int) -> np.ndarray:
+    return np.frombuffer(buf, np.uint8).reshape(dtype.itemsize, n).T.copy().view(dtype).reshape(n)
+
+
+def _uint_view(dtype: np.dtype) -> np.dtype:
+    return np.dtype(f"<u{dtype.itemsize}")
+
+
+def _bits(a: np.ndarray) -> np.ndarray:
+    """Floats compared bit for bit, so -0.0 and 0.0 (or NaN payloads) never merge into one run."""
+    return a.view(_uint_view(a.dtype)) if a.dtype.kind == "f" else a
+
+
+def _encode_rle(a: np.ndarray) -> bytes:
+    bits = _bits(a)
+    starts = np.flatnonzero(bits[1:] != bits[:-1]) + 1
+    starts = np.concatenate([[0], starts])
+    lengths = np.diff(np.append(starts, len(a))).astype("<u4")
+    return struct.pack("<I", len(starts)) + _shuffle(lengths) + _shuffle(a[starts])
+
+
+def _decode_rle(buf: bytes, dtype: np.dtype, n: int) -> np.ndarray:
+    (runs,) = struct.unpack_from("<I", buf)
+    lengths = _unshuffle(buf[4 : 4 + 4 * runs], np.dtype("<u4"), runs)
+    values = _unshuffle(buf[4 + 4 * runs :], dtype, runs)
+    return np.repeat(values, lengths)
+
+
+def _encode_delta(a: np.ndarray) -> bytes:
+    d = np.diff(a.astype(np.int64), prepend=np.int64(0))  # the first delta is the first value
+    z = ((d << 1) ^ (d >> 63)).view(np.uint64)  # zigzag: small magnitudes -> small unsigned
+    width = next(w for w in (1, 2, 4, 8) if int(z.max(initial=0)) < 1 << (8 * w))
+    return bytes([width]) + _shuffle(z.astype(f"<u{width}"))
+
+
+def _decode_delta(buf: bytes, dtype: np.dtype, n: int) -> np.ndarray:
+    z = _unshuffle(buf[1:], np.dtype(f"<u{buf[0]}"), n).astype(np.uint64)
+    d = (z >> np.uint64(1)).view(np.int64) ^ -(z & np.uint64(1)).view(np.int64)
+    return np.cumsum(d).astype(dtype)
+
+
+def _encode_xor(a: np.ndarray) -> bytes:
+    bits = np.ascontiguousarray(a).view(_uint_view(a.dtype))
+    return _shuffle(bits ^ np.concatenate([bits[:1] * 0, bits[:-1]]))
+
+
+def _decode_xor(buf: bytes, dtype: np.dtype, n: int) -> np.ndarray:
+    x = _unshuffle(buf, _uint_view(dtype), n)
+    return np.bitwise_xor.accumulate(x).view(dtype)
+
+
+def _encode_raw(a: np.ndarray) -> bytes:
+    return _shuffle(a)
+
+
+def _decode_raw(buf: bytes, dtype: np.dtype, n: int) -> np.ndarray:
+    return _unshuffle(buf, dtype, n)
+
+
+CODECS = {
+    "rle": (_encode_rle, _decode_rle),
+    "delta": (_encode_delta, _decode_delta),
+    "xor": (_encode_xor, _decode_xor),
+    "raw": (_encode_raw, _decode_raw),
+}
+
+
+def candidate_codecs(dtype: np.dtype) -> Tuple[str, ...]:
+    if dtype.kind == "b":
+        return ("rle",)
+    if dtype.kind in "iu" and dtype.itemsize <= 4:
+        return ("rle", "delta")
+    if dtype.kind == "f":
+        return ("rle", "xor")
+    return ("rle", "raw")
+
+
+def encode_chunk(a: np.ndarray, level: int = ZLIB_LEVEL) -> Tuple[str, bytes]:
+    """(codec, compressed blob) of the smallest candidate codec for this chunk."""
+    if len(a) and not np.any(_bits(a) != _bits(a)[0]):
+        codecs = ("rle",)  # constant: one run
+    else:
+        codecs = candidate_codecs(a.dtype)
+    return min(((c, zlib.compress(CODECS[c][0](a), level)) for c in codecs), key=lambda cb: len(cb[1]))
+
+
+def decode_chunk(codec: str, blob: bytes, dtype: np.dtype, n: int) -> np.ndarray:
+    return CODECS[codec][1](zlib.decompress(blob), dtype, n)
+
+
+# ——— Writing ———
+def _time_ranges(times: np.ndarray, chunk: int) -> List[List[int]]:
+    return [[int(times[a : a + chunk].min()), int(times[a : a + chunk].max())] for a in range(0, len(times), chunk)]
+
+
+def save_archive(
+    db: CarDB, path: str, channels: Optional[List[str]] = None, chunk: int = CHUNK_SNAPSHOTS, level: int = ZLIB_LEVEL
+) -> None:
+    """Write the raw channels of db (default: all of them) as an archive."""
+    channels = channel_paths() if channels is None else channels
+    if chunk <= 0:
+        raise ValueError(f"chunk must be positive, got {chunk}")
+    n = len(db)
+    header = {"n": n, "chunk": chunk, "time": _time_ranges(db.channel(TIME_CHANNEL), chunk) if n else [], "channels": {}}
+    blobs: List[bytes] = []
+    offset = 0
+    with stage("archive encode", records=n) as span:
+        for p in channels:
+            col = np.ascontiguousarray(db.channel(p))
+            entries = []
+            for a in range(0, n, chunk):
+                codec, blob = encode_chunk(col[a : a + chunk], level)
+                entries.append([codec, offset, len(blob)])
+                blobs.append(blob)
+                offset += len(blob)
+            header["channels"][p] = {"dtype": col.dtype.str, "chunks": entries}
+
+        raw_header = json.dumps(header, separators=(",", ":")).encode()
+        with open(path, "wb") as f:
+            f.write(MAGIC)
+            f.write(_HEADER_LEN.pack(len(raw_header)))
+            f.write(raw_header)
+            for blob in blobs:
+                f.write(blob)
+        span.bytes = os.path.getsize(path)
+
+
+# ——— Reading ———
+class ArchiveReader:
+    """
+    Lazily decoding view of an archive. Offers the same channel(path) / len()
+    interface as CarDB and ColumnStore; window() reads a time range.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._f = open(path, "rb")
+        if self._f.read(len(MAGIC)) != MAGIC:
+            self._f.close()
+            raise ValueError(f"{path}: not a CarDB archive")
+        (length,) = _HEADER_LEN.unpack(self._f.read(_HEADER_LEN.size))
+        self._header = json.loads(self._f.read(length))
+        self._data_start = len(MAGIC) + _HEADER_LEN.size + length
+        self._n = self._header["n"]
+        self.chunk = self._header["chunk"]
+        self._cache: Dict[str, np.ndarray] = {}
+
+    def __len__(self):
+        return self._n
+
+    def close(self) -> None:
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def n_chunks(self) -> int:
+        return len(self._header["time"])
+
+    def channels(self) -> List[str]:
+        return list(self._header["channels"])
+
+    def codecs(self, path: str) -> List[str]:
+        return [c for c, _, _ in self._header["channels"][path]["chunks"]]
+
+    def _chunk(self, path: str, i: int) -> np.ndarray:
+        meta = self._header["channels"][path]
+        codec, offset, length = meta["chunks"][i]
+        self._f.seek(self._data_start + offset)
+        n = min(self.chunk, self._n - i * self.chunk)
+        return decode_chunk(codec, self._f.read(length), np.dtype(meta["dtype"]), n)
+
+    def _decode(self, path: str, chunks: Iterable[int]) -> np.ndarray:
+        if path not in self._header["channels"]:
+            raise KeyError(f"Unknown channel '{path}'")
+        parts = [self._chunk(path, i) for i in chunks]
+        if parts:
+            return np.concatenate(parts)
+        return np.empty(0, np.dtype(self._header["channels"][path]["dtype"]))
+
+    def channel(self, path: str) -> np.ndarray:
+        col = self._cache.get(path)
+        if col is None:
+            if path in self._header["channels"]:
+                col = self._decode(path, range(self.n_chunks))
+            elif derived.is_derived(path):
+                col = derived.compute(path, self.channel)
+            else:
+                raise KeyError(f"Unknown channel '{path}'")
+            self._cache[path] = col
+        return col
+
+    def chunks_between(self, start_ms: float, end_ms: float) -> List[int]:
+        """Chunks holding any snapshot with start_ms <= time_since_startup <= end_ms."""
+        return [i for i, (lo, hi) in enumerate(self._header["time"]) if hi >= start_ms and lo <= end_ms]
+
+    def window(self, paths: List[str], start_ms: float, end_ms: float) -> Dict[str, np.ndarray]:
+        """The snapshots of each raw channel whose time_since_startup is in [start_ms, end_ms], decoding only those chunks."""
+        chunks = self.chunks_between(start_ms, end_ms)
+        times = self._decode(TIME_CHANNEL, chunks)
+        keep = (times >= start_ms) & (times <= end_ms)
+        return {p: (times if p == TIME_CHANNEL else self._decode(p, chunks))[keep] for p in paths}
+
+    def to_db(self) -> CarDB:
+        """Every archived channel decoded back into a CarDB (channels not in the archive stay zero)."""
+        with stage("archive decode", records=self._n, bytes=os.path.getsize(self.path)):
+            db = CarDB.from_array(np.zeros(self._n, dtype=car_snapshot_dtype))
+            for p in self.channels():
+                db.channel(p)[:] = self.channel(p)
+        return db
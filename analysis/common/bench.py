@@ -0,0 +1,221 @@
+"""
+Benchmark harness for the pipeline stages (see daq.py bench).
+
+A stage is a function returning (records, bytes) it processed, plus an optional
+untimed setup run before every call. measure() reports the best wall time of a
+few runs, more for stages short enough that a best of three is still mostly
+scheduler noise (with stdout silenced, so progress printing doesn't swamp the report),
+then repeats one run under tracemalloc for the peak of Python and numpy
+allocations. Results are saved as JSON and compared against a stored baseline:
+a stage that got slower by more than the threshold is a regression.
+
+Raw timings don't transfer between machines, or even between quiet and busy
+moments on one machine, so a fixed calibration workload (calibrate()) is timed
+before, between and after a stage's runs, and the stage records the median.
+compare() scales the baseline time up by the ratio of the two calibration times,
+clamped to SCALE_LIMITS, before applying the threshold.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+THRESHOLD = 0.25  # fractional slowdown that counts as a regression
+NOISE_S = 0.005  # absolute slowdowns below this are timer noise
+CALIBRATION_N = 1_000_000  # size of the calibration workload (about 120 ms)
+# Calibration ratios are clamped to these. Below 1 a lucky calibration would lower the expected
+# time, and calibration noise alone must never turn an unchanged stage into a regression.
+SCALE_LIMITS = (1.0, 2.0)
+MIN_MEASURE_S = 0.5  # short stages are repeated until their timed runs add up to this
+MAX_REPEAT = 100
+
+
+@dataclass
+class StageResult:
+    name: str
+    seconds: float  # best wall time
+    cpu_seconds: float  # CPU time of that run
+    records: int
+    bytes: int
+    peak_rss_mb: float  # process high-water mark after the stage
+    alloc_peak_mb: float  # peak traced allocations during one run
+    error: Optional[str] = None
+    calibration_s: float = 0.0  # median calibrate() time around the runs (0: not measured)
+
+    @property
+    def records_per_s(self) -> float:
+        return self.records / self.seconds if self.seconds > 0 else 0.0
+
+    @property
+    def mb_per_s(self) -> float:
+        return self.bytes / 1e6 / self.seconds if self.seconds > 0 else 0.0
+
+    def to_dict(self) -> dict:
+        out = asdict(self)
+        out["records_per_s"] = self.records_per_s
+        out["mb_per_s"] = self.mb_per_s
+        return out
+
+
+def _peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1e6 if sys.platform == "darwin" else rss / 1e3  # bytes on macOS, KiB elsewhere
+
+
+def calibrate() -> float:
+    """
+    Wall time of a fixed mix of the two things the stages spend time on: building
+    small strings, dicts and lists in Python (as the parsers and mappers do), and numpy work.
+    """
+    t0 = time.perf_counter()
+    groups: Dict[str, list] = {}
+    for i in range(CALIBRATION_N // 8):
+        key = f"signal_{i % 5000}.{i}"
+        groups.setdefault(key.split(".")[0], []).append({"index": i, "name": key})
+    x = np.sin(np.arange(CALIBRATION_N, dtype=np.float64))
+    np.sort(x)
+    np.cumsum(x * x)
+    return time.perf_counter() - t0
+
+
+@contextlib.contextmanager
+def _quiet():
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def measure(
+    name: str,
+    fn: Callable[[], Tuple[int, int]],
+    setup: Optional[Callable[[], None]] = None,
+    repeat: int = 3,
+    min_seconds: float = MIN_MEASURE_S,
+) -> StageResult:
+    """
+    Time fn() `repeat` times, or more (up to MAX_REPEAT) until the timed runs add up
+    to min_seconds; the best run wins. calibrate() runs before each of the first
+    `repeat` runs and after the last, and their median is recorded, so it sees the
+    same load as the stage. Then fn() runs once more under tracemalloc.
+    """
+    best = cpu = np.inf
+    records = nbytes = 0
+    calibrations = []
+    try:
+        runs, spent = 0, 0.0
+        while runs < max(repeat, 1) or (spent < min_seconds and runs < MAX_REPEAT):
+            if runs < max(repeat, 1):
+                calibrations.append(calibrate())
+            with _quiet():
+                if setup is not None:
+                    setup()
+                t0, c0 = time.perf_counter(), time.process_time()
+                records, nbytes = fn()
+                wall, used = time.perf_counter() - t0, time.process_time() - c0
+            runs, spent = runs + 1, spent + wall
+            if wall < best:
+                best, cpu = wall, used
+        calibrations.append(calibrate())
+
+        with _quiet():
+            if setup is not None:
+                setup()
+            tracemalloc.start()
+            try:
+                fn()
+                alloc_peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+    except Exception as e:
+        return StageResult(name, 0.0, 0.0, 0, 0, _peak_rss_mb(), 0.0, error=f"{type(e).__name__}: {e}")
+    calibration = float(np.median(calibrations))
+    return StageResult(name, best, cpu, records, nbytes, _peak_rss_mb(), alloc_peak / 1e6, calibration_s=calibration)
+
+
+def results_json(results: List[StageResult]) -> dict:
+    return {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": f"{platform.system()} {platform.machine()}",
+        },
+        "stages": {r.name: r.to_dict() for r in results},
+    }
+
+
+def save_results(results: List[StageResult], path: str) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(results_json(results), f, indent=2)
+        f.write("\n")
+
+
+def load_results(path: str) -> Dict[str, dict]:
+    """The stages of a saved results file, by name."""
+    with open(path) as f:
+        return json.load(f)["stages"]
+
+
+def expected_seconds(result: StageResult, base: dict) -> float:
+    """
+    The baseline time of a stage scaled to the speed of the machine result ran on,
+    within SCALE_LIMITS: only ever raised, by at most 2x (unscaled without calibrations).
+    """
+    if result.calibration_s > 0 and base.get("calibration_s", 0) > 0:
+        scale = min(max(result.calibration_s / base["calibration_s"], SCALE_LIMITS[0]), SCALE_LIMITS[1])
+        return base["seconds"] * scale
+    return base["seconds"]
+
+
+def compare(results: List[StageResult], baseline: Dict[str, dict], threshold: float = THRESHOLD) -> List[str]:
+    """
+    Regressions of results against baseline, one message per stage that became
+    slower than (1 + threshold) x its baseline time (see expected_seconds), or
+    that fails but did not before. Stages missing from the baseline are not compared.
+    """
+    regressions = []
+    for r in results:
+        base = baseline.get(r.name)
+        if base is None:
+            continue
+        if r.error is not None:
+            if base.get("error") is None:
+                regressions.append(f"{r.name}: now fails ({r.error})")
+            continue
+        if base.get("error") is not None:
+            continue
+        expected = expected_seconds(r, base)
+        if r.seconds > expected * (1 + threshold) and r.seconds - expected > NOISE_S:
+            regressions.append(
+                f"{r.name}: {r.seconds * 1000:.1f} ms vs baseline {base['seconds'] * 1000:.1f} ms, "
+                f"{expected * 1000:.1f} ms at this machine's speed ({r.seconds / expected:.2f}x, limit {1 + threshold:.2f}x)"
+            )
+    return regressions
+
+
+def format_table(results: List[StageResult], baseline: Optional[Dict[str, dict]] = None) -> str:
+    header = f"{'stage':<28} {'time':>10} {'records/s':>12} {'MB/s':>9} {'RSS MB':>8} {'alloc MB':>9} {'vs base':>8}"
+    lines = [header, "-" * len(header)]
+    for r in results:
+        if r.error is not None:
+            lines.append(f"{r.name:<28} failed: {r.error}")
+            continue
+        base = (baseline or {}).get(r.name)
+        ratio = f"{r.seconds / expected_seconds(r, base):.2f}x" if base and not base.get("error") and base["seconds"] > 0 else "-"
+        lines.append(
+            f"{r.name:<28} {r.seconds * 1000:>8.1f}ms {r.records_per_s:>12,.0f} {r.mb_per_s:>9.1f} "
+            f"{r.peak_rss_mb:>8.0f} {r.alloc_peak_mb:>9.1f} {ratio:>8}"
+        )
+    return "\n".join(lines)
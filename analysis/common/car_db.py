@@ -1,7 +1,13 @@
 import numpy as np
 import csv
+import os
 from dataclasses import dataclass
-from typing import List
+from typing import Dict, List, Optional, Tuple
+
+from analysis.common import derived
+from analysis.common.laps import MIN_LAP_S, LapIndex
+from analysis.common.time_index import CLOCKS, TimeIndex
+from analysis.common.profiling import stage
 
 # ——— Constants ———
 BMS_TEMP_VOLTAGE_COUNT = 140
@@ -279,10 +285,86 @@ car_snapshot_dtype = np.dtype(
 )
 
 
+# ——— Channel paths ———
+# A channel is one scalar leaf of car_snapshot_dtype, addressed with the same dotted
+# syntax the telem mappings use, e.g. "corners[0].wheel_speed" or "bms.cell_temps[12]".
+
+
+def parse_channel_path(path: str) -> List[Tuple[str, Optional[int]]]:
+    """Split "corners[0].wheel_speed" into [("corners", 0), ("wheel_speed", None)]."""
+    parts = []
+    for segment in path.split("."):
+        if "[" in segment:
+            base, idx = segment[:-1].split("[")
+            parts.append((base, int(idx)))
+        else:
+            parts.append((segment, None))
+    return parts
+
+
+def _walk_channels(dtype: np.dtype, path: str, column: str, out: Dict[str, str], lists: bool = False):
+    for name in dtype.names:
+        sub = dtype.fields[name][0]
+        sub_path = f"{path}.{name}" if path else name
+        sub_col = f"{column}_{name}" if column else name
+        if sub.subdtype is not None:
+            base, shape = sub.subdtype
+            if lists and base.names is None:
+                out[sub_path] = sub_col  # the whole (n, k) block as one channel
+                continue
+            for i in range(shape[0]):
+                if base.names is not None:
+                    # arrays of structs flatten like to_csv: corners0_wheel_speed
+                    _walk_channels(base, f"{sub_path}[{i}]", f"{sub_col}{i}", out, lists)
+                else:
+                    out[f"{sub_path}[{i}]"] = f"{sub_col}_{i}"
+        elif sub.names is not None:
+            _walk_channels(sub, sub_path, sub_col, out, lists)
+        else:
+            out[sub_path] = sub_col
+
+
+def channel_columns(dtype: np.dtype = car_snapshot_dtype, lists: bool = False) -> Dict[str, str]:
+    """
+    Every scalar leaf channel of dtype, in dtype order, mapped to its flattened
+    CSV column name (e.g. "corners[0].wheel_speed" -> "corners0_wheel_speed").
+    With lists=True, arrays of scalars are one channel each instead
+    ("bms.cell_voltages" -> "bms_cell_voltages").
+    """
+    out: Dict[str, str] = {}
+    _walk_channels(dtype, "", "", out, lists)
+    return out
+
+
+def channel_paths(dtype: np.dtype = car_snapshot_dtype) -> List[str]:
+    """Dotted paths of every scalar leaf channel, in dtype order."""
+    return list(channel_columns(dtype))
+
+
+def all_channel_paths() -> List[str]:
+    """Every raw channel followed by every derived channel (see analysis.common.derived)."""
+    return channel_paths() + derived.derived_paths()
+
+
 class CarDB:
     def __init__(self, n_snapshots: int):
         print(f"Creating database with {n_snapshots} snapshots!")
         self._db = np.zeros(n_snapshots, dtype=car_snapshot_dtype)
+        self._time_indexes: Dict[str, TimeIndex] = {}
+        self._derived: Dict[str, np.ndarray] = {}  # memoized derived channels
+        self.laps: Optional[LapIndex] = None  # see detect_laps()
+
+    @classmethod
+    def from_array(cls, records: np.ndarray) -> "CarDB":
+        """Wrap an existing car_snapshot_dtype array without copying it."""
+        if records.dtype != car_snapshot_dtype:
+            raise ValueError("CarDB.from_array needs an array of car_snapshot_dtype")
+        db = cls.__new__(cls)
+        db._db = records
+        db._time_indexes = {}
+        db._derived = {}
+        db.laps = None
+        return db
 
     def __len__(self):
         return len(self._db)
@@ -290,6 +372,140 @@ class CarDB:
     def raw_record(self, idx: int) -> np.void:
         return self._db[idx]
 
+    def channel(self, path: str) -> np.ndarray:
+        """
+        Zero-copy view of one channel across all snapshots, e.g.
+        db.channel("corners[0].wheel_speed") or db.channel("bms.cell_temps").
+        Derived channels (e.g. "inverter.power_kw") are computed on first access,
+        memoized and returned read-only.
+        """
+        if derived.is_derived(path):
+            col = self._derived.get(path)
+            if col is None:
+                col = self._derived[path] = derived.compute(path, self.channel)
+            return col
+        view = self._db
+        for name, idx in parse_channel_path(path):
+            try:
+                view = view[name]
+            except (KeyError, ValueError):
+                raise KeyError(f"Unknown channel '{path}'")
+            if idx is not None:
+                view = view[:, idx]
+        return view
+
+    # ——— Time lookups ———
+    def time_index(self, clock: str = "startup") -> TimeIndex:
+        """
+        The sorted index of one clock ("startup" or "unix", both in ms), built on
+        first use, so call it only once the log has been filled in.
+        """
+        if clock not in CLOCKS:
+            raise ValueError(f"Unknown clock '{clock}', expected one of {', '.join(CLOCKS)}")
+        index = self._time_indexes.get(clock)
+        if index is None:
+            if clock == "startup":
+                index = TimeIndex.from_startup(self.channel(CLOCKS["startup"]))
+            else:
+                index = TimeIndex.from_unix(self.channel(CLOCKS["unix"]), self.time_index("startup"))
+            self._time_indexes[clock] = index
+        return index
+
+    def time_slice(self, start_ms: Optional[float] = None, end_ms: Optional[float] = None, clock: str = "startup") -> "CarDB":
+        """Zero-copy CarDB of the snapshots with start_ms <= t < end_ms on the given clock."""
+        return self._view(self.time_index(clock).slice(start_ms, end_ms))
+
+    def _view(self, s: slice) -> "CarDB":
+        """Zero-copy CarDB of snapshots s, sharing whatever was already indexed or derived."""
+        view = CarDB.from_array(self._db[s])
+        view._time_indexes = {c: i.subset(s) for c, i in self._time_indexes.items()}
+        view._derived = {p: col[s] for p, col in self._derived.items()}
+        return view
+
+    # ——— Laps ———
+    def detect_laps(self, gate, sectors=(), min_lap_s: float = MIN_LAP_S) -> LapIndex:
+        """
+        Split the log into laps at the start/finish gate (a laps.Gate) and keep the
+        resulting LapIndex in db.laps. A stored index can be assigned to db.laps instead.
+        """
+        self.laps = LapIndex.build(self, gate, sectors, min_lap_s)
+        return self.laps
+
+    def lap(self, n: int) -> "CarDB":
+        """Zero-copy CarDB of lap n (0 = out-lap, 1.. = complete laps)."""
+        if self.laps is None:
+            raise ValueError("No lap index; call detect_laps() or assign a stored LapIndex to db.laps")
+        if self.laps.n_snapshots != len(self):
+            raise ValueError("The lap index was built for a different log")
+        return self._view(self.laps.lap_range(n))
+
+    def at(self, t, clock: str = "startup"):
+        """The snapshot(s) current at time t (ms on the given clock): the last one at or before t."""
+        return self._db[self.time_index(clock).index_at(t)]
+
+    def resample(self, rate_hz: float, method: str = "hold", clock: str = "startup") -> "CarDB":
+        """
+        A new CarDB on a uniform rate_hz grid of the given clock. method is "hold",
+        "linear" or "mean"; see analysis.common.resample for the details.
+        """
+        from analysis.common.resample import resample  # resample builds on CarDB
+
+        return resample(self, rate_hz, method, clock)
+
+    @staticmethod
+    def concat(dbs, names: Optional[List[str]] = None):
+        """
+        Several logs of one session as a single timeline, without copying
+        (a SessionDB, see analysis.common.session).
+        """
+        from analysis.common.session import SessionDB  # the session is built on top of CarDB
+
+        return SessionDB(dbs, names)
+
+    # ——— Arrow / pandas ———
+    def to_arrow(self, columns: Optional[List[str]] = None, lists: bool = False):
+        """
+        The channels as a pyarrow.Table with the to_csv column names (default: all
+        raw channels). lists=True keeps arrays like bms.cell_voltages as one
+        fixed-size list column. See analysis.common.frames for what gets copied.
+        """
+        from analysis.common.frames import to_arrow  # pyarrow is only needed here
+
+        return to_arrow(self, columns, lists)
+
+    def to_dataframe(self, columns: Optional[List[str]] = None):
+        """The channels as a pandas.DataFrame with the to_csv column names, over the channel views (no copy)."""
+        from analysis.common.frames import to_dataframe
+
+        return to_dataframe(self, columns)
+
+    # ——— Sharing between processes ———
+    def to_shared(self, name: Optional[str] = None):
+        """
+        Copy the records into a new shared memory block that other processes can
+        attach() to by name (a SharedCarDB owned by this process, see analysis.common.shared).
+        """
+        from analysis.common.shared import SharedCarDB  # shared memory is built on top of CarDB
+
+        return SharedCarDB.create(self, name)
+
+    @staticmethod
+    def attach(name: str, writable: bool = False):
+        """Map a block published with to_shared(), read-only by default (a SharedCarDB to close() when done)."""
+        from analysis.common.shared import SharedCarDB
+
+        return SharedCarDB.attach(name, writable)
+
+    # ——— Compact storage ———
+    def to_compact(self, scales):
+        """
+        A CompactCarDB of the same snapshots, with the channels in scales stored as
+        raw integers (see analysis.common.compact, e.g. scales_for_log(path)).
+        """
+        from analysis.common.compact import CompactCarDB
+
+        return CompactCarDB.from_db(self, scales)
+
     def get_snapshot(self, idx: int) -> CarSnapshot:
         # Convert raw numpy record to CarSnapshot instance
         rec = self._db[idx]
@@ -317,54 +533,60 @@ class CarDB:
         ecu = ECUData(**{k: rec["ecu"][k] for k in rec["ecu"].dtype.names})
         return CarSnapshot(time, corners, dynamics, bms, pdm, inverter, ecu)
 
-    def to_csv(self, path: str) -> None:
+    def to_csv(self, path: str, append: bool = False) -> None:
         """
         Flatten all snapshots into a CSV file.  Arrays and nested structs
         become separate columns (e.g. corners0_wheel_speed, dynamics_imu_accel_2, ...).
+        With append=True the rows are added to an existing file (header written only once).
         """
-        rows = []
-        for rec in self._db:  # for each record,
-            flat = {}  # just a dictionary with key(the col) = value(data)
-            for name in rec.dtype.names:
-                val = rec[name]  # get the values
-                # nested structured dtype
-                if val.dtype.fields is not None:
-
-                    def flatten_struct(v, prefix):  # flatten the subfields
-                        d = {}
-                        for fn in v.dtype.names:  # iterate through the names
-                            v2 = v[fn]  # get val
-                            if isinstance(v2, np.ndarray):
-                                for i, x in enumerate(v2.tolist()):
-                                    d[f"{prefix}_{fn}_{i}"] = x
-                            else:
-                                d[f"{prefix}_{fn}"] = (
-                                    v2.item() if hasattr(v2, "item") else v2
-                                )
-                        return d  # returns dict with flatten data of that sub field
-
-                    if isinstance(val, np.ndarray):
-                        for j, sub in enumerate(val):
-                            flat.update(flatten_struct(sub, f"{name}{j}"))
-                    else:
-                        flat.update(flatten_struct(val, name))
-
-                # plain numpy array or scalar
-                else:
-                    if isinstance(val, np.ndarray):
-                        for i, x in enumerate(val.tolist()):
-                            flat[f"{name}_{i}"] = x
+        start = os.path.getsize(path) if append and os.path.exists(path) else 0
+        with stage("to_csv", records=len(self)) as span:
+            rows = []
+            for rec in self._db:  # for each record,
+                flat = {}  # just a dictionary with key(the col) = value(data)
+                for name in rec.dtype.names:
+                    val = rec[name]  # get the values
+                    # nested structured dtype
+                    if val.dtype.fields is not None:
+
+                        def flatten_struct(v, prefix):  # flatten the subfields
+                            d = {}
+                            for fn in v.dtype.names:  # iterate through the names
+                                v2 = v[fn]  # get val
+                                if isinstance(v2, np.ndarray):
+                                    for i, x in enumerate(v2.tolist()):
+                                        d[f"{prefix}_{fn}_{i}"] = x
+                                else:
+                                    d[f"{prefix}_{fn}"] = (
+                                        v2.item() if hasattr(v2, "item") else v2
+                                    )
+                            return d  # returns dict with flatten data of that sub field
+
+                        if isinstance(val, np.ndarray):
+                            for j, sub in enumerate(val):
+                                flat.update(flatten_struct(sub, f"{name}{j}"))
+                        else:
+                            flat.update(flatten_struct(val, name))
+
+                    # plain numpy array or scalar
                     else:
-                        flat[name] = val.item() if hasattr(val, "item") else val
-
-            rows.append(flat)  # add the flattened data to the row
-
-        # write CSV
-        if rows:
-            fieldnames = sorted(rows[0].keys())
-            with open(path, "w", newline="") as csvfile:
-                writer = csv.DictWriter(
-                    csvfile, fieldnames=fieldnames
-                )  # adds the row to the csv file
-                writer.writeheader()
-                writer.writerows(rows)
+                        if isinstance(val, np.ndarray):
+                            for i, x in enumerate(val.tolist()):
+                                flat[f"{name}_{i}"] = x
+                        else:
+                            flat[name] = val.item() if hasattr(val, "item") else val
+
+                rows.append(flat)  # add the flattened data to the row
+
+            # write CSV
+            if rows:
+                fieldnames = sorted(rows[0].keys())
+                new_file = not append or not os.path.exists(path) or os.path.getsize(path) == 0
+                with open(path, "w" if new_file else "a", newline="") as csvfile:
+                    writer = csv.DictWriter(
+                        csvfile, fieldnames=fieldnames
+                    )  # adds the row to the csv file
+                    if new_file:
+                        writer.writeheader()
+                    writer.writerows(rows)
+            span.bytes = os.path.getsize(path) - start if rows else 0
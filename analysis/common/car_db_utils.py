@@ -2,6 +2,7 @@
 
 from analysis.common.car_db import CarDB
 from analysis.common.car_db import car_snapshot_dtype
+from analysis.common.profiling import stage
 
 import os
 import csv
@@ -59,7 +60,7 @@ def csv_to_db(csvfilepath: str):
     db = CarDB(entries)#init DB iwth the number of snapshots
 
     #read in the csv line by line
-    with open(csvfilepath, 'r') as csvfile:#open csv file and read it in
+    with stage("csv_to_db", bytes=os.path.getsize(csvfilepath), records=entries), open(csvfilepath, 'r') as csvfile:#open csv file and read it in
         reader = csv.reader(csvfile)
         header = next(reader)  # Read the header row
         #print(f"Header: {header}")#the columns
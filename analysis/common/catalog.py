@@ -0,0 +1,287 @@
+"""
+Drive-day catalog: one SQLite row per transformed log.
+
+The catalog lives in the output root (out/catalog.sqlite) and is kept up to date
+by `daq.py transform`, so tools and the app can find logs and answer metadata
+questions ("which 2025-6-10 logs are longer than 5 minutes?") without walking
+directories or opening any log.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import time
+from dataclasses import dataclass, fields
+from typing import List, Optional
+
+import numpy as np
+
+from analysis.common.car_db import CarDB
+from analysis.common.zone_maps import ZoneMap, ZoneStats
+
+CATALOG_NAME = "catalog.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS logs (
+    path            TEXT PRIMARY KEY,   -- source log file
+    output_path     TEXT NOT NULL,      -- transformed output, relative to the catalog folder
+    log_system      TEXT,               -- e.g. front-daq, telem
+    drive_day       TEXT,               -- e.g. 2025-6-10, comp
+    name            TEXT,               -- e.g. log_836
+    size            INTEGER,
+    mtime           REAL,
+    content_hash    TEXT,
+    parser_version  TEXT,               -- e.g. 'NFR25 0.0.2'
+    record_count    INTEGER,
+    start_ms        INTEGER,            -- time_since_startup range
+    end_ms          INTEGER,
+    time_span_ms    INTEGER,
+    unix_start      INTEGER,            -- unix_time range (NULL without a GPS clock)
+    unix_end        INTEGER,
+    lat_min         REAL,               -- GPS bounding box (NULL without a fix)
+    lat_max         REAL,
+    lon_min         REAL,
+    lon_max         REAL,
+    indexed_at      REAL
+);
+CREATE INDEX IF NOT EXISTS logs_by_day ON logs (log_system, drive_day);
+CREATE TABLE IF NOT EXISTS channel_stats (
+    path            TEXT NOT NULL,      -- logs.path
+    channel         TEXT NOT NULL,      -- CarDB channel path, e.g. bms.max_cell_temp
+    min             REAL,
+    max             REAL,
+    nulls           INTEGER,
+    changes         INTEGER,
+    PRIMARY KEY (path, channel)
+);
+"""
+
+
+@dataclass
+class LogEntry:
+    path: str
+    output_path: str
+    log_system: Optional[str]
+    drive_day: Optional[str]
+    name: str
+    size: int
+    mtime: float
+    content_hash: str
+    parser_version: Optional[str]
+    record_count: int
+    start_ms: Optional[int]
+    end_ms: Optional[int]
+    time_span_ms: Optional[int]
+    unix_start: Optional[int]
+    unix_end: Optional[int]
+    lat_min: Optional[float]
+    lat_max: Optional[float]
+    lon_min: Optional[float]
+    lon_max: Optional[float]
+    indexed_at: float
+
+    @property
+    def duration_s(self) -> float:
+        return (self.time_span_ms or 0) / 1000.0
+
+
+_COLUMNS = [f.name for f in fields(LogEntry)]
+
+
+def file_hash(path: str) -> str:
+    """blake2b digest of a file's contents."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _range(values: np.ndarray):
+    if len(values) == 0:
+        return None, None
+    return values.min().item(), values.max().item()
+
+
+def summarise_db(db: CarDB) -> dict:
+    """Record count, time ranges and GPS bounding box of a parsed log."""
+    startup = db.channel("time.time_since_startup")
+    unix = db.channel("time.unix_time")
+    gps = db.channel("dynamics.gps_location")
+
+    start_ms, end_ms = _range(startup)
+    unix_start, unix_end = _range(unix[unix > 0])
+    fix = np.all(np.isfinite(gps), axis=1) & np.any(gps != 0, axis=1)  # (0, 0) means no fix
+    lat_min, lat_max = _range(gps[fix, 0])
+    lon_min, lon_max = _range(gps[fix, 1])
+    return dict(
+        record_count=len(db),
+        start_ms=start_ms,
+        end_ms=end_ms,
+        time_span_ms=None if start_ms is None else end_ms - start_ms,
+        unix_start=unix_start,
+        unix_end=unix_end,
+        lat_min=lat_min,
+        lat_max=lat_max,
+        lon_min=lon_min,
+        lon_max=lon_max,
+    )
+
+
+class LogCatalog:
+    def __init__(self, root: str):
+        """Open (or create) the catalog of the output folder `root`."""
+        self.root = root
+        self.path = os.path.join(root, CATALOG_NAME)
+        self._conn = sqlite3.connect(self.path)
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _entry(self, row) -> LogEntry:
+        return LogEntry(*row)
+
+    def get(self, path: str) -> Optional[LogEntry]:
+        row = self._conn.execute(
+            f"SELECT {', '.join(_COLUMNS)} FROM logs WHERE path = ?", (os.path.abspath(path),)
+        ).fetchone()
+        return None if row is None else self._entry(row)
+
+    def is_current(self, path: str) -> bool:
+        """
+        True if `path` is catalogued, unchanged since then and its output still exists.
+        Size and mtime are checked first; the content is hashed only if they differ.
+        """
+        entry = self.get(path)
+        if entry is None or not os.path.exists(os.path.join(self.root, entry.output_path)):
+            return False
+        st = os.stat(path)
+        if st.st_size != entry.size:
+            return False
+        if st.st_mtime == entry.mtime:
+            return True
+        if file_hash(path) != entry.content_hash:
+            return False
+        # touched but identical: remember the new mtime so we don't hash again
+        self._conn.execute("UPDATE logs SET mtime = ? WHERE path = ?", (st.st_mtime, entry.path))
+        self._conn.commit()
+        return True
+
+    def add(self, path: str, output_path: str, db: CarDB, parser_version=None, zones: Optional[ZoneMap] = None) -> LogEntry:
+        """
+        Insert or replace the row for one transformed log. With zones, also store
+        its whole-log channel statistics for pruning (see zone_maps.candidate_logs).
+        """
+        st = os.stat(path)
+        rel_out = os.path.relpath(output_path, self.root)
+        parts = rel_out.split(os.sep)
+        entry = LogEntry(
+            path=os.path.abspath(path),
+            output_path=rel_out,
+            log_system=parts[0] if len(parts) > 2 else None,
+            drive_day=parts[-2] if len(parts) > 1 else None,
+            name=os.path.splitext(parts[-1])[0],
+            size=st.st_size,
+            mtime=st.st_mtime,
+            content_hash=file_hash(path),
+            parser_version=None if parser_version is None else str(parser_version),
+            indexed_at=time.time(),
+            **summarise_db(db),
+        )
+        self._conn.execute(
+            f"INSERT OR REPLACE INTO logs ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})",
+            [getattr(entry, c) for c in _COLUMNS],
+        )
+        self._conn.execute("DELETE FROM channel_stats WHERE path = ?", (entry.path,))
+        if zones is not None:
+            summary = zones.summary()
+            rows = zip(
+                summary.channels,
+                summary.mins[0].tolist(),
+                summary.maxs[0].tolist(),
+                summary.nulls[0].tolist(),
+                summary.changes[0].tolist(),
+            )
+            self._conn.executemany(
+                "INSERT INTO channel_stats VALUES (?, ?, ?, ?, ?, ?)",
+                # sqlite has no NaN: an all-NaN channel is stored as NULL min/max
+                [(entry.path, c, None if lo != lo else lo, None if hi != hi else hi, n, ch) for c, lo, hi, n, ch in rows],
+            )
+        self._conn.commit()
+        return entry
+
+    def channel_stats(self, paths: List[str], channels: List[str]) -> ZoneStats:
+        """
+        Whole-log statistics, one row per path. Logs catalogued without stats get
+        unbounded ranges so predicates never prune them.
+        """
+        row_of = {p: i for i, p in enumerate(paths)}
+        col_of = {c: j for j, c in enumerate(channels)}
+        shape = (len(paths), len(channels))
+        mins, maxs = np.full(shape, -np.inf), np.full(shape, np.inf)
+        nulls, changes = np.zeros(shape, dtype=np.int64), np.ones(shape, dtype=np.int64)
+        if channels:
+            sql = (
+                "SELECT path, channel, min, max, nulls, changes FROM channel_stats "
+                f"WHERE channel IN ({', '.join('?' * len(channels))})"
+            )
+            for path, channel, lo, hi, n, ch in self._conn.execute(sql, channels):
+                if path not in row_of:
+                    continue
+                i, j = row_of[path], col_of[channel]
+                mins[i, j] = np.nan if lo is None else lo
+                maxs[i, j] = np.nan if hi is None else hi
+                nulls[i, j], changes[i, j] = n, ch
+        return ZoneStats(channels, mins, maxs, nulls, changes)
+
+    def query(
+        self,
+        log_system: Optional[str] = None,
+        drive_day: Optional[str] = None,
+        min_duration_s: Optional[float] = None,
+        parser_version: Optional[str] = None,
+    ) -> List[LogEntry]:
+        """
+        Logs matching every given filter, ordered by system, day and name.
+        parser_version matches either the full label ('NFR25 0.0.2') or just '0.0.2'.
+        """
+        where, params = [], []
+        if log_system is not None:
+            where.append("log_system = ?")
+            params.append(log_system)
+        if drive_day is not None:
+            where.append("drive_day = ?")
+            params.append(drive_day)
+        if min_duration_s is not None:
+            where.append("time_span_ms >= ?")
+            params.append(min_duration_s * 1000)
+        if parser_version is not None:
+            where.append("(parser_version = ? OR parser_version LIKE ?)")
+            params += [parser_version, f"% {parser_version}"]
+        sql = f"SELECT {', '.join(_COLUMNS)} FROM logs"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY log_system, drive_day, length(name), name"
+        return [self._entry(r) for r in self._conn.execute(sql, params)]
+
+    def log_systems(self) -> List[str]:
+        rows = self._conn.execute(
+            "SELECT DISTINCT log_system FROM logs WHERE log_system IS NOT NULL ORDER BY log_system"
+        )
+        return [r[0] for r in rows]
+
+    def drive_days(self, log_system: str) -> List[str]:
+        rows = self._conn.execute(
+            "SELECT DISTINCT drive_day FROM logs WHERE log_system = ? ORDER BY drive_day",
+            (log_system,),
+        )
+        return [r[0] for r in rows]
@@ -0,0 +1,81 @@
+"""
+Columnar cache of a parsed log: one uncompressed .npy member per CarDB channel
+inside a single npz (log_836.csv -> log_836.columns.npz). Reading a few channels
+only touches those members, so searches and plots don't re-parse the raw log.
+"""
+
+from __future__ import annotations
+
+import os
+import zipfile
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from analysis.common import derived
+from analysis.common.car_db import CarDB, all_channel_paths
+from analysis.common.profiling import stage
+
+COLUMNS_SUFFIX = ".columns.npz"
+_LENGTH_KEY = "_n_snapshots"
+
+
+def columns_path(output_path: str) -> str:
+    """Sidecar path for a transformed output, e.g. out/day/log_1.csv -> out/day/log_1.columns.npz"""
+    return os.path.splitext(output_path)[0] + COLUMNS_SUFFIX
+
+
+def save_columns(db: CarDB, path: str, channels: Optional[List[str]] = None) -> None:
+    """
+    Write every channel (default: all raw and derived channels) as its own
+    contiguous array. Members are written one channel at a time (the same
+    layout np.savez produces), so only one channel is in memory beyond db.
+    """
+    channels = all_channel_paths() if channels is None else channels
+    with stage("columns", records=len(db)) as span:
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED, allowZip64=True) as zf:
+            for name in [*channels, _LENGTH_KEY]:
+                array = np.array(len(db)) if name == _LENGTH_KEY else np.ascontiguousarray(db.channel(name))
+                with zf.open(name + ".npy", "w", force_zip64=True) as member:
+                    np.lib.format.write_array(member, array, allow_pickle=False)
+        span.bytes = os.path.getsize(path)
+
+
+class ColumnStore:
+    """
+    Read-only, lazily loaded view of a columns.npz. Offers the same channel(path)
+    / len() interface as CarDB, so anything that only reads channels takes either.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._npz = np.load(path)
+        self._n = int(self._npz[_LENGTH_KEY])
+        self._cache: Dict[str, np.ndarray] = {}
+
+    def __len__(self):
+        return self._n
+
+    def close(self) -> None:
+        self._npz.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def channels(self) -> List[str]:
+        return [k for k in self._npz.files if k != _LENGTH_KEY]
+
+    def channel(self, path: str) -> np.ndarray:
+        col = self._cache.get(path)
+        if col is None:
+            if path in self._npz.files:
+                col = self._npz[path]
+            elif derived.is_derived(path):  # cache written before the channel was added
+                col = derived.compute(path, self.channel)
+            else:
+                raise KeyError(f"Unknown channel '{path}'")
+            self._cache[path] = col
+        return col
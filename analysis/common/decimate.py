@@ -0,0 +1,69 @@
+"""
+Point reduction for plotting long channels.
+
+min/max decimation keeps, for every bucket of samples, the smallest and the
+largest value in their original order, so spikes and fault edges survive even
+when 50k samples are squeezed into a few thousand points.
+"""
+
+import numpy as np
+
+
+def _is_orderable(y: np.ndarray) -> bool:
+    return y.dtype.kind in "biuf"  # bool, ints and floats
+
+
+def minmax_indices(y: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Indices of at most ~max_points samples of y that keep every bucket's min and max.
+    Non-numeric channels fall back to evenly strided samples.
+    """
+    y = np.asarray(y)
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+
+    if not _is_orderable(y):
+        return np.linspace(0, n - 1, max_points).astype(np.int64)
+
+    n_buckets = max(max_points // 2, 1)
+    bucket = -(-n // n_buckets)  # ceil
+    n_full = (n // bucket) * bucket
+    starts = np.arange(0, n_full, bucket)
+
+    # argmin/argmax pick a NaN over any number, so NaNs rank last in both (an all-NaN bucket keeps one)
+    low, high = y, y
+    if y.dtype.kind == "f" and np.isnan(y).any():
+        low, high = np.where(np.isnan(y), np.inf, y), np.where(np.isnan(y), -np.inf, y)
+    lo = low[:n_full].reshape(-1, bucket).argmin(axis=1) + starts
+    hi = high[:n_full].reshape(-1, bucket).argmax(axis=1) + starts
+    idx = np.sort(np.stack([lo, hi], axis=1), axis=1).ravel()
+
+    if n_full < n:  # ragged last bucket
+        extra = np.sort([low[n_full:].argmin() + n_full, high[n_full:].argmax() + n_full])
+        idx = np.concatenate([idx, extra])
+
+    # keep the very first and last samples so the trace spans the full range
+    idx = np.concatenate([[0], idx, [n - 1]])
+    return np.unique(idx)
+
+
+def minmax_decimate(x: np.ndarray, y: np.ndarray, max_points: int):
+    """Decimate a trace to at most ~max_points points. Returns (x, y)."""
+    idx = minmax_indices(y, max_points)
+    return np.asarray(x)[idx], np.asarray(y)[idx]
+
+
+def window_indices(x: np.ndarray, x0: float, x1: float):
+    """
+    Select the samples with x0 <= x <= x1. Uses a binary search (and returns a
+    slice, so no copy is made) when x is sorted, otherwise a boolean mask.
+    """
+    x = np.asarray(x)
+    if x.dtype.kind not in "biuf":
+        return slice(None)
+    if len(x) < 2 or np.all(x[1:] >= x[:-1]):
+        lo = np.searchsorted(x, x0, side="left")
+        hi = np.searchsorted(x, x1, side="right")
+        return slice(lo, hi)
+    return (x >= x0) & (x <= x1)
@@ -0,0 +1,121 @@
+"""
+Derived channels: quantities computed from CarDB channels with vectorized numpy.
+
+A derived channel is registered with its dependencies and then read like any
+other channel, e.g. db.channel("inverter.power_kw"). It is computed on first
+access and memoized per CarDB (or ColumnStore); columns caches written by
+transform also store them, so they are never recomputed when searching.
+
+    @derived_channel("inverter.power_kw", ["inverter.dc_voltage", "inverter.dc_current"], unit="kW")
+    def power_kw(voltage, current):
+        return voltage * current / 1000.0
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class DerivedChannel:
+    name: str
+    deps: Tuple[str, ...]
+    fn: Callable[..., np.ndarray]
+    unit: str = ""
+    doc: str = ""
+
+
+DERIVED_CHANNELS: Dict[str, DerivedChannel] = {}
+
+
+def derived_channel(name: str, deps: List[str], unit: str = ""):
+    """Register fn(*dep_columns) -> column as the derived channel `name`."""
+
+    def decorator(fn):
+        if name in DERIVED_CHANNELS:
+            raise ValueError(f"Derived channel '{name}' is already registered")
+        DERIVED_CHANNELS[name] = DerivedChannel(name, tuple(deps), fn, unit, (fn.__doc__ or "").strip())
+        return fn
+
+    return decorator
+
+
+def is_derived(path: str) -> bool:
+    return path in DERIVED_CHANNELS
+
+
+def derived_paths() -> List[str]:
+    return list(DERIVED_CHANNELS)
+
+
+def compute(path: str, get: Callable[[str], np.ndarray]) -> np.ndarray:
+    """Evaluate one derived channel, reading its dependencies through get (e.g. db.channel)."""
+    channel = DERIVED_CHANNELS[path]
+    out = np.asarray(channel.fn(*(get(d) for d in channel.deps)))
+    out.flags.writeable = False  # memoized and shared: writing to it would be a bug
+    return out
+
+
+def dependencies(path: str) -> List[str]:
+    """Raw channels a derived channel needs, following derived dependencies."""
+    if path not in DERIVED_CHANNELS:
+        return [path]
+    out: List[str] = []
+    for d in DERIVED_CHANNELS[path].deps:
+        out += [r for r in dependencies(d) if r not in out]
+    return out
+
+
+# ——— Channels ———
+@derived_channel("ecu.apps_diff_pct", ["ecu.apps_positions[0]", "ecu.apps_positions[1]"], unit="%")
+def apps_diff_pct(apps1, apps2):
+    """Disagreement between the two pedal sensors, as a percentage of the larger reading."""
+    a, b = apps1.astype(np.float64), apps2.astype(np.float64)
+    larger = np.maximum(np.abs(a), np.abs(b))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(larger > 0, np.abs(a - b) / larger * 100.0, 0.0)
+
+
+@derived_channel("inverter.power_kw", ["inverter.dc_voltage", "inverter.dc_current"], unit="kW")
+def power_kw(voltage, current):
+    """DC power drawn by the inverter."""
+    return voltage.astype(np.float64) * current / 1000.0
+
+
+@derived_channel("dynamics.long_decel", ["dynamics.imu.accel[1]"])
+def long_decel(accel_y):
+    """Longitudinal deceleration, the IMU's y-axis acceleration."""
+    return accel_y.astype(np.float64)
+
+
+@derived_channel(
+    "dynamics.avg_wheel_speed",
+    ["corners[0].wheel_speed", "corners[1].wheel_speed", "corners[2].wheel_speed", "corners[3].wheel_speed"],
+)
+def avg_wheel_speed(fl, fr, bl, br):
+    """Mean of the four wheel speeds."""
+    return (fl.astype(np.float64) + fr + bl + br) / 4.0
+
+
+@derived_channel(
+    "dynamics.slip_ratio",
+    ["corners[0].wheel_speed", "corners[1].wheel_speed", "corners[2].wheel_speed", "corners[3].wheel_speed"],
+)
+def slip_ratio(fl, fr, bl, br):
+    """
+    Rear (driven) wheel slip relative to the front wheels: (rear - front) / front.
+    0 below 1 unit of front wheel speed, where the ratio is meaningless.
+    """
+    front = (fl.astype(np.float64) + fr) / 2.0
+    rear = (bl.astype(np.float64) + br) / 2.0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(front > 1.0, (rear - front) / front, 0.0)
+
+
+@derived_channel("bms.cell_temp_spread", ["bms.max_cell_temp", "bms.min_cell_temp"], unit="C")
+def cell_temp_spread(max_temp, min_temp):
+    """Difference between the hottest and the coldest cell."""
+    return max_temp.astype(np.float64) - min_temp
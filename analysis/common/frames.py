@@ -0,0 +1,77 @@
+"""
+CarDB channels as an Arrow table or a pandas DataFrame, straight from the
+records instead of through CSV text.
+
+Columns are named like the transformed CSV (channel_columns(): corners0_wheel_speed,
+bms_cell_voltages_3, ...), so code written against pd.read_csv keeps working;
+derived channels are named by their path (inverter.power_kw). Any source with
+channel(path) and len() works: CarDB, SegmentedCarDB, ColumnStore, ArchiveReader.
+
+Copies, by layout:
+
+- pandas: every column is the channel view itself. A CarDB's views are strided
+  over its records, pandas keeps them as they are, so to_dataframe() copies nothing
+  (and shares memory with the CarDB: copy the frame before writing to it).
+- Arrow: buffers must be contiguous, so a CarDB channel is gathered once into a
+  contiguous array that Arrow then wraps without copying. Channels that already are
+  contiguous (ColumnStore columns, derived channels) are wrapped as they are. bool
+  channels are always packed to Arrow's bitmaps.
+- With lists=True, fixed-size subarrays (bms.cell_voltages, corners[0].wheel_temperature)
+  become one FixedSizeList column over the (n, k) block instead of k columns.
+
+pyarrow and pandas are imported on first use, like the other optional outputs.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from analysis.common import derived
+from analysis.common.car_db import channel_columns
+
+
+def select_columns(columns: Optional[Iterable[str]] = None, lists: bool = False) -> List[Tuple[str, str]]:
+    """
+    (column name, channel path) of the requested columns, in the given order
+    (default: every raw channel in dtype order). Columns may be given by column
+    name or by channel path; derived channels by path.
+    """
+    by_path = channel_columns(lists=lists)
+    if columns is None:
+        return [(col, path) for path, col in by_path.items()]
+    by_name = {col: path for path, col in by_path.items()}
+    out = []
+    for c in columns:
+        if c in by_name:
+            out.append((c, by_name[c]))
+        elif c in by_path:
+            out.append((by_path[c], c))
+        elif derived.is_derived(c):
+            out.append((c, c))
+        else:
+            raise KeyError(f"Unknown column '{c}'")
+    return out
+
+
+def to_arrow(db, columns: Optional[Iterable[str]] = None, lists: bool = False):
+    """A pyarrow.Table of the columns of db (see select_columns)."""
+    import pyarrow as pa
+
+    arrays, names = [], []
+    for name, path in select_columns(columns, lists):
+        values = np.ascontiguousarray(db.channel(path))  # a no-op for contiguous channels
+        if values.ndim == 2:
+            arrays.append(pa.FixedSizeListArray.from_arrays(pa.array(values.reshape(-1)), values.shape[1]))
+        else:
+            arrays.append(pa.array(values))
+        names.append(name)
+    return pa.Table.from_arrays(arrays, names=names)
+
+
+def to_dataframe(db, columns: Optional[Iterable[str]] = None):
+    """A pandas.DataFrame of the columns of db (see select_columns), over the channel views."""
+    import pandas as pd
+
+    return pd.DataFrame({name: db.channel(path) for name, path in select_columns(columns)}, copy=False)
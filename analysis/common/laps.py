@@ -0,0 +1,260 @@
+"""
+GPS lap and sector segmentation.
+
+A gate is a line segment across the track given by two lat/lon points. Every
+step of the GPS trace is intersected with it in one vectorized pass (on a local
+flat-earth projection around the gate), and each crossing time is interpolated
+between the two samples. Crossings of the start/finish gate split the log into
+laps: lap 0 is the out-lap before the first crossing, laps 1..n are complete
+laps, and lap n + 1 is whatever follows the last crossing. Optional sector
+gates split each complete lap further.
+
+The result is a LapIndex stored next to the transformed output
+(log_836.csv -> log_836.laps.npz), so lap comparisons never re-scan GPS.
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from analysis.common.time_index import CLOCKS, TimeIndex
+
+LAPS_SUFFIX = ".laps.npz"
+MIN_LAP_S = 20.0  # crossings closer together than this are GPS jitter at the gate
+GPS_CHANNELS = ("dynamics.gps_location[0]", "dynamics.gps_location[1]")  # lat, lon
+_M_PER_DEG = 6371000.0 * np.pi / 180.0
+
+
+def laps_path(output_path: str) -> str:
+    """Sidecar path for a transformed output, e.g. out/day/log_1.csv -> out/day/log_1.laps.npz"""
+    return os.path.splitext(output_path)[0] + LAPS_SUFFIX
+
+
+@dataclass(frozen=True)
+class Gate:
+    lat1: float
+    lon1: float
+    lat2: float
+    lon2: float
+
+    @staticmethod
+    def parse(text: str) -> "Gate":
+        """'lat1,lon1,lat2,lon2' -> Gate"""
+        try:
+            values = [float(v) for v in text.split(",")]
+        except ValueError:
+            values = []
+        if len(values) != 4:
+            raise ValueError(f"A gate is 'lat1,lon1,lat2,lon2', got {text!r}")
+        return Gate(*values)
+
+    def as_array(self) -> np.ndarray:
+        return np.array([self.lat1, self.lon1, self.lat2, self.lon2])
+
+
+def _project(lat, lon, lat0, lon0):
+    """Metres east/north of (lat0, lon0)."""
+    return (lon - lon0) * _M_PER_DEG * np.cos(np.radians(lat0)), (lat - lat0) * _M_PER_DEG
+
+
+def gate_crossings(gps: np.ndarray, times: np.ndarray, gate: Gate, direction: int = 0) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    Crossings of gate by the (n, 2) lat/lon trace gps sampled at times (ms).
+    Only crossings in one direction count: `direction` (+1/-1) or, if 0, the
+    direction most crossings go (GPS jitter back over the line is the minority).
+    Returns (index of the first sample after each crossing, interpolated crossing
+    times, direction used).
+    """
+    lat0, lon0 = (gate.lat1 + gate.lat2) / 2, (gate.lon1 + gate.lon2) / 2
+    x, y = _project(gps[:, 0].astype(np.float64), gps[:, 1].astype(np.float64), lat0, lon0)
+    ax, ay = _project(gate.lat1, gate.lon1, lat0, lon0)
+    bx, by = _project(gate.lat2, gate.lon2, lat0, lon0)
+    fix = np.isfinite(x) & np.isfinite(y) & np.any(gps != 0, axis=1)
+
+    # step i runs from sample i to i + 1: P + t R meets the gate A + u S
+    px, py, rx, ry = x[:-1], y[:-1], np.diff(x), np.diff(y)
+    sx, sy = bx - ax, by - ay
+    qx, qy = ax - px, ay - py
+    denom = rx * sy - ry * sx
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t = (qx * sy - qy * sx) / denom
+        u = (qx * ry - qy * rx) / denom
+    hit = (denom != 0) & (t >= 0) & (t < 1) & (u >= 0) & (u <= 1) & fix[:-1] & fix[1:]
+
+    steps = np.flatnonzero(hit)
+    if not len(steps):
+        return np.empty(0, np.int64), np.empty(0, np.float64), direction
+    sides = np.sign(denom[steps]).astype(int)
+    if direction == 0:
+        direction = 1 if sides.sum() >= 0 else -1
+    steps = steps[sides == direction]
+    t_ms = times[steps] + t[steps] * (times[steps + 1] - times[steps])
+    return steps + 1, t_ms, direction
+
+
+def _debounce(idx: np.ndarray, t_ms: np.ndarray, min_gap_ms: float):
+    keep, last = [], -np.inf
+    for k, t in enumerate(t_ms):  # one step per crossing, not per sample
+        if t - last >= min_gap_ms:
+            keep.append(k)
+            last = t
+    return idx[keep], t_ms[keep]
+
+
+class LapIndex:
+    def __init__(
+        self,
+        gate: Gate,
+        sectors: Sequence[Gate],
+        n_snapshots: int,
+        crossings: np.ndarray,
+        crossing_ms: np.ndarray,
+        sector_crossings: List[np.ndarray],
+        sector_ms: List[np.ndarray],
+        min_lap_s: float = MIN_LAP_S,
+        source: Optional[Tuple[int, float]] = None,
+    ):
+        self.gate = gate
+        self.sectors = list(sectors)
+        self.n_snapshots = n_snapshots
+        self.crossings = crossings  # first snapshot after each start/finish crossing
+        self.crossing_ms = crossing_ms
+        self.sector_crossings = sector_crossings  # per sector gate, like crossings
+        self.sector_ms = sector_ms
+        self.min_lap_s = min_lap_s
+        self.source = source  # (size, mtime) of the log it was built from, if known
+
+    @property
+    def n_laps(self) -> int:
+        """Complete laps, numbered 1..n_laps."""
+        return max(len(self.crossings) - 1, 0)
+
+    def __repr__(self):
+        return f"LapIndex({self.n_laps} lap(s), {len(self.sectors) + 1} sector(s) per lap)"
+
+    @staticmethod
+    def build(source, gate: Gate, sectors: Sequence[Gate] = (), min_lap_s: float = MIN_LAP_S) -> "LapIndex":
+        """Detect laps in a CarDB (or anything with channel()) from its GPS trace."""
+        gps = np.column_stack([source.channel(c) for c in GPS_CHANNELS])
+        times = TimeIndex.from_startup(source.channel(CLOCKS["startup"])).times
+        crossings, crossing_ms, _ = gate_crossings(gps, times, gate)
+        crossings, crossing_ms = _debounce(crossings, crossing_ms, min_lap_s * 1000.0)
+        sector_crossings, sector_ms = [], []
+        for sector in sectors:
+            idx, t_ms, _ = gate_crossings(gps, times, sector)
+            idx, t_ms = _debounce(idx, t_ms, min_lap_s * 1000.0)
+            sector_crossings.append(idx)
+            sector_ms.append(t_ms)
+        return LapIndex(gate, sectors, len(gps), crossings, crossing_ms, sector_crossings, sector_ms, min_lap_s)
+
+    def lap_range(self, n: int) -> slice:
+        """Snapshots of lap n (0 = out-lap, n_laps + 1 = in-lap)."""
+        if not 0 <= n <= self.n_laps + 1:
+            raise ValueError(f"Lap {n} does not exist; this log has laps 1..{self.n_laps} (0 = out-lap)")
+        bounds = np.concatenate([[0], self.crossings, [self.n_snapshots]])
+        return slice(int(bounds[n]), int(bounds[n + 1]))
+
+    def lap_times_ms(self) -> np.ndarray:
+        """Duration of every complete lap."""
+        return np.diff(self.crossing_ms)
+
+    def sector_times_ms(self) -> np.ndarray:
+        """
+        (n_laps, n_sectors + 1) sector durations; NaN where a sector gate was not
+        crossed (in order) during that lap.
+        """
+        lap_start, lap_end = self.crossing_ms[:-1], self.crossing_ms[1:]
+        splits = [lap_start]
+        for t_ms in self.sector_ms:
+            pos = np.searchsorted(t_ms, lap_start, side="left")
+            ok = pos < len(t_ms)
+            split = np.full(len(lap_start), np.nan)
+            split[ok] = t_ms[pos[ok]]
+            split[~(split < lap_end)] = np.nan
+            splits.append(split)
+        splits.append(lap_end)
+        out = np.diff(np.column_stack(splits), axis=1)
+        out[out < 0] = np.nan
+        return out
+
+    def save(self, path: str) -> None:
+        arrays = {
+            "gate": self.gate.as_array(),
+            "sectors": np.array([s.as_array() for s in self.sectors]).reshape(-1, 4),
+            "n_snapshots": np.array(self.n_snapshots),
+            "crossings": self.crossings,
+            "crossing_ms": self.crossing_ms,
+            "min_lap_s": np.array(self.min_lap_s),
+            "source": np.array(self.source if self.source is not None else [], dtype=np.float64),
+        }
+        for j in range(len(self.sectors)):
+            arrays[f"sector_crossings_{j}"] = self.sector_crossings[j]
+            arrays[f"sector_ms_{j}"] = self.sector_ms[j]
+        with open(path, "wb") as f:
+            np.savez(f, **arrays)
+
+    @staticmethod
+    def load(path: str) -> "LapIndex":
+        with np.load(path) as z:
+            sectors = [Gate(*s) for s in z["sectors"].tolist()]
+            return LapIndex(
+                Gate(*z["gate"].tolist()),
+                sectors,
+                int(z["n_snapshots"]),
+                z["crossings"],
+                z["crossing_ms"],
+                [z[f"sector_crossings_{j}"] for j in range(len(sectors))],
+                [z[f"sector_ms_{j}"] for j in range(len(sectors))],
+                float(z["min_lap_s"]),
+                _source(z["source"]) if "source" in z.files else None,
+            )
+
+    def matches(self, gate: Gate, sectors: Sequence[Gate] = (), min_lap_s: float = MIN_LAP_S) -> bool:
+        """True if this index was built with the same gates and settings."""
+        return self.gate == gate and self.sectors == list(sectors) and self.min_lap_s == min_lap_s
+
+
+def _source(stamp: np.ndarray) -> Optional[Tuple[int, float]]:
+    return (int(stamp[0]), float(stamp[1])) if len(stamp) == 2 else None
+
+
+def source_stamp(path: str) -> Tuple[int, float]:
+    """(size, mtime) of a log, to tell whether a stored lap index is still current."""
+    st = os.stat(path)
+    return st.st_size, st.st_mtime
+
+
+def load_or_build(
+    source_fn,
+    path: str,
+    gate: Gate,
+    sectors: Sequence[Gate] = (),
+    min_lap_s: float = MIN_LAP_S,
+    n_snapshots: Optional[int] = None,
+    source_path: Optional[str] = None,
+) -> Optional[LapIndex]:
+    """
+    The stored lap index at path if it was built for these gates and, when given,
+    for a log of n_snapshots whose file at source_path has the same size and mtime.
+    Otherwise one built from source_fn() (called only then, and closed afterwards
+    if it has close()) and saved to path.
+    """
+    stamp = source_stamp(source_path) if source_path is not None else None
+    if os.path.exists(path):
+        index = LapIndex.load(path)
+        current = (n_snapshots is None or index.n_snapshots == n_snapshots) and (stamp is None or index.source == stamp)
+        if current and index.matches(gate, sectors, min_lap_s):
+            return index
+    source = source_fn()
+    try:
+        index = LapIndex.build(source, gate, sectors, min_lap_s)
+    finally:
+        if hasattr(source, "close"):
+            source.close()
+    index.source = stamp
+    index.save(path)
+    return index
@@ -0,0 +1,302 @@
+"""
+Live telem ingest over UDP or TCP on localhost.
+
+The car streams one fixed-size telem frame per snapshot (see TelemFrameDecoder).
+TelemIngestServer accepts frames as UDP datagrams (one or more whole frames each)
+or as a TCP byte stream, decodes them in batches with the compiled schema and
+publishes each batch to every subscriber's asyncio.Queue:
+
+    server = TelemIngestServer(TelemFrameDecoder(config), mapper)
+    await server.start(udp_port=5005)
+    batches = server.subscribe()
+    batch = await batches.get()        # LiveBatch: a CarDB (if mapped) + the raw columns
+
+replay() is the stand-in for the radio: it streams the frames of an archived .daq
+log to the server at 1x (or Nx) their recorded pace, so the whole live path can be
+tested and benchmarked offline. IngestStats measures frames/s and the latency from
+a frame's arrival to its batch being published.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from analysis.common.car_db import CarDB, car_snapshot_dtype
+from analysis.common.parsers.telem.frame_decoder import TelemFrameDecoder
+from analysis.common.parsers.telem.telem_base_parser import DataMapper, build_telem_config, split_telem_log
+
+HOST = "127.0.0.1"
+BATCH_FRAMES = 64  # publish once this many frames are waiting ...
+BATCH_INTERVAL_S = 0.02  # ... or once the oldest has waited this long
+QUEUE_BATCHES = 256  # per subscriber; a slow subscriber loses its oldest batches
+REPLAY_RATE_HZ = 20.0  # replay pace for logs whose uptime is not monotonic
+
+
+@dataclass
+class LiveBatch:
+    db: Optional[CarDB]  # None without a mapper
+    columns: Dict[str, np.ndarray]  # decoded signals, see TelemFrameDecoder.decode
+    received: np.ndarray  # perf_counter() arrival time of each frame
+    published: float
+
+    def __len__(self):
+        return len(self.received)
+
+
+@dataclass
+class IngestStats:
+    frames: int = 0
+    batches: int = 0
+    bytes: int = 0
+    malformed_bytes: int = 0  # datagram tails that were not a whole frame
+    dropped_batches: int = 0  # evicted from full subscriber queues
+    first_frame: Optional[float] = None
+    last_frame: Optional[float] = None
+    latencies: List[np.ndarray] = field(default_factory=list)  # seconds, per batch
+
+    def frames_per_s(self) -> float:
+        if self.first_frame is None or self.last_frame == self.first_frame:
+            return 0.0
+        return self.frames / (self.last_frame - self.first_frame)
+
+    def latency_percentiles(self, q: Sequence[float] = (50, 90, 99)) -> np.ndarray:
+        """Arrival-to-publish latency percentiles in ms (NaN before the first batch)."""
+        if not self.latencies:
+            return np.full(len(q), np.nan)
+        return np.percentile(np.concatenate(self.latencies), q) * 1000.0
+
+    def summary(self) -> str:
+        p50, p90, p99 = self.latency_percentiles()
+        return (
+            f"{self.frames} frames in {self.batches} batches, {self.frames_per_s():.0f} frames/s, "
+            f"latency p50 {p50:.2f} ms / p90 {p90:.2f} ms / p99 {p99:.2f} ms, "
+            f"{self.dropped_batches} batch(es) dropped, {self.malformed_bytes} malformed byte(s)"
+        )
+
+
+class _UDPProtocol(asyncio.DatagramProtocol):
+    def __init__(self, server: "TelemIngestServer"):
+        self.server = server
+
+    def datagram_received(self, data, addr):
+        size = self.server.decoder.frame_size
+        whole = len(data) - len(data) % size
+        self.server.stats.malformed_bytes += len(data) - whole
+        self.server._receive(data[:whole])
+
+
+class TelemIngestServer:
+    def __init__(
+        self,
+        decoder: TelemFrameDecoder,
+        mapper: Optional[DataMapper] = None,
+        batch_frames: int = BATCH_FRAMES,
+        batch_interval: float = BATCH_INTERVAL_S,
+    ):
+        self.decoder = decoder
+        self.mapper = mapper
+        self.batch_frames = batch_frames
+        self.batch_interval = batch_interval
+        self.stats = IngestStats()
+        self.udp_port: Optional[int] = None
+        self.tcp_port: Optional[int] = None
+        self._subscribers: List[asyncio.Queue] = []
+        self._pending: List[bytes] = []  # whole frames waiting for the next batch
+        self._pending_at: List[Tuple[float, int]] = []  # (arrival time, frames) per receive
+        self._waiting = 0  # frames in _pending
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._udp = None
+        self._tcp = None
+        self._connections: set = set()  # TCP handler tasks
+
+    # ——— Lifecycle ———
+    async def start(self, host: str = HOST, udp_port: Optional[int] = None, tcp_port: Optional[int] = None) -> None:
+        """Listen on UDP and/or TCP; port 0 picks a free port (see udp_port / tcp_port afterwards)."""
+        if udp_port is None and tcp_port is None:
+            raise ValueError("Give a UDP port, a TCP port or both")
+        loop = asyncio.get_running_loop()
+        if udp_port is not None:
+            self._udp, _ = await loop.create_datagram_endpoint(lambda: _UDPProtocol(self), local_addr=(host, udp_port))
+            self.udp_port = self._udp.get_extra_info("sockname")[1]
+        if tcp_port is not None:
+            self._tcp = await asyncio.start_server(self._handle_tcp, host, tcp_port)
+            self.tcp_port = self._tcp.sockets[0].getsockname()[1]
+
+    async def close(self, grace: float = 1.0) -> None:
+        """
+        Stop listening, give open TCP connections up to `grace` seconds to deliver
+        what they already sent, and publish whatever is still waiting.
+        """
+        if self._udp is not None:
+            self._udp.close()
+        if self._tcp is not None:
+            self._tcp.close()
+            if self._connections:
+                _, still_open = await asyncio.wait(self._connections, timeout=grace)
+                for task in still_open:
+                    task.cancel()
+                await asyncio.gather(*still_open, return_exceptions=True)
+            await self._tcp.wait_closed()
+        self.flush()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def subscribe(self, maxsize: int = QUEUE_BATCHES) -> asyncio.Queue:
+        """A queue that receives every LiveBatch published from now on."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self._subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.remove(queue)
+
+    # ——— Ingest ———
+    async def _handle_tcp(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        size = self.decoder.frame_size
+        buf = b""
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                data = await reader.read(64 * size)
+                if not data:
+                    break
+                buf += data
+                whole = len(buf) - len(buf) % size
+                if whole:
+                    self._receive(buf[:whole])
+                    buf = buf[whole:]  # a frame split across reads waits for its tail
+        finally:
+            self.stats.malformed_bytes += len(buf)
+            self._connections.discard(task)
+            writer.close()
+
+    def _receive(self, frames: bytes) -> None:
+        n = len(frames) // self.decoder.frame_size
+        if not n:
+            return
+        now = time.perf_counter()
+        if self.stats.first_frame is None:
+            self.stats.first_frame = now
+        self.stats.last_frame = now
+        self.stats.frames += n
+        self.stats.bytes += len(frames)
+        self._pending.append(frames)
+        self._pending_at.append((now, n))
+        self._waiting += n
+        if self._waiting >= self.batch_frames:
+            self.flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.batch_interval, self.flush)
+
+    def flush(self) -> Optional[LiveBatch]:
+        """Decode and publish the waiting frames now."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return None
+        data = b"".join(self._pending)
+        received = np.repeat([t for t, _ in self._pending_at], [k for _, k in self._pending_at])
+        self._pending, self._pending_at, self._waiting = [], [], 0
+
+        columns = self.decoder.decode(data)
+        db = None
+        if self.mapper is not None:
+            db = self.mapper.map_columns(columns, CarDB.from_array(np.zeros(len(received), dtype=car_snapshot_dtype)))
+        batch = LiveBatch(db, columns, received, time.perf_counter())
+        self.stats.batches += 1
+        self.stats.latencies.append(batch.published - received)
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()  # keep the newest data flowing to a slow subscriber
+                self.stats.dropped_batches += 1
+            queue.put_nowait(batch)
+        return batch
+
+
+# ——— Replay ———
+def read_frames(path: str) -> Tuple[TelemFrameDecoder, bytes]:
+    """The compiled schema of an archived telem log and its whole frames."""
+    with open(path, "rb") as f:
+        raw = f.read()
+    cfg_text, start = split_telem_log(raw)
+    decoder = TelemFrameDecoder(build_telem_config(cfg_text))
+    data = raw[start:]
+    return decoder, data[: len(data) - len(data) % decoder.frame_size]
+
+
+class _Sender(asyncio.DatagramProtocol):
+    pass
+
+
+def replay_schedule(uptime: np.ndarray, speed: float = 1.0, rate_hz: Optional[float] = None) -> np.ndarray:
+    """
+    Seconds after the start of a replay at which each frame is sent: the recorded
+    uptime (or, if rate_hz is given or the uptime is not monotonic, a uniform
+    rate_hz / REPLAY_RATE_HZ), divided by speed. speed 0 sends everything at once.
+    """
+    n = len(uptime)
+    if speed <= 0 or not n:
+        return np.zeros(n)
+    uptime = uptime.astype(np.int64)
+    if rate_hz is None and np.all(np.diff(uptime) >= 0):
+        return (uptime - uptime[0]) / 1000.0 / speed
+    return np.arange(n) / (rate_hz or REPLAY_RATE_HZ) / speed
+
+
+async def replay(
+    path: str,
+    port: int,
+    host: str = HOST,
+    protocol: str = "udp",
+    speed: float = 1.0,
+    frames_per_packet: int = 1,
+    rate_hz: Optional[float] = None,
+) -> int:
+    """
+    Stream the frames of an archived telem log to host:port at `speed` times their
+    recorded pace (see replay_schedule; speed 0 sends as fast as possible).
+    Returns the number of frames sent.
+    """
+    if protocol not in ("udp", "tcp"):
+        raise ValueError(f"Unknown protocol '{protocol}', expected udp or tcp")
+    decoder, data = read_frames(path)
+    size = decoder.frame_size
+    due = replay_schedule(decoder.frames(data)["time_since_startup"], speed, rate_hz)
+
+    loop = asyncio.get_running_loop()
+    if protocol == "udp":
+        transport, _ = await loop.create_datagram_endpoint(_Sender, remote_addr=(host, port))
+        send = transport.sendto
+    else:
+        _, writer = await asyncio.open_connection(host, port)
+        send = writer.write
+
+    start = time.perf_counter()
+    try:
+        for i in range(0, len(due), frames_per_packet):
+            delay = due[i] - (time.perf_counter() - start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            send(data[i * size : (i + frames_per_packet) * size])
+            if protocol == "tcp":
+                await writer.drain()
+            else:
+                await asyncio.sleep(0)  # UDP has no backpressure: let a receiver in this loop keep up
+    finally:
+        if protocol == "udp":
+            transport.close()
+        else:
+            writer.close()
+            await writer.wait_closed()
+    return len(due)
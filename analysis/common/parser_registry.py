@@ -1,7 +1,11 @@
 from analysis.common.car_db import CarDB, CarSnapshot
+from analysis.common.profiling import stage
+from analysis.common.segmented import SEGMENT_SNAPSHOTS, SegmentedCarDB
 
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass  # used to generate classes that store data
 from enum import Enum
+import os
 import pkgutil
 import importlib  # both these last two are for importing modules
 
@@ -15,6 +19,9 @@ class ParserVersion:
     minor: int
     patch: int
 
+    def __str__(self) -> str:
+        return f"{self.schema_name} {self.major}.{self.minor}.{self.patch}"
+
 
 def parser_class(version: ParserVersion):
     """
@@ -31,10 +38,71 @@ def parser_class(version: ParserVersion):
     return decorator
 
 
+PREAMBLE = b"NFR25"
+VERSION_PEEK_LEN = len(PREAMBLE) + 3  # 5-byte magic + 3-byte version
+DECODE_WORKERS = os.cpu_count() or 1  # threads decoding one log's record ranges
+MIN_RANGE_RECORDS = 8192  # smaller ranges aren't worth a thread
+
+
 class BaseParser:  # this is the root class of every parser. Has the fn parse that takes in the name of the file and returns the data as organized into a Python DB
+    # Fixed-size layouts set these so a growing log can be decoded incrementally
+    # (see ParserRegistry.open_stream); None means the layout is only known after parsing
+    HEADER_SIZE = None  # bytes before the first record
+    RECORD_SIZE = None  # bytes per record
+    BULK_LAYOUT = None  # a parsers.bulk.BulkLayout decodes whole ranges of records; None decodes record by record
+
     def parse(filename: str) -> CarDB:
         pass  # just a template that other more specific functions can follow
 
+    def decode_into(self, data: memoryview, records, workers: int = None) -> None:
+        """
+        Decode len(records) consecutive RECORD_SIZE records from data into records.
+        With a BULK_LAYOUT, the records are split into up to `workers` (default:
+        DECODE_WORKERS) record-aligned ranges decoded on a thread pool, each into
+        its own slice of records.
+        """
+        size = self.RECORD_SIZE
+        n = len(records)
+        with stage("decode", bytes=n * size, records=n):
+            if self.BULK_LAYOUT is None:
+                for idx in range(n):
+                    self._decode_record(data[idx * size : (idx + 1) * size], records[idx])
+                return
+            workers = max(1, min(workers or DECODE_WORKERS, n // MIN_RANGE_RECORDS))
+            if workers == 1:
+                self.BULK_LAYOUT.decode(data, records)
+                return
+            bounds = [n * k // workers for k in range(workers + 1)]
+            with ThreadPoolExecutor(workers) as pool:
+                ranges = [
+                    pool.submit(self.BULK_LAYOUT.decode, data[a * size : b * size], records[a:b])
+                    for a, b in zip(bounds[:-1], bounds[1:])
+                ]
+                for r in ranges:
+                    r.result()  # re-raise a failed range
+
+    def parse_segmented(self, filename: str, segment: int = SEGMENT_SNAPSHOTS) -> SegmentedCarDB:
+        """
+        Like parse(), into a SegmentedCarDB: fixed layouts are read and decoded one
+        segment of records at a time, so neither the file nor the snapshots are
+        ever held as one block. Other parsers parse whole and are then wrapped.
+        """
+        if self.RECORD_SIZE is None:
+            db = self.parse(filename)
+            return None if db is None else SegmentedCarDB.from_parts([db._db], segment)
+        size = os.path.getsize(filename) - self.HEADER_SIZE
+        if size < 0 or size % self.RECORD_SIZE:
+            raise ValueError(f"{filename}: {max(size, 0)} bytes of records, not a multiple of {self.RECORD_SIZE}")
+        db = SegmentedCarDB(segment)
+        with open(filename, "rb") as fh:
+            fh.seek(self.HEADER_SIZE)
+            for _ in range(0, size // self.RECORD_SIZE, segment):
+                data = memoryview(fh.read(segment * self.RECORD_SIZE))
+                for records in db.grow(len(data) // self.RECORD_SIZE):
+                    self.decode_into(data, records)
+                    data = data[len(records) * self.RECORD_SIZE :]
+        return db
+
 
 class ParserRegistry:
     parsers: dict[ParserVersion, BaseParser] = {}
@@ -63,64 +131,95 @@ class ParserRegistry:
         for finder, module_name, is_pkg in pkgutil.iter_modules(package.__path__):
             full_module_name = f"{package.__name__}.{module_name}"
             importlib.import_module(full_module_name)
-        loaded = True
+        ParserRegistry.loaded = True
 
     @staticmethod
-    def parse(filename: str) -> CarDB:
+    def detect_version(filename: str):
         """
-        Detect the file’s schema + version and dispatch to the best
-        parser we have registered.  Raises ValueError if no compatible
-        parser is found.
+        Peek at the file header and return the ParserVersion it asks for,
+        or None if the file is too short to contain one.
         """
-        if not ParserRegistry.loaded:
-            ParserRegistry.load_parsers()
-
         # Peek at the header (≤ 9 bytes)
-        PREAMBLE = b"NFR25"
-
         # assume the old version
         parser_name = "NFR25"
         major, minor, patch = [0, 0, 0]
 
-        with open(filename, "rb") as fh:
-            header = fh.read(len(PREAMBLE) + 3)  # 5-byte magic + 3-byte version
+        with stage("sniff header", bytes=VERSION_PEEK_LEN, records=1), open(filename, "rb") as fh:
+            header = fh.read(VERSION_PEEK_LEN)
 
         if len(header) < len(PREAMBLE):
             print(f"File {filename} too short to contain header. Skipping...")
-            return
+            return None
         if not header.startswith(PREAMBLE):
             print(
                 f"Unknown or unsupported file format (missing 'NFR25', got {header}), assuming NFR25 0.0.0"
             )
 
         major, minor, patch = header[len(PREAMBLE) : len(PREAMBLE) + 3]
-        requested = ParserVersion(parser_name, major, minor, patch)
+        return ParserVersion(parser_name, major, minor, patch)
 
-        print(f"Using Parser : {parser_name} v{major}.{minor}.{patch}")
+    @staticmethod
+    def resolve(requested: ParserVersion) -> ParserVersion:
+        """
+        The registered version that handles `requested`: an exact match, else the
+        newest compatible parser of the same schema.  Raises ValueError if none.
+        """
+        if not ParserRegistry.loaded:
+            ParserRegistry.load_parsers()
 
         # Try exact match first
-        parser_cls = ParserRegistry.get_parser(requested)
+        if ParserRegistry.get_parser(requested) is not None:
+            return requested
 
         # newest parser
-        if parser_cls is None:
-            compatible = [
-                v
-                for v in ParserRegistry.get_parser_versions()
-                if v.schema_name == requested.schema_name
-                and (v.major, v.minor, v.patch)
-                <= (requested.major, requested.minor, requested.patch)
-            ]
-            if compatible:
-                best = max(compatible, key=lambda v: (v.major, v.minor, v.patch))
-                parser_cls = ParserRegistry.get_parser(best)
-
-        if parser_cls is None:
-            raise ValueError(
-                f"No parser available for schema '{requested.schema_name}' "
-                f"version {requested.major}.{requested.minor}.{requested.patch}"
-            )
+        compatible = [
+            v
+            for v in ParserRegistry.get_parser_versions()
+            if v.schema_name == requested.schema_name
+            and (v.major, v.minor, v.patch)
+            <= (requested.major, requested.minor, requested.patch)
+        ]
+        if compatible:
+            return max(compatible, key=lambda v: (v.major, v.minor, v.patch))
+
+        raise ValueError(
+            f"No parser available for schema '{requested.schema_name}' "
+            f"version {requested.major}.{requested.minor}.{requested.patch}"
+        )
 
-        # Try exact match first
-        parser_cls = ParserRegistry.get_parser(requested)
-        instance = parser_cls()
-        return instance.parse(filename)
+    @staticmethod
+    def parse(filename: str, segment: int = None) -> CarDB:
+        """
+        Detect the file’s schema + version and dispatch to the best
+        parser we have registered.  Raises ValueError if no compatible
+        parser is found.  With segment, returns a SegmentedCarDB filled
+        `segment` snapshots at a time (see analysis.common.segmented).
+        """
+        db, _ = ParserRegistry.parse_with_version(filename, segment)
+        return db
+
+    @staticmethod
+    def open_stream(filename: str):
+        """
+        A LogStream over a log that is still being written: each poll() decodes only
+        the records appended since the last one (see analysis.common.stream).
+        """
+        from analysis.common.stream import LogStream  # the stream resolves parsers through this registry
+
+        return LogStream(filename)
+
+    @staticmethod
+    def parse_with_version(filename: str, segment: int = None):
+        """Like parse(), but also returns the ParserVersion that decoded the file."""
+        requested = ParserRegistry.detect_version(filename)
+        if requested is None:
+            return None, None
+
+        print(f"Using Parser : {requested.schema_name} v{requested.major}.{requested.minor}.{requested.patch}")
+
+        version = ParserRegistry.resolve(requested)
+        instance = ParserRegistry.get_parser(version)()
+        with stage(f"parse {version}", bytes=os.path.getsize(filename)) as span:
+            db = instance.parse(filename) if segment is None else instance.parse_segmented(filename, segment)
+            span.records = len(db) if db is not None else 0
+        return db, version
@@ -0,0 +1,91 @@
+"""
+Whole-array decoding of fixed-size records.
+
+A parser's struct format becomes a numpy record dtype, so the raw bytes of n
+records are viewed (not copied) as an array, and each CarDB channel is filled
+with one strided numpy copy over all n records instead of a struct.unpack and
+a few hundred scalar assignments per record. Those copies release the GIL, so
+disjoint record ranges decode in parallel on threads (see BaseParser.decode_into).
+
+A layout lists, in struct order, the CarDB channel each value (or run of
+values, for array channels) goes to, with None for values the CarDB doesn't
+keep. Later entries overwrite earlier ones, exactly like the per-record decoders.
+encode() goes the other way, for writing synthetic logs (analysis.common.synth).
+"""
+
+from __future__ import annotations
+
+import re
+import struct
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from analysis.common.car_db import CarDB
+
+# struct codes -> little-endian numpy types ("?" is read as a byte: struct makes any non-zero byte True)
+_TYPES = {
+    "?": "u1", "b": "i1", "B": "u1", "h": "<i2", "H": "<u2", "i": "<i4", "I": "<u4",
+    "l": "<i4", "L": "<u4", "q": "<i8", "Q": "<u8", "e": "<f2", "f": "<f4", "d": "<f8",
+}
+
+
+def struct_values(fmt: str) -> List[Tuple[str, np.dtype, int]]:
+    """(struct code, numpy type, byte offset) of every value struct.unpack(fmt) returns, for a "<" format."""
+    if not fmt.startswith("<"):
+        raise ValueError(f"Only little-endian '<' formats have a fixed layout, got {fmt[:10]!r}")
+    values, offset = [], 0
+    for count, code in re.findall(r"(\d*)([a-zA-Z?])", fmt[1:]):
+        count = int(count) if count else 1
+        if code == "x":
+            offset += count
+            continue
+        if code not in _TYPES:
+            raise ValueError(f"Unsupported struct code {code!r}")
+        t = np.dtype(_TYPES[code])
+        for _ in range(count):
+            values.append((code, t, offset))
+            offset += t.itemsize
+    if offset != struct.calcsize(fmt):
+        raise ValueError(f"Layout of {fmt[:10]!r}... is {offset} bytes, struct says {struct.calcsize(fmt)}")
+    return values
+
+
+class BulkLayout:
+    def __init__(self, fmt: str, fields: Sequence[Tuple[Optional[str], int]]):
+        values = struct_values(fmt)
+        names, formats, offsets = [], [], []
+        self.targets: List[Tuple[str, str, bool]] = []  # (CarDB channel, dtype field, struct bool)
+        i = 0
+        for dest, count in fields:
+            if dest is not None:
+                run = values[i : i + count]
+                code, t, first = run[0]
+                if any(rc != code or ro != first + k * t.itemsize for k, (rc, _, ro) in enumerate(run)):
+                    raise ValueError(f"Values {i}..{i + count - 1} for {dest} are not one contiguous array")
+                name = f"v{i}"
+                names.append(name)
+                formats.append(t if count == 1 else (t, (count,)))
+                offsets.append(first)
+                self.targets.append((dest, name, code == "?"))
+            i += count
+        if i != len(values):
+            raise ValueError(f"Layout covers {i} of {len(values)} values")
+        self.dtype = np.dtype({"names": names, "formats": formats, "offsets": offsets, "itemsize": struct.calcsize(fmt)})
+
+    def decode(self, data, records: np.ndarray) -> None:
+        """Decode len(records) consecutive records from data into records."""
+        raw = np.frombuffer(data, dtype=self.dtype, count=len(records))
+        db = CarDB.from_array(records)
+        for dest, name, is_bool in self.targets:
+            db.channel(dest)[...] = raw[name] != 0 if is_bool else raw[name]
+
+    def encode(self, db) -> bytes:
+        """
+        The records of db (anything with channel() and len()) in this layout: the
+        inverse of decode. Values the CarDB doesn't keep are written as zeros.
+        """
+        raw = np.zeros(len(db), dtype=self.dtype)
+        for dest, name, _ in self.targets:
+            raw[name] = db.channel(dest)
+        return raw.tobytes()
@@ -59,6 +59,9 @@ class FrontDAQParser(BaseParser):
     a fully-typed CarDB.
     """
 
+    HEADER_SIZE = PREAMBLE_LEN
+    RECORD_SIZE = LINE_SIZE
+
     def _decode_record(self, raw: memoryview, dest: np.void) -> None:
         """Decode one 1 004-byte record directly into the CarDB slot."""
         vals = struct.unpack_from(LINE_FMT, raw)
@@ -91,11 +94,11 @@ class FrontDAQParser(BaseParser):
         ]
         i += 22
 
-        dest["bms"]["soe_bat_voltage"] = hv
+        dest["bms"]["battery_voltage"] = hv
         dest["pdm"]["bat_voltage"] = lv
-        dest["bms"]["soe_bat_temp"] = batT
-        dest["bms"]["soe_max_discharge_current"] = maxDis
-        dest["bms"]["soe_max_regen_current"] = maxReg
+        dest["bms"]["battery_temp"] = batT
+        dest["bms"]["max_discharge_current"] = maxDis
+        dest["bms"]["max_regen_current"] = maxReg
         dest["bms"]["bms_state"] = 0  # set below
 
         # wheelSpeeds[4] + wheelDisp[4] + prStrain[4] are in *rest*
@@ -145,12 +148,6 @@ class FrontDAQParser(BaseParser):
 
         n = len(blob) // LINE_SIZE
         db = CarDB(n)
-
-        mv = memoryview(blob)
-        for rec_idx in range(n):
-            start = rec_idx * LINE_SIZE
-            self._decode_record(
-                mv[start : start + LINE_SIZE], db._db[rec_idx]
-            )
+        self.decode_into(memoryview(blob), db._db)
 
         return db
@@ -4,6 +4,7 @@ import numpy as np
 
 from analysis.common.parser_registry import ParserVersion, parser_class, BaseParser
 from analysis.common.car_db        import CarDB
+from analysis.common.parsers.bulk  import BulkLayout
 
 
 NUM_TEMP_CELLS  = 80
@@ -36,9 +37,41 @@ LINE_FMT  = "<I" + DRIVE_FMT + f"{NUM_TEMP_CELLS}f{NUM_VOLT_CELLS}f"
 LINE_SIZE = struct.calcsize(LINE_FMT)
 assert LINE_SIZE == 1032, LINE_SIZE
 
+# ─── the same mapping as _decode_record, value by value, for whole-array decoding
+CORNERS = range(4)
+BULK_FIELDS = [
+    ("time.time_since_startup", 1),
+    ("bms.fault_summary", 1),
+    *[(f"bms.{name}_fault", 1) for name in (
+        "undervoltage", "overvoltage", "undertemperature", "overtemperature", "overcurrent", "external_kill", "open_wire"
+    )],
+    ("ecu.implausibilities", ECU_FAULT_COUNT),
+    # 25 floats: hv…pumpAmps
+    ("bms.battery_voltage", 1), ("pdm.bat_voltage", 1), ("bms.battery_temp", 1),
+    (None, 4),  # max/min cell temp & voltage
+    ("bms.max_discharge_current", 1), ("bms.max_regen_current", 1),
+    (None, 1),  # SOC
+    *[(f"corners[{c}].wheel_speed", 1) for c in CORNERS],
+    *[(f"corners[{c}].wheel_displacement", 1) for c in CORNERS],
+    *[(f"corners[{c}].pr_strain", 1) for c in CORNERS],
+    ("pdm.gen_amps", 1), ("pdm.fan_amps", 1), ("pdm.pump_amps", 1),
+    # 1×uint16 + 8×int16 + 2×uint16
+    (None, 1),
+    ("inverter.rpm", 1), ("inverter.motor_current", 1), ("inverter.dc_voltage", 1), ("inverter.dc_current", 1),
+    (None, 6),  # brake pressures, apps, inverter temps
+    # 5×uint8, 2×bool
+    ("ecu.drive_state", 1), ("bms.bms_state", 1), (None, 3),
+    ("ecu.brake_pressed", 1), ("pdm.bat_voltage_warning", 1),
+    ("bms.cell_temps", NUM_TEMP_CELLS), ("bms.cell_voltages", NUM_VOLT_CELLS),
+]
+
 
 @parser_class(ParserVersion("NFR25", 0, 0, 1))
 class FrontDAQParser(BaseParser):
+    HEADER_SIZE = PREAMBLE_LEN + VERSION_BYTES + SKIP_BYTES
+    RECORD_SIZE = LINE_SIZE
+    BULK_LAYOUT = BulkLayout(LINE_FMT, BULK_FIELDS)
+
     def _decode_record(self, raw: memoryview, dest: np.void) -> None:
         vals = struct.unpack_from(LINE_FMT, raw)
         i = 0
@@ -76,11 +109,11 @@ class FrontDAQParser(BaseParser):
         i += 25
 
         # map into CarDB
-        dest["bms"]["soe_bat_voltage"]        = hv
+        dest["bms"]["battery_voltage"]        = hv
         dest["pdm"]["bat_voltage"]            = lv
-        dest["bms"]["soe_bat_temp"]           = batT
-        dest["bms"]["soe_max_discharge_current"] = maxDis
-        dest["bms"]["soe_max_regen_current"]     = maxReg
+        dest["bms"]["battery_temp"]           = batT
+        dest["bms"]["max_discharge_current"]  = maxDis
+        dest["bms"]["max_regen_current"]      = maxReg
 
         # corners
         dest["corners"][0]["wheel_speed"]        = ws0
@@ -151,9 +184,6 @@ class FrontDAQParser(BaseParser):
 
         n = len(data) // LINE_SIZE
         db = CarDB(n)
-        mv = memoryview(data)
-        for idx in range(n):
-            start = idx * LINE_SIZE
-            self._decode_record(mv[start : start + LINE_SIZE], db._db[idx])
+        self.decode_into(memoryview(data), db._db)
 
         return db
@@ -5,6 +5,7 @@ import numpy as np
 from analysis.common.parser_registry import ParserVersion, parser_class, BaseParser
 from analysis.common.car_db import CarDB, car_snapshot_dtype
 
+from analysis.common.parsers.bulk import BulkLayout
 from analysis.common.parsers.fmt_front_daq_002 import fmt
 
 # ─── constants ────────────────────────────────────────────────────────────────
@@ -32,9 +33,61 @@ DATA_FMT = f"{NUM_TEMP_CELLS}f{NUM_VOLT_CELLS}f"
 LINE_FMT = "<I" + DRIVE_FMT + DATA_FMT
 LINE_SIZE = struct.calcsize(LINE_FMT)
 
+# ─── the same mapping as _decode_record, value by value, for whole-array decoding ──
+CORNERS = range(4)
+BULK_FIELDS = [
+    ("time.time_since_startup", 1),
+    # BMS faults (8 bools), ECU implausibility flags (5 bools)
+    ("bms.fault_summary", 1),
+    *[(f"bms.{name}_fault", 1) for name in (
+        "undervoltage", "overvoltage", "undertemperature", "overtemperature", "overcurrent", "external_kill", "open_wire"
+    )],
+    ("ecu.implausibilities", ECU_FAULT_COUNT),
+    # BMS "summary" floats, corners, PDM amps (25 floats)
+    ("bms.battery_voltage", 1), ("pdm.bat_voltage", 1), ("bms.battery_temp", 1),
+    ("bms.max_cell_temp", 1), ("bms.min_cell_temp", 1), ("bms.max_cell_voltage", 1), ("bms.min_cell_voltage", 1),
+    ("bms.max_discharge_current", 1), ("bms.max_regen_current", 1), ("bms.soc", 1),
+    *[(f"corners[{c}].wheel_speed", 1) for c in CORNERS],
+    *[(f"corners[{c}].wheel_displacement", 1) for c in CORNERS],
+    *[(f"corners[{c}].pr_strain", 1) for c in CORNERS],
+    ("pdm.gen_amps", 1), ("pdm.fan_amps", 1), ("pdm.pump_amps", 1),
+    # inverter, brakes and APPS (11 ints)
+    (None, 1),  # bmsFaultsRaw
+    ("inverter.rpm", 1), ("inverter.motor_current", 1), ("inverter.dc_voltage", 1), ("inverter.dc_current", 1),
+    ("ecu.front_brake_pressure", 1), ("ecu.rear_brake_pressure", 1), ("ecu.apps1_throttle", 1), ("ecu.apps2_throttle", 1),
+    ("inverter.igbt_temp", 1), ("inverter.motor_temp", 1),
+    # state bytes (5), brake / LV / efuse bools (4)
+    ("ecu.drive_state", 1), ("bms.bms_state", 1), ("bms.imd_state", 1), (None, 1), ("ecu.bms_command", 1),
+    ("ecu.brake_pressed", 1), ("pdm.bat_voltage_warning", 1), ("pdm.gen_efuse_triggered", 1), ("pdm.pump_efuse_triggered", 1),
+    # Ah/Wh drawn/charged, set currents
+    ("inverter.ah_drawn", 1), ("inverter.ah_charged", 1), ("inverter.wh_drawn", 1), ("inverter.wh_charged", 1),
+    ("ecu.set_current", 1), ("ecu.set_current_brake", 1),
+    # pump/fan duty, aero, LUT id, resets, temp limiting, torque
+    ("ecu.pump_duty_cycle", 1), ("ecu.fan_duty_cycle", 1), ("ecu.active_aero_state", 1), ("ecu.active_aero_position", 1),
+    ("ecu.accel_lut_id_response", 1), ("pdm.reset_gen_efuse", 1), ("pdm.reset_ac_efuse", 1),
+    ("ecu.igbt_temp_limiting", 1), ("ecu.battery_temp_limiting", 1), ("ecu.motor_temp_limiting", 1), ("ecu.torque_status", 1),
+    # tire temperatures (fl, fr, bl, br × 8), then speed/displacement/load per corner
+    *[(f"corners[{c}].wheel_temperature", 8) for c in CORNERS],
+    *[(f"corners[{c}].{name}", 1) for c in CORNERS for name in ("wheel_speed", "wheel_displacement", "pr_strain")],
+    (None, 4),  # file & LUT metadata
+    (None, 30 * 2),  # LUT points (x_n, y_n)
+    ("dynamics.imu.accel", 3), ("dynamics.imu.vel", 3), ("dynamics.air_speed", 8),
+    ("dynamics.coolant_flow", 1), (None, 1),
+    ("dynamics.coolant_temps", 2),
+    ("time.unix_time", 1), ("dynamics.gps_location", 2),
+    (None, 22),  # statuses
+    ("dynamics.steering_angle", 1),
+    ("bms.cell_temps", NUM_TEMP_CELLS), ("bms.cell_voltages", NUM_VOLT_CELLS),
+    (None, NUM_TEMP_CELLS + NUM_VOLT_CELLS),  # DATA_FMT: the cell arrays again
+]
+
 
 @parser_class(ParserVersion("NFR25", 0, 0, 2))
 class FullDAQParser(BaseParser):
+    HEADER_SIZE = PREAMBLE_LEN + VERSION_BYTES + SKIP_BYTES
+    RECORD_SIZE = LINE_SIZE
+    BULK_LAYOUT = BulkLayout(LINE_FMT, BULK_FIELDS)
+
     def _decode_record(self, raw: memoryview, dest: np.void) -> None:
         # Unpack everything in one shot
         vals = struct.unpack_from(LINE_FMT, raw)
@@ -309,8 +362,5 @@ class FullDAQParser(BaseParser):
         n = len(data) // LINE_SIZE
         print(f"Parsing {n} records from {filename} ({len(data)} bytes)")
         db = CarDB(n)
-        mv = memoryview(data)
-        for idx in range(n):
-            start = idx * LINE_SIZE
-            self._decode_record(mv[start : start + LINE_SIZE], db._db[idx])
+        self.decode_into(memoryview(data), db._db)
         return db
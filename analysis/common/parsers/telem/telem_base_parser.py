@@ -1,19 +1,22 @@
 from __future__ import annotations
 import struct
 import numpy as np
-import yaml
 from pprint import pprint
-import jinja2
 import builtins
 from typing import Any, Dict
 
 from analysis.common.parser_registry import ParserVersion, parser_class, BaseParser
 
+import io
+import os
 import struct
-from typing import List, Dict
+from typing import BinaryIO, List, Dict, Tuple
 
 from analysis.common.parser_registry import ParserVersion, parser_class, BaseParser
-from analysis.common.car_db        import CarDB
+from analysis.common.car_db        import CarDB, parse_channel_path
+from analysis.common.profiling     import Progress, stage
+from analysis.common.segmented     import SEGMENT_SNAPSHOTS, SegmentedCarDB
+from analysis.common.parsers.telem.frame_decoder import TelemFrameDecoder
 
 from analysis.common.parsers.telem.telem import (
     TelemTokenReader,
@@ -30,6 +33,9 @@ class DataMapper:
     def map_snapshots(self, snapshots: List[Dict[str, Any]], db: CarDB) -> CarDB:
         pass
 
+    def map_columns(self, columns: Dict[str, np.ndarray], db: CarDB) -> CarDB:
+        pass
+
 
 # Assuming DataMapper and CarDB are defined elsewhere in your codebase
 class YamlDataMapper(DataMapper):
@@ -43,6 +49,9 @@ class YamlDataMapper(DataMapper):
     """
     def __init__(self, mapping_filename: str):
         # Load and render Jinja2 template
+        import jinja2  # only mapping files need these; keep them out of every parser import
+        import yaml
+
         print(f"Loading mapping file: {mapping_filename}")
         with open(mapping_filename, 'r') as mf:
             content = mf.read()
@@ -66,13 +75,7 @@ class YamlDataMapper(DataMapper):
 
     def _set_value(self, row: np.ndarray, path: str, value: Any):
         # split into (name,idx) tuples
-        parts = []
-        for segment in path.split('.'):
-            if '[' in segment:
-                base, idx = segment[:-1].split('[')
-                parts.append((base, int(idx)))
-            else:
-                parts.append((segment, None))
+        parts = parse_channel_path(path)
 
         # drill into everything but the last part
         current = row
@@ -93,44 +96,114 @@ class YamlDataMapper(DataMapper):
         underlying numpy CarDB buffer according to self.mapping.
         """
         print("Mapping telemetry snapshots to CarDB.")
-        for idx, snap in enumerate(snapshots):
-            row = db._db[idx]
-
-            if idx % 100 == 0:
-                print(f"Processing record {idx + 1}/{len(snapshots)}")
-
-            for src_key, value in snap.items():
-
-                parts = src_key.split('.')
-                if len(parts) < 3:
-                    # if this is a single part key, then just use that to set the value in the cardb row
-                    self._set_value(row, src_key, value)
-                    continue
-
-                # Construct target path from mapping
-                # check if the index [board][message][signal] exists in the mapping
-                board, message, signal = parts[0], parts[1], parts[2]
-                board_mapping = self.mapping.get(board, {})
-                message_mapping = board_mapping.get(message, {})
-                signal_mapping = message_mapping.get(signal, None)
-                if signal_mapping is None:
-                    # If no mapping exists, skip this signal
-                    # print(f"Skipping unmapped signal: {src_key}")
-                    continue
-
-                if signal_mapping == '???':
-                    # If the mapping is '???', skip this signal
-                    # print(f"Skipping signal with '???' mapping: {src_key}")
-                    continue
-
-                # print(f"Mapping {src_key} to {signal_mapping} with value {value}")
+        progress = Progress("Mapping records", total=len(snapshots))
+        with stage("map", records=len(snapshots)):
+            for idx, snap in enumerate(snapshots):
+                row = db._db[idx]
+
+                if idx >= progress.due:
+                    progress.report(idx + 1)
+
+                for src_key, value in snap.items():
+
+                    parts = src_key.split('.')
+                    if len(parts) < 3:
+                        # if this is a single part key, then just use that to set the value in the cardb row
+                        self._set_value(row, src_key, value)
+                        continue
+
+                    # Construct target path from mapping
+                    # check if the index [board][message][signal] exists in the mapping
+                    board, message, signal = parts[0], parts[1], parts[2]
+                    board_mapping = self.mapping.get(board, {})
+                    message_mapping = board_mapping.get(message, {})
+                    signal_mapping = message_mapping.get(signal, None)
+                    if signal_mapping is None:
+                        # If no mapping exists, skip this signal
+                        # print(f"Skipping unmapped signal: {src_key}")
+                        continue
+
+                    if signal_mapping == '???':
+                        # If the mapping is '???', skip this signal
+                        # print(f"Skipping signal with '???' mapping: {src_key}")
+                        continue
+
+                    # print(f"Mapping {src_key} to {signal_mapping} with value {value}")
         
-                # now use the signal_mapping to use that attribute in the CarDB
-                self._set_value(row, signal_mapping, value)
+                    # now use the signal_mapping to use that attribute in the CarDB
+                    self._set_value(row, signal_mapping, value)
+            progress.finish(len(snapshots))
 
         return db
 
+    def target_path(self, src_key: str):
+        """The CarDB channel a source key maps to, or None if it is unmapped."""
+        parts = src_key.split('.')
+        if len(parts) < 3:
+            return src_key
+        board, message, signal = parts[0], parts[1], parts[2]
+        target = self.mapping.get(board, {}).get(message, {}).get(signal, None)
+        return None if target in (None, '???') else target
 
+    def map_columns(self, columns: Dict[str, np.ndarray], db: CarDB) -> CarDB:
+        """
+        Like map_snapshots, but for whole columns (source_key -> one value per snapshot,
+        see TelemFrameDecoder.decode): one numpy assignment per mapped signal.
+        """
+        with stage("map", records=len(db)):
+            for src_key, column in columns.items():
+                target = self.target_path(src_key)
+                if target is not None:
+                    db.channel(target)[:] = column
+        return db
+
+
+TELEM_HEADER_PEEK = 1 << 20  # the embedded telem config is well within the first MB
+
+
+def split_telem_log(raw: bytes) -> Tuple[str, int]:
+    """
+    Locate the telemetry config embedded at the start of a log written by SDLogger
+    (from the first board ('>') line to the last signal ('>>>') line).
+    Returns (config text, offset of the first snapshot frame).
+    """
+    start = None
+    end = None
+    stream = io.BytesIO(raw)
+    while True:
+        pos = stream.tell()
+        line = stream.readline()
+        if not line:
+            break
+        try:
+            text = line.decode("utf-8")
+        except UnicodeDecodeError:
+            # reached binary region
+            break
+        stripped = text.lstrip()
+        if start is None and (stripped.startswith(">") or stripped.startswith("!!")):
+            start = pos
+        if start is not None and stripped.startswith(">>>"):
+            end = stream.tell()
+    if start is None or end is None:
+        raise ValueError("Failed to locate telemetry config in log file")
+
+    # weird, but offset by 4 bytes
+    return raw[start:end].decode("utf-8"), end + 4
+
+
+def read_telem_header(fh: BinaryIO) -> Tuple[str, int]:
+    """split_telem_log on the first TELEM_HEADER_PEEK bytes of an open log, without reading its frames."""
+    fh.seek(0)
+    return split_telem_log(fh.read(TELEM_HEADER_PEEK))
+
+
+def build_telem_config(cfg_text: str) -> TelemTelemetryConfig:
+    """Compile telemetry config text into its schema."""
+    with stage("telem schema", bytes=len(cfg_text)):
+        rdr = TelemTokenReader(cfg_text)
+        tok = TelemTokenizer(rdr)
+        return TelemBuilder(tok).build()
 
 
 class TelemDAQParserBase(BaseParser):
@@ -153,40 +226,11 @@ class TelemDAQParserBase(BaseParser):
         # Read all bytes
         raw = open(log_filename, "rb").read()
 
-        # Find embedded config boundaries
-        start = None
-        end = None
-        import io
-
-        stream = io.BytesIO(raw)
-        while True:
-            pos = stream.tell()
-            line = stream.readline()
-            if not line:
-                break
-            try:
-                text = line.decode("utf-8")
-            except UnicodeDecodeError:
-                # reached binary region
-                break
-            stripped = text.lstrip()
-            if start is None and (stripped.startswith(">") or stripped.startswith("!!")):
-                start = pos
-            if start is not None and stripped.startswith(">>>"):
-                end = stream.tell()
-        if start is None or end is None:
-            raise ValueError("Failed to locate telemetry config in log file")
-
-        # Extract and decode config
-        cfg_bytes = raw[start:end]
-        print(f"Num config bytes: {len(cfg_bytes)}")
-        cfg_text = cfg_bytes.decode("utf-8")
-        # print(cfg_text)
+        cfg_text, data_start = split_telem_log(raw)
+        print(f"Num config bytes: {len(cfg_text)}")
 
         # Build telemetry schema
-        rdr = TelemTokenReader(cfg_text)
-        tok = TelemTokenizer(rdr)
-        config = TelemBuilder(tok).build()
+        config = build_telem_config(cfg_text)
 
         # Prepare data parser
         parser = TelemDataParser(config)
@@ -196,10 +240,7 @@ class TelemDAQParserBase(BaseParser):
         print(f"Snapshot length: {record_len} (time : {8}, frame {rec_bytes})")
 
         records: List[Dict[str, Any]] = []
-        # weird, but offset by 4 bytes
-        end += 4
-
-        data_region = raw[end:]
+        data_region = raw[data_start:]
 
         # the data region must be a multiple of record_len
         if len(data_region) % record_len != 0:
@@ -208,24 +249,27 @@ class TelemDAQParserBase(BaseParser):
         count = len(data_region) // record_len
         print(f"Found {count} records in data region of length {len(data_region)}")
 
-        for i in range(count):
-            off = i * record_len
-            block = data_region[off : off + record_len]
-            time_since = struct.unpack_from("<I", block, 0)[0]
-            unix_time = struct.unpack_from("<I", block, 4)[0]
-            buf_bytes = block[8 : 8 + rec_bytes]
+        progress = Progress("Parsing records", total=count)
+        with stage("telem decode", bytes=count * record_len, records=count):
+            for i in range(count):
+                off = i * record_len
+                block = data_region[off : off + record_len]
+                time_since = struct.unpack_from("<I", block, 0)[0]
+                unix_time = struct.unpack_from("<I", block, 4)[0]
+                buf_bytes = block[8 : 8 + rec_bytes]
 
-            bitbuf = TelemBitBuffer(bit_size=parser.total_bits, buffer=bytearray(buf_bytes))
-            vals = parser.parse_snapshot(bitbuf)
+                bitbuf = TelemBitBuffer(bit_size=parser.total_bits, buffer=bytearray(buf_bytes))
+                vals = parser.parse_snapshot(bitbuf)
 
-            rec = {"time.time_since_startup": str(time_since), "time.unix_time": str(unix_time)}
-            rec.update(vals)
-            records.append(rec)
+                rec = {"time.time_since_startup": str(time_since), "time.unix_time": str(unix_time)}
+                rec.update(vals)
+                records.append(rec)
 
-            if i % 100 == 0:
-                print(f"Parsed record {i + 1}/{count}")
-            # pprint(rec)
+                if i >= progress.due:
+                    progress.report(i + 1)
+                # pprint(rec)
 
+            progress.finish(count)
 
         return records
     
@@ -233,4 +277,28 @@ class TelemDAQParserBase(BaseParser):
         mapper = self.get_mapper()
         snapshots = self._parse_log(filename)
         db = CarDB(len(snapshots))
-        return mapper.map_snapshots(snapshots, db)
\ No newline at end of file
+        return mapper.map_snapshots(snapshots, db)
+
+    def parse_segmented(self, filename: str, segment: int = SEGMENT_SNAPSHOTS) -> SegmentedCarDB:
+        """
+        Like parse(), into a SegmentedCarDB: only the header is read whole, then one
+        segment of frames at a time is read, decoded column-wise (TelemFrameDecoder)
+        and mapped with map_columns, so neither the file nor per-record dicts are
+        ever held and only one segment's columns are alive.
+        """
+        db = SegmentedCarDB(segment)
+        with open(filename, "rb") as fh:
+            cfg_text, data_start = read_telem_header(fh)
+            decoder = TelemFrameDecoder(build_telem_config(cfg_text))
+            mapper = self.get_mapper()
+
+            n_frames = max(os.path.getsize(filename) - data_start, 0) // decoder.frame_size
+            fh.seek(data_start)
+            for _ in range(0, n_frames, segment):
+                columns = decoder.decode(fh.read(segment * decoder.frame_size))  # a trailing partial frame is ignored
+                done = 0
+                for records in db.grow(len(columns["time.time_since_startup"])):
+                    part = {key: col[done : done + len(records)] for key, col in columns.items()}
+                    mapper.map_columns(part, CarDB.from_array(records))
+                    done += len(records)
+        return db
@@ -0,0 +1,226 @@
+"""
+Stage timings, rate-limited progress and cProfile output (see daq.py --timings / --profile).
+
+Parsers, mappers and sinks wrap their work in named stage spans:
+
+    with stage("decode", bytes=len(data)) as span:
+        ...
+        span.records = n
+
+Every span adds its wall time, CPU time, bytes and records to a per-run total for
+its name; summary() renders them as a table (nested spans are indented under the
+span they ran in). A span costs two clock reads, so stages are whole passes over a
+log, never single records.
+
+Long loops report progress through a Progress instead of printing every N
+records. The loop only compares its counter against progress.due, an int, and
+calls report() when it is reached, so the clock is read a few times per interval
+and nothing per record shows up in a profile:
+
+    progress = Progress("Decoding", total=n)
+    for i in range(n):
+        ...
+        if i >= progress.due:
+            progress.report(i + 1)
+"""
+
+from __future__ import annotations
+
+import contextlib
+import cProfile
+import os
+import pstats
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+PROGRESS_INTERVAL_S = 2.0  # at most one progress line per interval
+COLLAPSED_SUFFIXES = (".folded", ".collapsed", ".txt")  # --profile files written as collapsed stacks
+
+
+@dataclass
+class Span:
+    name: str
+    depth: int  # nesting level of its first occurrence
+    seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    bytes: int = 0
+    records: int = 0
+    calls: int = 0
+
+
+_totals: Dict[str, Span] = {}
+_depth = 0
+
+
+@contextlib.contextmanager
+def stage(name: str, bytes: int = 0, records: int = 0) -> Iterator[Span]:
+    """Time the block as one occurrence of stage `name`; set bytes/records on the yielded span."""
+    global _depth
+    span = Span(name, _depth, bytes=bytes, records=records, calls=1)
+    total = _totals.setdefault(name, Span(name, _depth))
+    _depth += 1
+    t0, c0 = time.perf_counter(), time.process_time()
+    try:
+        yield span
+    finally:
+        _depth -= 1
+        total.seconds += time.perf_counter() - t0
+        total.cpu_seconds += time.process_time() - c0
+        total.bytes += span.bytes
+        total.records += span.records
+        total.calls += 1
+
+
+def spans() -> List[Span]:
+    """Totals of every stage run since the last reset(), in order of first use."""
+    return list(_totals.values())
+
+
+def reset() -> None:
+    _totals.clear()
+
+
+def summary() -> str:
+    header = f"{'stage':<30} {'calls':>6} {'wall':>10} {'cpu':>10} {'records':>10} {'MB':>8} {'records/s':>12} {'MB/s':>8}"
+    lines = [header, "-" * len(header)]
+    for s in spans():
+        rate = s.records / s.seconds if s.seconds > 0 else 0.0
+        mb_rate = s.bytes / 1e6 / s.seconds if s.seconds > 0 else 0.0
+        lines.append(
+            f"{'  ' * s.depth + s.name:<30} {s.calls:>6} {s.seconds * 1000:>8.1f}ms {s.cpu_seconds * 1000:>8.1f}ms "
+            f"{s.records:>10} {s.bytes / 1e6:>8.2f} {rate:>12,.0f} {mb_rate:>8.1f}"
+        )
+    if not _totals:
+        lines.append("(no stages ran)")
+    return "\n".join(lines)
+
+
+# ——— Progress ———
+class Progress:
+    def __init__(self, label: str, total: Optional[int] = None, interval: float = PROGRESS_INTERVAL_S):
+        self.label = label
+        self.total = total
+        self.interval = interval
+        self.due = 1  # counter value at which the loop should call report() next
+        self._start = self._last = time.monotonic()
+        self._reported = False
+
+    def report(self, done: int) -> None:
+        """Print a progress line if `interval` has passed since the last one, and set the next due."""
+        now = time.monotonic()
+        if now - self._last >= self.interval:
+            of = f"/{self.total}" if self.total is not None else ""
+            print(f"{self.label}: {done}{of} ({done / (now - self._start):,.0f}/s)")
+            self._last = now
+            self._reported = True
+        rate = done / max(now - self._start, 1e-9)
+        self.due = done + max(1, int(rate * self.interval / 4))  # look at the clock ~4x per interval
+
+    def finish(self, done: int) -> None:
+        """A closing line for loops long enough to have reported progress."""
+        if self._reported:
+            print(f"{self.label}: {done} done in {time.monotonic() - self._start:.1f} s")
+
+
+# ——— cProfile ———
+def _label(func: tuple) -> str:
+    filename, line, name = func
+    if filename == "~":  # builtins
+        return name.replace(";", ",")
+    return f"{name} ({os.path.basename(filename)}:{line})".replace(";", ",")
+
+
+def write_collapsed(stats: pstats.Stats, path: str) -> None:
+    """
+    Write stats as collapsed stacks ("a;b;c <microseconds>" per line) for
+    flamegraph.pl or speedscope. cProfile only records caller/callee pairs, so
+    each caller's own stack is reconstructed along its heaviest callers: exact
+    for code reached one way, an approximation for code called from many places.
+    """
+    raw = stats.stats  # func -> (cc, nc, tottime, cumtime, callers)
+
+    chains: Dict[tuple, List[str]] = {}
+
+    def chain(func: tuple) -> List[str]:
+        if func not in chains:
+            chains[func] = [_label(func)]  # placeholder that also stops recursion cycles
+            callers = raw.get(func, (0, 0, 0, 0, {}))[4]
+            if callers:
+                parent = max(callers, key=lambda c: callers[c][3])
+                chains[func] = chain(parent) + [_label(func)]
+        return chains[func]
+
+    folded: Dict[str, int] = defaultdict(int)
+    for func, (_, _, tottime, _, callers) in raw.items():
+        if not callers:
+            folded[";".join(chain(func))] += int(tottime * 1e6)
+            continue
+        for caller, (_, _, edge_tottime, _) in callers.items():
+            folded[";".join(chain(caller) + [_label(func)])] += int(edge_tottime * 1e6)
+
+    with open(path, "w") as f:
+        for stack, us in sorted(folded.items()):
+            if us > 0:
+                f.write(f"{stack} {us}\n")
+
+
+def run_profiled(fn: Callable[[], None], path: str, top: int = 20) -> None:
+    """
+    Run fn under cProfile, then save the profile to path (pstats, or collapsed
+    stacks for a COLLAPSED_SUFFIXES file) and print the top functions by
+    cumulative time. The profile is saved even when fn raises or exits.
+    """
+    profiler = cProfile.Profile()
+    try:
+        profiler.runcall(fn)
+    finally:
+        stats = pstats.Stats(profiler)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if path.endswith(COLLAPSED_SUFFIXES):
+            write_collapsed(stats, path)
+        else:
+            stats.dump_stats(path)
+        print(f"\nProfile written to {path}")
+        stats.sort_stats("cumulative").print_stats(top)
+
+
+# ——— Import times ———
+def parse_importtime(text: str) -> List[Tuple[str, int, int, int]]:
+    """(module, self us, cumulative us, depth) of every line `python -X importtime` wrote to stderr."""
+    rows = []
+    for line in text.splitlines():
+        parts = line[len("import time:") :].split("|")
+        if not line.startswith("import time:") or len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # not an importtime line, or its header
+        name = parts[2][1:]  # one space, then two more per nesting level
+        rows.append((name.strip(), int(parts[0]), int(parts[1]), (len(name) - len(name.lstrip())) // 2))
+    return rows
+
+
+def import_time_report(script: str, argv: List[str], top: int = 15) -> int:
+    """
+    Run `python -X importtime script argv...`, pass its own output through, then
+    print the slowest top-level imports (cumulative) and the packages that cost
+    the most (self time summed per top-level package). Returns the run's exit code.
+    """
+    proc = subprocess.run([sys.executable, "-X", "importtime", script, *argv], stderr=subprocess.PIPE, text=True)
+    rows = parse_importtime(proc.stderr)
+    sys.stderr.write("".join(l + "\n" for l in proc.stderr.splitlines() if not l.startswith("import time:")))
+
+    total = sum(r[1] for r in rows)
+    print(f"\n{len(rows)} modules imported in {total / 1000:.1f} ms")
+    print(f"\n{'slowest top-level imports':<50} {'cumulative':>12}")
+    for name, _, cum, _ in sorted((r for r in rows if r[3] == 0), key=lambda r: -r[2])[:top]:
+        print(f"{name:<50} {cum / 1000:>10.1f}ms")
+
+    packages: Dict[str, int] = defaultdict(int)
+    for name, self_us, _, _ in rows:
+        packages[name.split(".")[0]] += self_us
+    print(f"\n{'package':<50} {'self':>12}")
+    for name, us in sorted(packages.items(), key=lambda p: -p[1])[:top]:
+        print(f"{name:<50} {us / 1000:>10.1f}ms")
+    return proc.returncode
@@ -0,0 +1,226 @@
+"""
+Multi-resolution min/max/mean pyramid of every CarDB channel.
+
+Level 0 summarises buckets of min_bucket snapshots and every following level
+doubles the bucket size, so any index range can be drawn at any zoom level by
+reading about as many buckets as there are pixels. The pyramid is stored as a
+sidecar next to the transformed output (log_836.csv -> log_836.pyramid.npz),
+one member per channel holding its (min, max, mean) rows of every level, so the
+app reads only the channels it plots.
+"""
+
+from __future__ import annotations
+
+import itertools
+import os
+import zipfile
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from analysis.common.car_db import CarDB, all_channel_paths
+
+PYRAMID_SUFFIX = ".pyramid.npz"
+MIN_BUCKET = 32  # snapshots per bucket at level 0 (power of two)
+ROW_CHUNK = 1 << 16  # snapshots converted to float64 at a time, bounds peak memory
+_LENGTH_KEY = "_n_snapshots"
+_BUCKET_KEY = "_min_bucket"
+
+
+def pyramid_path(output_path: str) -> str:
+    """Sidecar path for a transformed output, e.g. out/day/log_1.csv -> out/day/log_1.pyramid.npz"""
+    return os.path.splitext(output_path)[0] + PYRAMID_SUFFIX
+
+
+class PyramidSlice(NamedTuple):
+    starts: np.ndarray  # first snapshot index of each bucket
+    mins: np.ndarray
+    maxs: np.ndarray
+    means: np.ndarray
+    bucket: int  # snapshots per bucket
+
+
+def level_sizes(n_snapshots: int, min_bucket: int) -> List[int]:
+    """Buckets per level, from level 0 down to the single bucket covering the whole log."""
+    sizes = [-(-n_snapshots // min_bucket)]
+    while sizes[-1] > 1:
+        sizes.append(-(-sizes[-1] // 2))
+    return sizes
+
+
+def _summarise(col: np.ndarray, bucket: int):
+    """Level-0 min/max/sum/count of one channel, ROW_CHUNK snapshots at a time; NaNs are ignored."""
+    n_buckets = -(-len(col) // bucket)
+    mins, maxs, sums = (np.empty(n_buckets) for _ in range(3))
+    counts = np.empty(n_buckets, dtype=np.int64)
+    rows = max(ROW_CHUNK // bucket, 1) * bucket
+    for r in range(0, len(col), rows):
+        block = col[r : r + rows].astype(np.float64)
+        pad = -len(block) % bucket
+        if pad:
+            block = np.concatenate([block, np.full(pad, np.nan)])
+        block = block.reshape(-1, bucket)
+        valid = ~np.isnan(block)
+        out = slice(r // bucket, r // bucket + len(block))
+        mins[out] = np.fmin.reduce(block, axis=1)
+        maxs[out] = np.fmax.reduce(block, axis=1)
+        sums[out] = np.where(valid, block, 0.0).sum(axis=1)
+        counts[out] = valid.sum(axis=1)
+    return mins, maxs, sums, counts
+
+
+def _coarsen(mins, maxs, sums, counts):
+    """Merge neighbouring bucket pairs into the next level."""
+    if len(mins) % 2:
+        mins, maxs = np.append(mins, np.nan), np.append(maxs, np.nan)
+        sums, counts = np.append(sums, 0.0), np.append(counts, 0)
+    return (
+        np.fmin(mins[0::2], mins[1::2]),
+        np.fmax(maxs[0::2], maxs[1::2]),
+        sums[0::2] + sums[1::2],
+        counts[0::2] + counts[1::2],
+    )
+
+
+def _means(sums, counts):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+
+def channel_levels(col: np.ndarray, min_bucket: int = MIN_BUCKET) -> np.ndarray:
+    """
+    The pyramid of one channel as a (3, total buckets) array: min, max and mean
+    rows with every level's buckets one after the other, level 0 first.
+    """
+    stats = _summarise(col, min_bucket)
+    levels = [stats]
+    while len(stats[0]) > 1:
+        stats = _coarsen(*stats)
+        levels.append(stats)
+    return np.stack([
+        np.concatenate([lvl[0] for lvl in levels]),
+        np.concatenate([lvl[1] for lvl in levels]),
+        np.concatenate([_means(lvl[2], lvl[3]) for lvl in levels]),
+    ])
+
+
+def _write(path: str, n_snapshots: int, min_bucket: int, members: Iterable[Tuple[str, np.ndarray]]) -> None:
+    """One compressed .npy member per channel, written as they come (the layout np.savez_compressed produces)."""
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED, allowZip64=True) as zf:
+        for name, array in itertools.chain([(_LENGTH_KEY, np.array(n_snapshots)), (_BUCKET_KEY, np.array(min_bucket))], members):
+            with zf.open(name + ".npy", "w", force_zip64=True) as member:
+                np.lib.format.write_array(member, array, allow_pickle=False)
+
+
+def write_pyramid(db: CarDB, path: str, channels: Optional[List[str]] = None, min_bucket: int = MIN_BUCKET) -> None:
+    """
+    Build and save the pyramid of db (default: all raw and derived channels)
+    one channel at a time, so only one channel's levels are in memory beyond db.
+    """
+    if min_bucket & (min_bucket - 1):
+        raise ValueError(f"min_bucket must be a power of two, got {min_bucket}")
+    channels = all_channel_paths() if channels is None else channels
+    _write(path, len(db), min_bucket, ((p, channel_levels(db.channel(p), min_bucket)) for p in channels))
+
+
+class ChannelPyramid:
+    def __init__(self, channels: List[str], n_snapshots: int, min_bucket: int, stats: Optional[Dict[str, np.ndarray]] = None, npz=None):
+        # per channel, a (3, total buckets) array from channel_levels(); read from npz on first use when loaded
+        self.channels = list(channels)
+        self.n_snapshots = n_snapshots
+        self.min_bucket = min_bucket
+        self._stats: Dict[str, np.ndarray] = dict(stats or {})
+        self._npz = npz
+        sizes = level_sizes(n_snapshots, min_bucket)
+        self._offsets = np.cumsum([0] + sizes)
+
+    @property
+    def bucket_sizes(self) -> List[int]:
+        return [self.min_bucket << k for k in range(len(self._offsets) - 1)]
+
+    @staticmethod
+    def build(db: CarDB, channels: Optional[List[str]] = None, min_bucket: int = MIN_BUCKET) -> "ChannelPyramid":
+        """Build every level for every channel (default: all raw and derived channels) in memory."""
+        if min_bucket & (min_bucket - 1):
+            raise ValueError(f"min_bucket must be a power of two, got {min_bucket}")
+        channels = all_channel_paths() if channels is None else list(channels)
+        return ChannelPyramid(channels, len(db), min_bucket, {p: channel_levels(db.channel(p), min_bucket) for p in channels})
+
+    def save(self, path: str) -> None:
+        _write(path, self.n_snapshots, self.min_bucket, ((p, self._channel(p)) for p in self.channels))
+
+    @staticmethod
+    def load(path: str) -> "ChannelPyramid":
+        """Open a saved pyramid; each channel is read the first time it is queried."""
+        npz = np.load(path)
+        try:
+            channels = [k for k in npz.files if k not in (_LENGTH_KEY, _BUCKET_KEY)]
+            return ChannelPyramid(channels, int(npz[_LENGTH_KEY]), int(npz[_BUCKET_KEY]), npz=npz)
+        except KeyError:
+            npz.close()
+            raise ValueError(f"{path} is not a pyramid sidecar (written by an older version?)")
+
+    def close(self) -> None:
+        if self._npz is not None:
+            self._npz.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _channel(self, channel: str) -> np.ndarray:
+        stats = self._stats.get(channel)
+        if stats is None:
+            if self._npz is None or channel not in self._npz.files:
+                raise KeyError(f"Unknown channel '{channel}'")
+            stats = self._stats[channel] = self._npz[channel]
+        return stats
+
+    def level(self, channel: str, level: int) -> np.ndarray:
+        """(3, n_buckets) min, max and mean rows of one channel at one level."""
+        level = range(len(self._offsets) - 1)[level]
+        return self._channel(channel)[:, self._offsets[level] : self._offsets[level + 1]]
+
+    def _level_for(self, span: int, max_points: int) -> int:
+        """The finest level that draws span snapshots in at most max_points buckets."""
+        for k, bucket in enumerate(self.bucket_sizes):
+            if span / bucket <= max_points:
+                return k
+        return len(self.bucket_sizes) - 1
+
+    def query(self, channel: str, start: int = 0, stop: Optional[int] = None, max_points: int = 2000) -> Optional[PyramidSlice]:
+        """
+        Summarise snapshots [start, stop) of one channel in at most ~max_points buckets,
+        using the finest level that fits. Returns None when the range is short enough
+        that the raw samples should be drawn instead.
+        """
+        stop = self.n_snapshots if stop is None else min(stop, self.n_snapshots)
+        start = max(start, 0)
+        span = stop - start
+        if span <= max_points or not self.n_snapshots:
+            return None
+
+        level = self._level_for(span, max_points)
+        bucket = self.bucket_sizes[level]
+        b0, b1 = start // bucket, -(-stop // bucket)
+        mins, maxs, means = self.level(channel, level)[:, b0:b1]
+        return PyramidSlice(np.arange(b0, b1) * bucket, mins, maxs, means, bucket)
+
+    def index_range(self, channel: str, x0: float, x1: float, max_points: int = 2000) -> Optional[Tuple[int, int]]:
+        """
+        Snapshots [start, stop) covering x0 <= value <= x1 of a channel that never
+        decreases (a clock), to bucket precision at the level query() would use for
+        the whole log. None if the channel does decrease (or has gaps) at that level.
+        """
+        if not self.n_snapshots:
+            return 0, 0
+        level = self._level_for(self.n_snapshots, max_points)
+        bucket = self.bucket_sizes[level]
+        mins, maxs, _ = self.level(channel, level)
+        if np.isnan(mins).any() or np.any(maxs[:-1] > mins[1:]):
+            return None
+        b0 = int(np.searchsorted(maxs, x0, side="left"))
+        b1 = int(np.searchsorted(mins, x1, side="right"))
+        return min(b0 * bucket, self.n_snapshots), min(max(b1, b0) * bucket, self.n_snapshots)
@@ -0,0 +1,343 @@
+"""
+Vectorized condition search over one or many logs.
+
+A query is a Python-like boolean expression over CarDB dotted channel paths:
+
+    ecu.front_brake_pressure > 1000 and abs(dynamics.steering_angle) > 20
+    changed(bms.imd_state) or corners[0].wheel_speed - corners[1].wheel_speed > 5
+
+Supported: and / or / not (or & | ~), comparisons (chains too), + - * /,
+abs(x) and changed(x) (true where x differs from the previous sample; NaN to
+NaN is no change, the same rule the zone maps count changes by).
+Every log is evaluated as whole-channel numpy operations, only over the chunks
+its zone maps can't rule out, and the True runs come back as time segments.
+"""
+
+from __future__ import annotations
+
+import ast
+import operator
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional, Set, Tuple
+
+import numpy as np
+
+from analysis.common.car_db import all_channel_paths
+from analysis.common.columnar import ColumnStore, columns_path
+from analysis.common.parser_registry import ParserRegistry
+from analysis.common.zone_maps import (
+    And,
+    Changed,
+    Compare,
+    Or,
+    Predicate,
+    ZoneMap,
+    candidate_chunks,
+    candidate_logs,
+    changes,
+    zone_path,
+)
+
+TIME_CHANNEL = "time.time_since_startup"
+
+_COMPARE = {ast.Gt: ">", ast.GtE: ">=", ast.Lt: "<", ast.LtE: "<=", ast.Eq: "==", ast.NotEq: "!="}
+_FLIPPED = {">": "<", ">=": "<=", "<": ">", "<=": ">=", "==": "==", "!=": "!="}
+_ARITH = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv}
+_FUNCTIONS = {"abs", "changed"}
+
+
+# ——— Expressions ———
+def _channel_of(node: ast.AST) -> Optional[str]:
+    """'corners[0].wheel_speed' for the AST of a plain channel reference, else None."""
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        parent = _channel_of(node.value)
+        return None if parent is None else f"{parent}.{node.attr}"
+    if isinstance(node, ast.Subscript):
+        parent = _channel_of(node.value)
+        idx = node.slice
+        if parent is None or not (isinstance(idx, ast.Constant) and type(idx.value) is int):
+            return None
+        return f"{parent}[{idx.value}]"
+    return None
+
+
+def _constant_of(node: ast.AST) -> Optional[float]:
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float, bool):
+        return float(node.value)
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        v = _constant_of(node.operand)
+        return None if v is None else (-v if isinstance(node.op, ast.USub) else v)
+    return None
+
+
+class Expression:
+    def __init__(self, text: str):
+        """Parse and validate text. Raises ValueError for syntax or unknown channels."""
+        self.text = text
+        try:
+            self._tree = ast.parse(text.strip(), mode="eval").body
+        except SyntaxError as e:
+            raise ValueError(f"Invalid query {text!r}: {e.msg}") from None
+        self.channels: Set[str] = set()
+        self._check(self._tree, set(all_channel_paths()))
+
+    def __repr__(self):
+        return f"Expression({self.text!r})"
+
+    def _check(self, node: ast.AST, known: Set[str]) -> None:
+        channel = _channel_of(node)
+        if channel is not None:
+            if channel not in known:
+                raise ValueError(f"Unknown channel '{channel}' in query")
+            self.channels.add(channel)
+        elif _constant_of(node) is not None:
+            pass
+        elif isinstance(node, ast.Call):
+            name = node.func.id if isinstance(node.func, ast.Name) else None
+            if name not in _FUNCTIONS or len(node.args) != 1 or node.keywords:
+                raise ValueError(f"Unsupported function in query; use {' / '.join(sorted(_FUNCTIONS))}(x)")
+            self._check(node.args[0], known)
+        elif isinstance(node, (ast.BoolOp, ast.Compare, ast.BinOp, ast.UnaryOp)) and self._supported(node):
+            for child in ast.iter_child_nodes(node):
+                if isinstance(child, ast.expr):
+                    self._check(child, known)
+        else:
+            raise ValueError(f"Unsupported syntax in query: {ast.unparse(node)!r}")
+
+    @staticmethod
+    def _supported(node: ast.AST) -> bool:
+        if isinstance(node, ast.Compare):
+            return all(type(op) in _COMPARE for op in node.ops)
+        if isinstance(node, ast.BinOp):
+            return type(node.op) in _ARITH or isinstance(node.op, (ast.BitAnd, ast.BitOr))
+        if isinstance(node, ast.UnaryOp):
+            return isinstance(node.op, (ast.Not, ast.Invert, ast.USub, ast.UAdd))
+        return True
+
+    # ── evaluation ──
+    def evaluate(self, source, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        """
+        Boolean mask over snapshots [start, stop) of source (a CarDB or ColumnStore).
+        One extra leading sample is read so changed() is exact at the range edge.
+        """
+        stop = len(source) if stop is None else stop
+        lo = max(start - 1, 0)
+        out = self._eval(self._tree, source, lo, stop)
+        out = np.broadcast_to(np.asarray(out), (stop - lo,))
+        if out.dtype != bool:
+            with np.errstate(invalid="ignore"):
+                out = out != 0
+        return out[start - lo :]
+
+    def _eval(self, node, src, lo, hi):
+        channel = _channel_of(node)
+        if channel is not None:
+            col = src.channel(channel)[lo:hi]
+            return col.astype(np.float64) if col.dtype.kind == "u" else col  # u - u must not wrap
+        const = _constant_of(node)
+        if const is not None:
+            return const
+        if isinstance(node, ast.Call):
+            x = np.asarray(self._eval(node.args[0], src, lo, hi))
+            if node.func.id == "abs":
+                return np.abs(x)
+            return changes(x) if x.ndim else np.zeros(hi - lo, dtype=bool)
+        if isinstance(node, ast.BoolOp):
+            reduce = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            out = self._eval(node.values[0], src, lo, hi)
+            for v in node.values[1:]:
+                out = reduce(out, self._eval(v, src, lo, hi))
+            return out
+        if isinstance(node, ast.Compare):
+            out, left = True, self._eval(node.left, src, lo, hi)
+            with np.errstate(invalid="ignore"):
+                for op, comparator in zip(node.ops, node.comparators):
+                    right = self._eval(comparator, src, lo, hi)
+                    out = np.logical_and(out, Compare.OPS[_COMPARE[type(op)]](left, right))
+                    left = right
+            return out
+        if isinstance(node, ast.BinOp):
+            a, b = self._eval(node.left, src, lo, hi), self._eval(node.right, src, lo, hi)
+            if isinstance(node.op, ast.BitAnd):
+                return np.logical_and(a, b)
+            if isinstance(node.op, ast.BitOr):
+                return np.logical_or(a, b)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                return _ARITH[type(node.op)](a, b)
+        # UnaryOp
+        x = self._eval(node.operand, src, lo, hi)
+        if isinstance(node.op, (ast.Not, ast.Invert)):
+            return np.logical_not(x)
+        return -x if isinstance(node.op, ast.USub) else x
+
+    # ── pruning ──
+    def predicate(self) -> Predicate:
+        """A zone-map predicate that is true wherever the expression might be."""
+        return self._predicate(self._tree)
+
+    def _predicate(self, node) -> Predicate:
+        if isinstance(node, ast.BoolOp):
+            terms = [self._predicate(v) for v in node.values]
+            return And(*terms) if isinstance(node.op, ast.And) else Or(*terms)
+        if isinstance(node, ast.BinOp) and isinstance(node.op, (ast.BitAnd, ast.BitOr)):
+            terms = [self._predicate(node.left), self._predicate(node.right)]
+            return And(*terms) if isinstance(node.op, ast.BitAnd) else Or(*terms)
+        if isinstance(node, ast.Call) and node.func.id == "changed" and _channel_of(node.args[0]):
+            return Changed(_channel_of(node.args[0]))
+        if isinstance(node, ast.Compare):
+            left, terms = node.left, []
+            for op, right in zip(node.ops, node.comparators):
+                terms.append(self._compare_predicate(left, _COMPARE[type(op)], right))
+                left = right
+            return terms[0] if len(terms) == 1 else And(*terms)
+        return Predicate()
+
+    @staticmethod
+    def _compare_predicate(left, op: str, right) -> Predicate:
+        if _constant_of(left) is not None:  # 20 < x  ->  x > 20
+            left, right, op = right, left, _FLIPPED[op]
+        value = _constant_of(right)
+        if value is None:
+            return Predicate()
+        channel = _channel_of(left)
+        if channel is not None:
+            return Compare(channel, op, value)
+        # abs(x) > v  ->  x > v or x < -v
+        if isinstance(left, ast.Call) and left.func.id == "abs" and _channel_of(left.args[0]) and op in (">", ">="):
+            channel = _channel_of(left.args[0])
+            return Or(Compare(channel, op, value), Compare(channel, _FLIPPED[op], -value))
+        return Predicate()
+
+
+# ——— Segments ———
+@dataclass
+class Match:
+    log: str
+    start_ms: float
+    end_ms: float
+    start_index: int
+    stop_index: int  # exclusive
+
+    @property
+    def duration_ms(self) -> float:
+        return self.end_ms - self.start_ms
+
+
+def mask_segments(mask: np.ndarray):
+    """(starts, stops) of the runs of True in mask; stops are exclusive."""
+    edges = np.diff(np.concatenate([[0], mask.view(np.int8), [0]]))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+# ——— Sources ———
+@dataclass
+class LogSource:
+    label: str  # shown in results, e.g. comp/log_12
+    path: str  # raw log, parsed when there is no columns sidecar
+    columns: Optional[str] = None
+    zones: Optional[str] = None
+
+    def open(self):
+        if self.columns and os.path.exists(self.columns):
+            return ColumnStore(self.columns)
+        db = ParserRegistry.parse(self.path)
+        if db is None:
+            raise ValueError(f"Could not parse {self.path!r}")
+        return db
+
+
+def catalog_sources(catalog, expression: Expression, **filters) -> List[LogSource]:
+    """
+    Catalogued logs whose per-log stats don't rule the expression out;
+    `filters` are passed to LogCatalog.query.
+    """
+    sources = []
+    for e in candidate_logs(catalog, expression.predicate(), **filters):
+        out = os.path.join(catalog.root, e.output_path)
+        label = "/".join(p for p in (e.drive_day, e.name) if p)
+        sources.append(LogSource(label, e.path, columns_path(out), zone_path(out)))
+    return sources
+
+
+def file_sources(path: str) -> List[LogSource]:
+    """Every raw log under path (a file or a folder); these are parsed on the fly."""
+    if os.path.isfile(path):
+        return [LogSource(os.path.splitext(os.path.basename(path))[0], path)]
+    sources = []
+    for root, _, files in os.walk(path):
+        for name in sorted(files):
+            src = os.path.join(root, name)
+            sources.append(LogSource(os.path.splitext(os.path.relpath(src, path))[0], src))
+    return sources
+
+
+# ——— Search ———
+def search_log(source: LogSource, expression, min_duration_ms: float = 0) -> List[Match]:
+    """Matching segments of one log."""
+    expression = expression if isinstance(expression, Expression) else Expression(expression)
+    data = source.open()
+    try:
+        n = len(data)
+        ranges = [(0, n)]
+        if source.zones and os.path.exists(source.zones):
+            zones = ZoneMap.load(source.zones)
+            if zones.n_snapshots == n:
+                ranges = candidate_chunks(zones, expression.predicate())
+
+        mask = np.zeros(n, dtype=bool)
+        for start, stop in ranges:
+            mask[start:stop] = expression.evaluate(data, start, stop)
+        if not mask.any():
+            return []
+
+        t = data.channel(TIME_CHANNEL)
+        starts, stops = mask_segments(mask)
+        matches = [
+            Match(source.label, float(t[a]), float(t[b - 1]), int(a), int(b))
+            for a, b in zip(starts, stops)
+        ]
+    finally:
+        if isinstance(data, ColumnStore):
+            data.close()
+    return [m for m in matches if m.duration_ms >= min_duration_ms]
+
+
+def _search_log_or_error(source: LogSource, expression: str, min_duration_ms: float = 0):
+    """search_log, with a failure returned as (None, message) so one bad log doesn't end the search."""
+    try:
+        return search_log(source, expression, min_duration_ms), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def search(
+    expression,
+    sources: List[LogSource],
+    min_duration_ms: float = 0,
+    workers: Optional[int] = None,
+    skipped: Optional[List[Tuple[str, str]]] = None,
+) -> List[Match]:
+    """
+    Evaluate expression over every source, in parallel processes unless
+    workers == 1. Matches are returned in source order, then time order.
+    A log that can't be opened or searched is appended to skipped as
+    (label, error) and the others are still searched; without a skipped
+    list the first such error is raised once every log has been tried.
+    """
+    text = expression.text if isinstance(expression, Expression) else expression
+    Expression(text)  # fail on a bad query before starting any workers
+    if workers == 1 or len(sources) <= 1:
+        results = [_search_log_or_error(s, text, min_duration_ms) for s in sources]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_search_log_or_error, sources, [text] * len(sources), [min_duration_ms] * len(sources)))
+    failed = [(s.label, error) for s, (_, error) in zip(sources, results) if error is not None]
+    if failed and skipped is None:
+        raise ValueError(f"Could not search {failed[0][0]}: {failed[0][1]}")
+    if skipped is not None:
+        skipped.extend(failed)
+    return [m for r, _ in results if r for m in r]
@@ -0,0 +1,178 @@
+"""
+Resampling of a CarDB onto a uniform time grid.
+
+Grid points are the multiples of 1000 / rate_hz ms that fall inside the log, so
+two logs resampled at the same rate line up sample for sample. Methods:
+
+- hold:   the value current at each grid point (last sample at or before it);
+- linear: float channels are interpolated between the two neighbouring samples,
+          integer channels (states, counters, flags) are held;
+- mean:   float channels are averaged over [t, t + period), integer channels are
+          held; a bucket without samples holds the last sample before it.
+
+Everything is a gather, an interpolation or an np.add.reduceat per channel; no
+Python loop ever runs per record. Resampler does the same for a stream of chunks.
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import List, Optional
+
+import numpy as np
+
+from analysis.common.car_db import CarDB, car_snapshot_dtype
+from analysis.common.time_index import CLOCKS, U4_RANGE, TimeIndex
+
+METHODS = ("hold", "linear", "mean")
+
+
+def period_ms(rate_hz: float) -> float:
+    if rate_hz <= 0:
+        raise ValueError(f"rate_hz must be positive, got {rate_hz}")
+    return 1000.0 / rate_hz
+
+
+def uniform_grid(start_ms: float, end_ms: float, rate_hz: float) -> np.ndarray:
+    """Every multiple of the sample period within [start_ms, end_ms]."""
+    period = period_ms(rate_hz)
+    return np.arange(np.ceil(start_ms / period), np.floor(end_ms / period) + 1) * period
+
+
+def _walk_float_fields(dtype: np.dtype, path: str, out: List[str]) -> None:
+    for name in dtype.names:
+        sub = dtype.fields[name][0]
+        base = sub.subdtype[0] if sub.subdtype is not None else sub
+        sub_path = f"{path}.{name}" if path else name
+        if base.names is not None:
+            _walk_float_fields(base, sub_path, out)  # "corners.wheel_speed" is (n, 4)
+        elif base.kind == "f":
+            out.append(sub_path)
+
+
+@lru_cache(maxsize=None)
+def _float_fields() -> List[str]:
+    """Float leaf fields, whole (e.g. "bms.cell_temps" rather than each cell), so each is one numpy op."""
+    out: List[str] = []
+    _walk_float_fields(car_snapshot_dtype, "", out)
+    return out
+
+
+def _per_row(w: np.ndarray, like: np.ndarray) -> np.ndarray:
+    return w.reshape(w.shape + (1,) * (like.ndim - 1))
+
+
+def resample_records(records: np.ndarray, times: np.ndarray, grid: np.ndarray, method: str, period: float) -> np.ndarray:
+    """
+    Resample a car_snapshot_dtype array whose snapshots sit at `times` (sorted ms)
+    onto `grid` (every grid point must be >= times[0]).
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown resample method '{method}', expected one of {', '.join(METHODS)}")
+    n = len(times)
+    held = np.searchsorted(times, grid, side="right") - 1
+    out = records[held]  # hold: one gather of whole records
+    if method == "hold" or not len(grid):
+        return out
+
+    src, dst = CarDB.from_array(records), CarDB.from_array(out)
+    if method == "linear":
+        after = np.minimum(held + 1, n - 1)
+        dt = (times[after] - times[held]).astype(np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            w = np.where(dt > 0, (grid - times[held]) / dt, 0.0)
+        nxt = CarDB.from_array(records[after])
+        for path in _float_fields():
+            a, b = dst.channel(path), nxt.channel(path)
+            a += _per_row(w, a) * (b - a)
+        return out
+
+    # mean: bucket k holds the samples in [grid[k], grid[k] + period)
+    starts = np.searchsorted(times, grid, side="left")
+    stops = np.append(starts[1:], np.searchsorted(times, grid[-1] + period, side="left"))
+    counts = stops - starts
+    filled = counts > 0
+    if not filled.any():
+        return out
+    for path in _float_fields():
+        col = src.channel(path)
+        # reduceat sums from each filled start up to the next filled start, i.e. exactly
+        # the bucket, because empty buckets in between contain nothing; the last filled
+        # bucket is cut off at its own stop
+        sums = np.add.reduceat(col[: stops[filled][-1]].astype(np.float64), starts[filled])
+        dst.channel(path)[filled] = sums / _per_row(counts[filled], sums)
+    return out
+
+
+def _stamp(records: np.ndarray, grid: np.ndarray, clock: str) -> None:
+    """Write the grid times into the resampled clock channel."""
+    db = CarDB.from_array(records)
+    if clock == "startup":
+        db.channel(CLOCKS["startup"])[:] = np.round(grid).astype(np.int64) % U4_RANGE
+    else:
+        db.channel(CLOCKS["unix"])[:] = (grid // 1000).astype(np.int64)
+
+
+def resample(db: CarDB, rate_hz: float, method: str = "hold", clock: str = "startup") -> CarDB:
+    """A new CarDB holding db resampled to rate_hz on the given clock (see CarDB.resample)."""
+    index = db.time_index(clock)
+    if not len(index):
+        return CarDB.from_array(db._db[:0].copy())
+    grid = uniform_grid(index.start_ms, index.end_ms, rate_hz)
+    records = resample_records(db._db, index.times, grid, method, period_ms(rate_hz))
+    _stamp(records, grid, clock)
+    return CarDB.from_array(records)
+
+
+class Resampler:
+    """
+    Streaming resampler on the startup clock: feed() chunks as they arrive and get
+    back the grid points they completed; flush() returns the rest. Concatenating
+    every output equals resample() of the whole log.
+    """
+
+    def __init__(self, rate_hz: float, method: str = "hold"):
+        if method not in METHODS:
+            raise ValueError(f"Unknown resample method '{method}', expected one of {', '.join(METHODS)}")
+        self.rate_hz = rate_hz
+        self.method = method
+        self.period = period_ms(rate_hz)
+        self._pending: Optional[np.ndarray] = None  # samples still needed for upcoming grid points
+        self._pending_t0 = 0  # continuous time of the first pending sample
+        self._next_k: Optional[int] = None  # next grid point, in periods
+
+    def _times(self, records: np.ndarray) -> np.ndarray:
+        times = TimeIndex.from_startup(records["time"]["time_since_startup"]).times
+        if self._pending is not None:  # keep the time axis continuous across chunks
+            times = times + (self._pending_t0 - times[0])
+        return times
+
+    def _emit(self, records: np.ndarray, times: np.ndarray, last_k: int) -> CarDB:
+        if self._next_k is None:
+            self._next_k = int(np.ceil(times[0] / self.period))
+        grid = np.arange(self._next_k, last_k + 1) * self.period
+        out = resample_records(records, times, grid, self.method, self.period)
+        _stamp(out, grid, "startup")
+        self._next_k = max(self._next_k, last_k + 1)
+
+        keep = max(int(np.searchsorted(times, self._next_k * self.period, side="right")) - 1, 0)
+        self._pending, self._pending_t0 = records[keep:].copy(), int(times[keep])
+        return CarDB.from_array(out)
+
+    def feed(self, chunk: CarDB) -> CarDB:
+        records = chunk._db if self._pending is None else np.concatenate([self._pending, chunk._db])
+        if not len(records):
+            return CarDB.from_array(records[:0].copy())
+        times = self._times(records)
+        # a grid point is final once a later sample (mean: the next bucket) has arrived
+        if self.method == "mean":
+            last_k = int(np.floor(times[-1] / self.period)) - 1
+        else:
+            last_k = int(np.ceil(times[-1] / self.period)) - 1
+        return self._emit(records, times, last_k)
+
+    def flush(self) -> CarDB:
+        if self._pending is None or not len(self._pending):
+            return CarDB.from_array(np.zeros(0, dtype=car_snapshot_dtype))
+        times = self._times(self._pending)
+        return self._emit(self._pending, times, int(np.floor(times[-1] / self.period)))
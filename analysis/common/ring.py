@@ -0,0 +1,162 @@
+"""
+Fixed-memory ring buffer of snapshots for live sessions.
+
+RingCarDB preallocates `capacity` snapshots once; append() copies each decoded
+batch in (at most two slice assignments per chunk), overwriting the oldest
+snapshots, so memory stays constant however long the session runs. Reads are
+zero-copy: the newest n snapshots or the last T seconds come back in time order
+as one CarDB, or two when they straddle the wrap point.
+
+    ring = RingCarDB(capacity=60 * 1000)                 # a minute at 1 kHz
+    ring.append(batch.db)
+    for part in ring.last_seconds(10):                   # 1 or 2 CarDB views
+        plot(part.channel("inverter.power_kw"))
+
+Views alias the buffer: the writer overwrites them once the ring wraps past them,
+so a reader that holds on to data longer than that should copy it (see copy()).
+
+With spill_dir, every chunk is written to spill_dir/chunk_000000.columns.npz,
+chunk_000001..., in the columnar format just before it is overwritten; close()
+writes out the rest, so the spill files together hold the whole session.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import List, Optional
+
+import numpy as np
+
+from analysis.common.car_db import CarDB, car_snapshot_dtype, channel_paths
+from analysis.common.columnar import COLUMNS_SUFFIX, save_columns
+from analysis.common.time_index import TimeIndex
+
+SPILL_CHUNK = 4096  # snapshots per spill file
+
+
+def spill_path(spill_dir: str, n: int) -> str:
+    return os.path.join(spill_dir, f"chunk_{n:06d}{COLUMNS_SUFFIX}")
+
+
+class RingCarDB:
+    def __init__(self, capacity: int, spill_dir: Optional[str] = None, spill_chunk: int = SPILL_CHUNK):
+        if capacity <= 0:
+            raise ValueError(f"capacity must be positive, got {capacity}")
+        if spill_dir is not None:
+            if capacity % spill_chunk:
+                raise ValueError(f"capacity ({capacity}) must be a multiple of spill_chunk ({spill_chunk})")
+            os.makedirs(spill_dir, exist_ok=True)
+        self.capacity = capacity
+        self.spill_dir = spill_dir
+        self.chunk = spill_chunk if spill_dir is not None else capacity
+        self._db = np.zeros(capacity, dtype=car_snapshot_dtype)
+        self._times = np.zeros(capacity, dtype=np.int64)  # continuous startup ms of every slot
+        self._head = 0  # slot the next snapshot goes to
+        self.total = 0  # snapshots ever appended
+        self.spilled = 0  # spill files written
+        self._spilled_to = 0  # session-wide number of the first snapshot not yet in a spill file
+        self._last_raw: Optional[int] = None  # clock of the newest snapshot, to keep times continuous
+        self._last_ms = 0
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def __repr__(self):
+        return f"RingCarDB({len(self)}/{self.capacity} snapshots, {self.total} appended, {self.spilled} spilled)"
+
+    @property
+    def oldest(self) -> int:
+        """Session-wide number of the oldest snapshot still held."""
+        return self.total - len(self)
+
+    # ——— Writing ———
+    def _continuous_times(self, raw: np.ndarray) -> np.ndarray:
+        """Startup clock of a batch on the ring's continuous ms axis (wraps and resets handled)."""
+        if self._last_raw is None:
+            times = TimeIndex.from_startup(raw).times
+        else:
+            times = TimeIndex.from_startup(np.concatenate([[self._last_raw], raw])).times[1:]
+            times = times + (self._last_ms - self._last_raw)
+        self._last_raw, self._last_ms = int(raw[-1]), int(times[-1])
+        return times
+
+    def append(self, batch) -> None:
+        """Copy a batch (a CarDB or a car_snapshot_dtype array) in, evicting the oldest snapshots."""
+        records = batch._db if isinstance(batch, CarDB) else batch
+        if records.dtype != car_snapshot_dtype:
+            raise ValueError("RingCarDB.append needs a CarDB or an array of car_snapshot_dtype")
+        if not len(records):
+            return
+        times = self._continuous_times(records["time"]["time_since_startup"])
+        if self.spill_dir is None and len(records) > self.capacity:
+            skipped = len(records) - self.capacity  # would be overwritten within this append anyway
+            records, times = records[skipped:], times[skipped:]
+            self._head = (self._head + skipped) % self.capacity
+            self.total += skipped
+
+        done = 0
+        while done < len(records):
+            # never cross a chunk boundary, so a chunk is spilled whole right before reuse
+            if self.spill_dir is not None and self._head % self.chunk == 0 and self.total >= self.capacity:
+                self._spill(self._head, self._head + self.chunk)
+            k = min(len(records) - done, self.chunk - self._head % self.chunk)
+            self._db[self._head : self._head + k] = records[done : done + k]
+            self._times[self._head : self._head + k] = times[done : done + k]
+            self._head = (self._head + k) % self.capacity
+            self.total += k
+            done += k
+
+    def _spill(self, start: int, stop: int) -> None:
+        save_columns(CarDB.from_array(self._db[start:stop]), spill_path(self.spill_dir, self.spilled), channel_paths())
+        self.spilled += 1
+        self._spilled_to = self.oldest + (stop - start)  # the chunk at the head is always the oldest one
+
+    def close(self) -> None:
+        """With spill_dir, write out every snapshot not spilled yet (oldest first) and empty the ring."""
+        if self.spill_dir is None:
+            return
+        for part in self.latest(self.total - max(self._spilled_to, self.oldest)):
+            for a in range(0, len(part), self.chunk):
+                save_columns(CarDB.from_array(part._db[a : a + self.chunk]), spill_path(self.spill_dir, self.spilled), channel_paths())
+                self.spilled += 1
+        self.total = self._head = self._spilled_to = 0
+        self._last_raw = None
+
+    # ——— Reading ———
+    def _segments(self, n: int) -> List[slice]:
+        n = min(n, len(self))
+        start = (self._head - n) % self.capacity
+        if n == 0:
+            return []
+        if start + n <= self.capacity:
+            return [slice(start, start + n)]
+        return [slice(start, self.capacity), slice(0, self._head)]
+
+    def latest(self, n: Optional[int] = None) -> List[CarDB]:
+        """The newest n snapshots (default: all held), oldest first, as 1 or 2 zero-copy CarDBs."""
+        return [CarDB.from_array(self._db[s]) for s in self._segments(len(self) if n is None else n)]
+
+    def last_seconds(self, seconds: float) -> List[CarDB]:
+        """Snapshots from the last `seconds` of the startup clock, as 1 or 2 zero-copy CarDBs."""
+        if not len(self):
+            return []
+        newest = self._times[(self._head - 1) % self.capacity]
+        out = []
+        for s in self._segments(len(self)):
+            first = s.start + int(np.searchsorted(self._times[s], newest - seconds * 1000.0, side="left"))
+            if first < s.stop:
+                out.append(CarDB.from_array(self._db[first : s.stop]))
+        return out
+
+    def times(self, seconds: Optional[float] = None) -> np.ndarray:
+        """Continuous startup ms of the snapshots latest() (or last_seconds(seconds)) returns, as one array."""
+        parts = self.latest() if seconds is None else self.last_seconds(seconds)
+        n = sum(len(p) for p in parts)
+        return np.concatenate([self._times[s] for s in self._segments(n)]) if n else np.empty(0, np.int64)
+
+    def copy(self, seconds: Optional[float] = None) -> CarDB:
+        """A contiguous CarDB copy of everything held (or of the last `seconds`) that later appends won't touch."""
+        parts = self.latest() if seconds is None else self.last_seconds(seconds)
+        if not parts:
+            return CarDB.from_array(np.zeros(0, dtype=car_snapshot_dtype))
+        return CarDB.from_array(np.concatenate([p._db for p in parts]))
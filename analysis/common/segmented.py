@@ -0,0 +1,200 @@
+"""
+CarDB made of fixed-size segments, for logs too long for one contiguous array.
+
+A CarDB is a single np.zeros(n, car_snapshot_dtype), about 1.4 KB per snapshot,
+allocated in full before decoding starts. A SegmentedCarDB instead allocates
+SEGMENT_SNAPSHOTS snapshots at a time as the parser asks for room, so a long
+endurance log needs no multi-GB contiguous block and nothing before its records
+are actually decoded:
+
+    db = ParserRegistry.parse(path, segment=SEGMENT_SNAPSHOTS)   # a SegmentedCarDB
+    db.channel("inverter.power_kw")      # one channel, concatenated across segments
+    db.channel_views("bms.soc")          # the zero-copy per-segment views
+    db.to_csv(out)                       # written a segment at a time
+    db.to_car_db()                       # everything as one CarDB, only when asked
+
+channel() concatenates just the requested channel (a few bytes per snapshot), so
+anything that only reads channels and len() (the pyramid, zone maps, columns,
+catalog, searches) takes a SegmentedCarDB like a CarDB.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from analysis.common import derived
+from analysis.common.car_db import CarDB, CarSnapshot, car_snapshot_dtype
+from analysis.common.time_index import CLOCKS, TimeIndex
+
+SEGMENT_SNAPSHOTS = 1 << 16  # ~90 MB of snapshots per segment
+
+
+class SegmentedCarDB:
+    def __init__(self, segment: int = SEGMENT_SNAPSHOTS):
+        if segment <= 0:
+            raise ValueError(f"segment must be positive, got {segment}")
+        self.segment = segment
+        self._parts: List[np.ndarray] = []  # filled snapshots, in order, each within one segment
+        self._tail: Optional[np.ndarray] = None  # the newest segment, whose unfilled rest grow() hands out
+        self._tail_used = 0
+        self._n = 0
+        self._time_indexes: Dict[str, TimeIndex] = {}
+        self._derived: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def from_parts(cls, parts: List[np.ndarray], segment: int = SEGMENT_SNAPSHOTS) -> "SegmentedCarDB":
+        """Wrap existing car_snapshot_dtype arrays (e.g. CarDB._db) as the segments, without copying."""
+        db = cls(segment)
+        for part in parts:
+            if part.dtype != car_snapshot_dtype:
+                raise ValueError("SegmentedCarDB.from_parts needs arrays of car_snapshot_dtype")
+            if len(part):
+                db._parts.append(part)
+                db._n += len(part)
+        return db
+
+    def __len__(self):
+        return self._n
+
+    def __repr__(self):
+        return f"SegmentedCarDB({self._n} snapshots in {len(self._parts)} segments of {self.segment})"
+
+    # ——— Writing ———
+    def grow(self, n: int) -> List[np.ndarray]:
+        """
+        Add n zeroed snapshots at the end and return them as writable record
+        arrays (more than one when they cross into a new segment) for the caller
+        to decode into.
+        """
+        out = []
+        while n > 0:
+            if self._tail is None or self._tail_used == len(self._tail):
+                self._tail = np.zeros(self.segment, dtype=car_snapshot_dtype)
+                self._tail_used = 0
+                self._parts.append(self._tail[:0])
+            k = min(n, len(self._tail) - self._tail_used)
+            out.append(self._tail[self._tail_used : self._tail_used + k])
+            self._tail_used += k
+            self._parts[-1] = self._tail[: self._tail_used]
+            self._n += k
+            n -= k
+        self._time_indexes.clear()
+        self._derived.clear()
+        return out
+
+    def append(self, batch) -> None:
+        """Copy a batch (a CarDB or a car_snapshot_dtype array) in at the end."""
+        records = batch._db if isinstance(batch, CarDB) else batch
+        if records.dtype != car_snapshot_dtype:
+            raise ValueError("SegmentedCarDB.append needs a CarDB or an array of car_snapshot_dtype")
+        done = 0
+        for part in self.grow(len(records)):
+            part[:] = records[done : done + len(part)]
+            done += len(part)
+
+    # ——— Reading ———
+    def segments(self) -> List[CarDB]:
+        """Zero-copy CarDB of every segment, in order."""
+        return [CarDB.from_array(p) for p in self._parts]
+
+    def _starts(self) -> np.ndarray:
+        return np.cumsum([0] + [len(p) for p in self._parts])
+
+    def _locate(self, idx: int):
+        """(segment, offset) of snapshot idx."""
+        if idx < 0:
+            idx += self._n
+        if not 0 <= idx < self._n:
+            raise IndexError(f"snapshot {idx} out of range for {self._n} snapshots")
+        starts = self._starts()
+        i = int(np.searchsorted(starts, idx, side="right")) - 1
+        return self._parts[i], idx - int(starts[i])
+
+    def raw_record(self, idx: int) -> np.void:
+        part, offset = self._locate(idx)
+        return part[offset]
+
+    def get_snapshot(self, idx: int) -> CarSnapshot:
+        part, offset = self._locate(idx)
+        return CarDB.from_array(part[offset : offset + 1]).get_snapshot(0)
+
+    def __getitem__(self, key):
+        """db[i] is snapshot i's record, db[a:b] a zero-copy SegmentedCarDB of those snapshots."""
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self._n)
+            if step != 1:
+                raise ValueError("SegmentedCarDB slices must be contiguous")
+            return self._view(slice(start, max(start, stop)))
+        return self.raw_record(key)
+
+    def _view(self, s: slice) -> "SegmentedCarDB":
+        parts = []
+        for part, a in zip(self._parts, self._starts()):
+            lo, hi = max(s.start - a, 0), min(s.stop - a, len(part))
+            if lo < hi:
+                parts.append(part[lo:hi])
+        view = SegmentedCarDB.from_parts(parts, self.segment)
+        view._time_indexes = {c: i.subset(s) for c, i in self._time_indexes.items()}
+        view._derived = {p: col[s] for p, col in self._derived.items()}
+        return view
+
+    def channel_views(self, path: str) -> List[np.ndarray]:
+        """Zero-copy, writable view of one raw channel in every segment."""
+        return [CarDB.from_array(p).channel(path) for p in self._parts]
+
+    def channel(self, path: str) -> np.ndarray:
+        """
+        One channel across all snapshots as a contiguous array. Raw channels are
+        concatenated from the segments on every call (write through channel_views);
+        derived channels are computed once, memoized and read-only like CarDB's.
+        """
+        if derived.is_derived(path):
+            col = self._derived.get(path)
+            if col is None:
+                col = self._derived[path] = derived.compute(path, self.channel)
+            return col
+        views = self.channel_views(path) if self._parts else [CarDB.from_array(np.zeros(0, car_snapshot_dtype)).channel(path)]
+        return np.concatenate(views)
+
+    def time_index(self, clock: str = "startup") -> TimeIndex:
+        """Like CarDB.time_index: built on first use, once the log has been filled in."""
+        if clock not in CLOCKS:
+            raise ValueError(f"Unknown clock '{clock}', expected one of {', '.join(CLOCKS)}")
+        index = self._time_indexes.get(clock)
+        if index is None:
+            if clock == "startup":
+                index = TimeIndex.from_startup(self.channel(CLOCKS["startup"]))
+            else:
+                index = TimeIndex.from_unix(self.channel(CLOCKS["unix"]), self.time_index("startup"))
+            self._time_indexes[clock] = index
+        return index
+
+    def time_slice(self, start_ms: Optional[float] = None, end_ms: Optional[float] = None, clock: str = "startup") -> "SegmentedCarDB":
+        """Zero-copy SegmentedCarDB of the snapshots with start_ms <= t < end_ms on the given clock."""
+        return self._view(self.time_index(clock).slice(start_ms, end_ms))
+
+    # ——— Output ———
+    def to_car_db(self) -> CarDB:
+        """Every snapshot in one contiguous CarDB: the one place the segments are concatenated."""
+        if len(self._parts) == 1:
+            return CarDB.from_array(self._parts[0])
+        return CarDB.from_array(np.concatenate(self._parts) if self._parts else np.zeros(0, car_snapshot_dtype))
+
+    def to_shared(self, name: Optional[str] = None):
+        """Like CarDB.to_shared: the segments are copied straight into one shared block."""
+        from analysis.common.shared import SharedCarDB
+
+        return SharedCarDB.create(self, name)
+
+    def to_compact(self, scales):
+        """Like CarDB.to_compact: quantized one channel at a time, without joining the segments."""
+        from analysis.common.compact import CompactCarDB
+
+        return CompactCarDB.from_db(self, scales)
+
+    def to_csv(self, path: str, append: bool = False) -> None:
+        """Same file as CarDB.to_csv, written one segment at a time so only one segment's rows are in memory."""
+        for i, part in enumerate(self.segments()):
+            part.to_csv(path, append=append or i > 0)
@@ -0,0 +1,204 @@
+"""
+Several logs of one session presented as a single timeline, without copying.
+
+A drive day is split across many files (log_180.bin ... log_221.bin), each with
+its own time_since_startup starting near zero. SessionDB keeps the logs as they
+are (CarDB, SegmentedCarDB, ColumnStore, ArchiveReader: anything with channel()
+and len()) plus two small tables:
+
+- offsets: the global index of every log's first snapshot, so global index ->
+  (log, local index) is one np.searchsorted;
+- a time shift per log that puts its startup clock on the session timeline
+  (ms since the session's first snapshot).
+
+If every log has a unix clock, logs are ordered and placed by it, so the gaps
+between them are real. Otherwise they keep the given order (e.g. log numbers)
+and are placed back to back, one sample period apart. Overlaps are always
+pushed back so the timeline never runs backwards.
+
+Reads only concatenate the logs a range touches:
+
+    with SessionDB.from_catalog(catalog, "front-daq", "drake") as session:
+        session.channel("ecu.front_brake_pressure", 50_000, 60_000)
+        session.window(["bms.soc"], 600_000, 900_000)   # by session time
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from analysis.common.time_index import CLOCKS, TimeIndex
+
+
+def _period_ms(times: np.ndarray) -> int:
+    steps = np.diff(times)
+    steps = steps[steps > 0]
+    return int(np.median(steps)) if len(steps) else 0
+
+
+class SessionDB:
+    def __init__(self, logs: Sequence, names: Optional[List[str]] = None):
+        names = list(names) if names is not None else [str(i) for i in range(len(logs))]
+        if len(names) != len(logs):
+            raise ValueError(f"{len(logs)} logs but {len(names)} names")
+
+        startup = [TimeIndex.from_startup(log.channel(CLOCKS["startup"])) for log in logs]
+        unix = []
+        for log, index in zip(logs, startup):
+            try:
+                unix.append(TimeIndex.from_unix(log.channel(CLOCKS["unix"]), index))
+            except ValueError:  # no GPS clock, or one that runs backwards
+                unix.append(None)
+        self.by_unix = bool(logs) and all(u is not None for s, u in zip(startup, unix) if len(s))
+
+        order = list(range(len(logs)))
+        if self.by_unix:
+            order.sort(key=lambda i: unix[i].start_ms if len(startup[i]) else -1)
+        axes = [(unix if self.by_unix else startup)[i] for i in order]
+        self.logs = [logs[i] for i in order]
+        self.names = [names[i] for i in order]
+        self.offsets = np.cumsum([0] + [len(log) for log in self.logs]).astype(np.int64)
+
+        # ——— placement on the session timeline ———
+        self.origin_unix_ms: Optional[int] = None  # unix ms of session time 0, when placed by unix time
+        self._local: List[np.ndarray] = []  # each log's clock (startup or unix ms), unwrapped
+        self.shifts = np.zeros(len(self.logs), dtype=np.int64)  # session ms = local + shift
+        end = period = None  # where the previous non-empty log ends, and its sample period
+        for i, axis in enumerate(axes):
+            times = axis.times if axis is not None else np.empty(0, np.int64)
+            self._local.append(times)
+            if not len(times):
+                continue
+            if self.by_unix:
+                if self.origin_unix_ms is None:
+                    self.origin_unix_ms = int(times[0])
+                start = int(times[0]) - self.origin_unix_ms
+            else:
+                start = 0 if end is None else end + period
+            if end is not None and start <= end:
+                start = end + max(period, 1)
+            self.shifts[i] = start - int(times[0])
+            end, period = int(times[-1]) + int(self.shifts[i]), _period_ms(times)
+
+        nonempty = [i for i, t in enumerate(self._local) if len(t)]
+        self._starts_ms = np.array([self._local[i][0] + self.shifts[i] for i in nonempty], dtype=np.int64)
+        self._ends_ms = np.array([self._local[i][-1] + self.shifts[i] for i in nonempty], dtype=np.int64)
+        self._nonempty = np.array(nonempty, dtype=np.int64)
+        self._owned: List = []  # logs this session opened itself, closed by close()
+
+    @classmethod
+    def from_catalog(cls, catalog, log_system: Optional[str] = None, drive_day: Optional[str] = None) -> "SessionDB":
+        """The transformed logs of one drive day, read lazily from their columns sidecars."""
+        from analysis.common.columnar import ColumnStore, columns_path  # keep this module free of the sidecar formats
+
+        entries = catalog.query(log_system=log_system, drive_day=drive_day)
+        paths = [columns_path(os.path.join(catalog.root, e.output_path)) for e in entries]
+        missing = [p for p in paths if not os.path.exists(p)]
+        if missing:
+            raise ValueError(f"{len(missing)} log(s) have no columns sidecar (re-run transform), e.g. {missing[0]}")
+        stores = []
+        try:
+            for p in paths:
+                stores.append(ColumnStore(p))
+            session = cls(stores, [e.name for e in entries])
+        except BaseException:
+            for store in stores:
+                store.close()
+            raise
+        session._owned = stores
+        return session
+
+    def close(self) -> None:
+        """Close the logs from_catalog() opened; logs passed in by the caller stay theirs to close."""
+        for log in self._owned:
+            log.close()
+        self._owned = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def __repr__(self):
+        placed = "by unix time" if self.by_unix else "back to back"
+        return f"SessionDB({len(self.logs)} logs, {len(self)} snapshots, {self.duration_ms} ms, {placed})"
+
+    @property
+    def duration_ms(self) -> int:
+        return int(self._ends_ms[-1] - self._starts_ms[0]) if len(self._starts_ms) else 0
+
+    def log_bounds_ms(self) -> List[Tuple[str, int, int]]:
+        """(name, first ms, last ms) of every non-empty log on the session timeline."""
+        return [(self.names[i], int(a), int(b)) for i, a, b in zip(self._nonempty, self._starts_ms, self._ends_ms)]
+
+    # ——— Index lookups ———
+    def locate(self, idx):
+        """(log number, local index) of global snapshot idx (a scalar or an array)."""
+        idx = np.asarray(idx, dtype=np.int64)
+        if np.any((idx < 0) | (idx >= len(self))):
+            raise IndexError(f"snapshot index out of range for {len(self)} snapshots")
+        log = np.searchsorted(self.offsets, idx, side="right") - 1
+        if log.ndim == 0:
+            return int(log), int(idx - self.offsets[log])
+        return log, idx - self.offsets[log]
+
+    def _ranges(self, start: int, stop: int) -> Iterator[Tuple[int, int, int]]:
+        """(log number, local start, local stop) of every log that global [start, stop) touches."""
+        first = int(np.searchsorted(self.offsets, start, side="right")) - 1
+        for i in range(max(first, 0), len(self.logs)):
+            a = int(self.offsets[i])
+            if a >= stop:
+                break
+            lo, hi = max(start - a, 0), min(stop - a, len(self.logs[i]))
+            if lo < hi:
+                yield i, lo, hi
+
+    def _bounds(self, start: int, stop: Optional[int]) -> Tuple[int, int]:
+        n = len(self)
+        stop = n if stop is None else min(stop, n)
+        return max(start, 0), stop
+
+    # ——— Reads ———
+    def channel(self, path: str, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        """One channel over global snapshots [start, stop), concatenated from just the logs in that range."""
+        start, stop = self._bounds(start, stop)
+        parts = [self.logs[i].channel(path)[lo:hi] for i, lo, hi in self._ranges(start, stop)]
+        if not parts:
+            return self.logs[0].channel(path)[:0] if self.logs else np.empty(0)
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def times(self, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        """Session time (int64 ms since the first snapshot) of global snapshots [start, stop)."""
+        start, stop = self._bounds(start, stop)
+        parts = [self._local[i][lo:hi] + self.shifts[i] for i, lo, hi in self._ranges(start, stop)]
+        return np.concatenate(parts) if parts else np.empty(0, np.int64)
+
+    def slice_ms(self, start_ms: Optional[float] = None, end_ms: Optional[float] = None) -> slice:
+        """Global snapshots with start_ms <= session time < end_ms (either bound may be None)."""
+
+        def first_at_or_after(t):
+            if t is None:
+                return 0
+            k = int(np.searchsorted(self._ends_ms, t, side="left"))  # first log still running at t
+            if k == len(self._nonempty):
+                return len(self)
+            i = int(self._nonempty[k])
+            return int(self.offsets[i]) + int(np.searchsorted(self._local[i], t - self.shifts[i], side="left"))
+
+        lo = first_at_or_after(start_ms)
+        hi = len(self) if end_ms is None else first_at_or_after(end_ms)
+        return slice(lo, max(lo, hi))
+
+    def window(self, paths: List[str], start_ms: Optional[float], end_ms: Optional[float]) -> Dict[str, np.ndarray]:
+        """Each channel (plus "session_ms") over [start_ms, end_ms) of session time."""
+        s = self.slice_ms(start_ms, end_ms)
+        out = {"session_ms": self.times(s.start, s.stop)}
+        out.update({p: self.channel(p, s.start, s.stop) for p in paths})
+        return out
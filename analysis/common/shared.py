@@ -0,0 +1,192 @@
+"""
+A CarDB in a multiprocessing.shared_memory block, handed between processes
+without pickling the records.
+
+One process publishes a decoded log (one copy into the block) and owns the
+block; any number of worker processes attach to it by name and see the same
+pages, read-only unless they ask otherwise:
+
+    with db.to_shared() as shared:              # owner: unlinks the block on exit
+        pool.map(work, [(shared.name, a, b) for a, b in ranges])
+
+    def work(name, a, b):
+        with CarDB.attach(name) as shared:      # attacher: only unmaps on exit
+            shared.db.channel("bms.soc")[a:b] ...
+
+Lifetime is explicit: close() unmaps the block in this process and needs every
+array taken from shared.db (channels, slices, records) to be gone first, and
+only the owner may unlink() it. An owner that dies without unlinking is
+cleaned up by multiprocessing's resource tracker. The block starts with a small
+header (magic, snapshot count, record size), so an attacher rebuilds the array
+by itself and refuses a block written with a different CarDB schema.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+from typing import Optional
+
+import numpy as np
+
+from analysis.common.car_db import CarDB, car_snapshot_dtype
+from analysis.common.profiling import stage
+
+MAGIC = b"NFRSHDB1"
+MIN_CSV_RANGE = 4096  # snapshots per CSV worker, below which a worker costs more than it saves
+
+_HEADER = struct.Struct("<8sQQ")
+_DATA_OFFSET = 64  # records start cache-line aligned
+# _open() swaps out resource_tracker.register; blocks created meanwhile on another thread would go untracked
+_TRACKER_LOCK = threading.Lock()
+
+
+def _records_of(db) -> list:
+    """The car_snapshot_dtype arrays holding db (a CarDB, a SegmentedCarDB or a record array)."""
+    if isinstance(db, np.ndarray):
+        parts = [db]
+    elif hasattr(db, "segments"):
+        parts = [s._db for s in db.segments()]
+    else:
+        parts = [db._db]
+    if any(p.dtype != car_snapshot_dtype for p in parts):
+        raise ValueError("Only car_snapshot_dtype records can be shared")
+    return parts
+
+
+def _open(name: str) -> shared_memory.SharedMemory:
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name, track=False)
+    # Before 3.13 attaching also registers the block with this process's resource
+    # tracker, which unlinks it when this process exits, under the owner's feet.
+    with _TRACKER_LOCK:
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            return shared_memory.SharedMemory(name)
+        finally:
+            resource_tracker.register = register
+
+
+class SharedCarDB:
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool, writable: bool):
+        magic, n, itemsize = _HEADER.unpack_from(shm.buf)
+        if magic != MAGIC or itemsize != car_snapshot_dtype.itemsize:
+            shm.close()
+            raise ValueError(f"Shared memory block {shm.name!r} does not hold CarDB records of this schema")
+        self._shm = shm
+        self._n = n
+        self._writable = writable
+        self.closed = False
+        self.name = shm.name
+        self.owner = owner
+        self.db: Optional[CarDB] = self._map()
+
+    def _map(self) -> CarDB:
+        # frombuffer (unlike np.ndarray(buffer=...)) pins the mapping: close() can't unmap it under a live view
+        records = np.frombuffer(self._shm.buf, dtype=car_snapshot_dtype, count=self._n, offset=_DATA_OFFSET)
+        records.flags.writeable = self._writable
+        return CarDB.from_array(records)
+
+    @classmethod
+    def create(cls, db, name: Optional[str] = None) -> "SharedCarDB":
+        """Copy db (a CarDB, a SegmentedCarDB or a record array) into a new block owned by this process."""
+        parts = _records_of(db)
+        n = sum(len(p) for p in parts)
+        with _TRACKER_LOCK:
+            shm = shared_memory.SharedMemory(name, create=True, size=_DATA_OFFSET + n * car_snapshot_dtype.itemsize)
+        try:
+            with stage("share", bytes=n * car_snapshot_dtype.itemsize, records=n):
+                _HEADER.pack_into(shm.buf, 0, MAGIC, n, car_snapshot_dtype.itemsize)
+                records = np.frombuffer(shm.buf, dtype=car_snapshot_dtype, count=n, offset=_DATA_OFFSET)
+                start = 0
+                for p in parts:
+                    records[start : start + len(p)] = p
+                    start += len(p)
+                del records
+            return cls(shm, owner=True, writable=True)
+        except BaseException:
+            shm.close()
+            shm.unlink()
+            raise
+
+    @classmethod
+    def attach(cls, name: str, writable: bool = False) -> "SharedCarDB":
+        """Map an existing block by name. The caller doesn't own it: close() it, never unlink() it."""
+        return cls(_open(name), owner=False, writable=writable)
+
+    def __len__(self):
+        return len(self.db) if self.db is not None else 0
+
+    def __repr__(self):
+        state = "closed" if self.closed else f"{len(self)} snapshots"
+        return f"SharedCarDB({self.name!r}, {state}, {'owner' if self.owner else 'attached'})"
+
+    def close(self) -> None:
+        """Unmap the block in this process. Every array taken from self.db must already be gone."""
+        if self.closed:
+            return
+        self.db = None  # its records are a view of the block too
+        try:
+            self._shm.close()
+        except BufferError:
+            # still mapped, but SharedMemory.close() dropped its memoryview before the mmap refused to
+            # close; recreate it as SharedMemory.__init__ does and leave the handle usable
+            if self._shm._buf is None:
+                self._shm._buf = memoryview(self._shm._mmap)
+            self.db = self._map()
+            raise ValueError(f"Arrays from shared CarDB {self.name!r} are still referenced; delete them before close()")
+        self.closed = True
+
+    def unlink(self) -> None:
+        """Free the block for every process (each still has to close() its own mapping)."""
+        if not self.owner:
+            raise ValueError(f"Only the process that created {self.name!r} may unlink it")
+        self._shm.unlink()
+        self.owner = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            self.close()
+        finally:
+            if self.owner:
+                self.unlink()
+
+
+# ——— Parallel export ———
+def _csv_range(name: str, start: int, stop: int, path: str) -> None:
+    with SharedCarDB.attach(name) as shared:
+        CarDB.from_array(shared.db._db[start:stop]).to_csv(path)
+
+
+def to_csv(db, path: str, workers: int, append: bool = False) -> None:
+    """
+    Same file as db.to_csv(path, append), with the rows formatted by up to
+    `workers` processes that each attach to one shared copy of the records.
+    """
+    n = len(db)
+    workers = max(1, min(workers, n // MIN_CSV_RANGE))
+    if workers == 1:
+        db.to_csv(path, append=append)
+        return
+    bounds = [n * k // workers for k in range(workers + 1)]
+    with SharedCarDB.create(db) as shared, tempfile.TemporaryDirectory(dir=os.path.dirname(path) or ".") as tmp:
+        parts = [os.path.join(tmp, f"part{k}.csv") for k in range(workers)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(_csv_range, [shared.name] * workers, bounds[:-1], bounds[1:], parts))
+        new_file = not append or not os.path.exists(path) or os.path.getsize(path) == 0
+        with stage("csv join", records=n), open(path, "wb" if new_file else "ab") as out:
+            for k, part in enumerate(parts):
+                with open(part, "rb") as f:
+                    if k > 0 or not new_file:
+                        f.readline()  # one header per file
+                    shutil.copyfileobj(f, out)
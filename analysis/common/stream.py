@@ -0,0 +1,179 @@
+"""
+Incremental decoding of a log that is still being written.
+
+The loggers only ever append fixed-size records after a fixed-size header, so a
+LogStream remembers the byte offset it has decoded up to and each poll() reads
+and decodes just the records completed since then. A trailing partial record is
+left in the file until the logger finishes writing it; it is never an error.
+
+    stream = ParserRegistry.open_stream("log_836.bin")
+    for chunk in stream.follow():      # a CarDB of the new snapshots, every ~50 ms
+        ...
+    stream.db                          # everything decoded so far
+
+Parsers with a fixed layout (HEADER_SIZE / RECORD_SIZE) can stream, and so can
+telem .daq logs: once the embedded config is on disk, their frames are fixed-size
+too (TelemFrameDecoder.frame_size) and are decoded column-wise as they arrive.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from typing import Iterator, Optional
+
+import numpy as np
+
+from analysis.common.car_db import CarDB, car_snapshot_dtype
+from analysis.common.parser_registry import VERSION_PEEK_LEN, ParserRegistry
+from analysis.common.parsers.telem.frame_decoder import TelemFrameDecoder
+from analysis.common.parsers.telem.telem_base_parser import (
+    TELEM_HEADER_PEEK,
+    TelemDAQParserBase,
+    build_telem_config,
+    read_telem_header,
+)
+
+# Polled with stat() rather than watched with watchdog (pinned in requirements.txt
+# for streamlit's reloader): logs are followed off SD cards, network shares and
+# container bind mounts, where inotify/FSEvents miss writes made by another machine
+# and watchdog falls back to polling anyway. The size has to be read to find the
+# last complete record regardless, and one stat() per interval costs nothing.
+POLL_INTERVAL_S = 0.05  # new records are picked up within one interval
+
+
+class LogStream:
+    def __init__(self, path: str, capacity: int = 1024):
+        self.path = path
+        self.version = None  # resolved once the header has been written
+        self.offset = 0  # bytes decoded so far: the header plus every complete record
+        self._parser = None
+        self._fh = None
+        self._record_size = None
+        self._decode = None  # (data, records) -> None, fills records from record_size-byte records in data
+        self._records = np.zeros(capacity, dtype=car_snapshot_dtype)
+        self._n = 0
+
+    def __len__(self):
+        return self._n
+
+    def __repr__(self):
+        return f"LogStream({self.path!r}, {self._n} snapshots, offset {self.offset})"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    @property
+    def db(self) -> CarDB:
+        """Zero-copy CarDB of every snapshot decoded so far (it does not grow with later polls)."""
+        return CarDB.from_array(self._records[: self._n])
+
+    def _open(self, size: int) -> bool:
+        """Resolve the parser once the header is on disk; False while it is still too short."""
+        if size < VERSION_PEEK_LEN:
+            return False
+        version = ParserRegistry.resolve(ParserRegistry.detect_version(self.path))
+        parser = ParserRegistry.get_parser(version)()
+        if isinstance(parser, TelemDAQParserBase):
+            return self._open_telem(version, parser, size)
+        if parser.RECORD_SIZE is None:
+            raise ValueError(f"{self.path}: the {version} parser cannot decode a log incrementally")
+        if size < parser.HEADER_SIZE:
+            return False
+        self.version, self._parser = version, parser
+        self.offset = parser.HEADER_SIZE
+        self._record_size, self._decode = parser.RECORD_SIZE, parser.decode_into
+        self._fh = open(self.path, "rb")
+        return True
+
+    def _open_telem(self, version, parser: TelemDAQParserBase, size: int) -> bool:
+        """
+        Compile the embedded config once it is on disk. The logger writes all of it
+        before the first frame, so it is taken as complete once a whole frame follows.
+        """
+        fh = open(self.path, "rb")
+        try:
+            cfg_text, data_start = read_telem_header(fh)
+            decoder = TelemFrameDecoder(build_telem_config(cfg_text))
+        except ValueError:
+            fh.close()
+            if size >= TELEM_HEADER_PEEK:
+                raise
+            return False  # the config is still being written
+        if size < data_start + decoder.frame_size:
+            fh.close()
+            return False
+        mapper = parser.get_mapper()
+
+        def decode(data, records):
+            mapper.map_columns(decoder.decode(data), CarDB.from_array(records))
+
+        self.version, self._parser, self._fh = version, parser, fh
+        self.offset = data_start
+        self._record_size, self._decode = decoder.frame_size, decode
+        return True
+
+    def _reserve(self, n: int) -> None:
+        if n <= len(self._records):
+            return
+        grown = np.zeros(max(n, 2 * len(self._records)), dtype=car_snapshot_dtype)
+        grown[: self._n] = self._records[: self._n]
+        self._records = grown
+
+    def poll(self) -> CarDB:
+        """Decode the records completed since the last poll and return them as a CarDB (possibly empty)."""
+        try:
+            size = os.stat(self.path).st_size
+        except FileNotFoundError:
+            size = 0  # the logger has not created it yet
+        if self._parser is None and not self._open(size):
+            return CarDB.from_array(self._records[:0])
+        if size < self.offset:
+            raise ValueError(f"{self.path} shrank from {self.offset} to {size} bytes; it was rewritten, not appended to")
+
+        record_size = self._record_size
+        n_new = (size - self.offset) // record_size
+        if not n_new:
+            return CarDB.from_array(self._records[self._n : self._n])
+        self._fh.seek(self.offset)
+        data = self._fh.read(n_new * record_size)
+
+        start = self._n
+        self._reserve(start + n_new)
+        self._decode(memoryview(data), self._records[start : start + n_new])
+        self._n += n_new
+        self.offset += n_new * record_size
+        return CarDB.from_array(self._records[start : self._n])
+
+    @property
+    def pending_bytes(self) -> int:
+        """Bytes of a partially written record waiting at the end of the file."""
+        try:
+            return max(os.stat(self.path).st_size - self.offset, 0)
+        except FileNotFoundError:
+            return 0
+
+    def follow(self, interval: float = POLL_INTERVAL_S, idle_timeout: Optional[float] = None) -> Iterator[CarDB]:
+        """
+        Poll every `interval` seconds and yield each non-empty batch of new snapshots.
+        Stops once nothing has been appended for idle_timeout seconds (never if None).
+        """
+        last_data = time.monotonic()
+        while True:
+            chunk = self.poll()
+            now = time.monotonic()
+            if len(chunk):
+                last_data = now
+                yield chunk
+            elif idle_timeout is not None and now - last_data >= idle_timeout:
+                return
+            else:
+                time.sleep(interval)
@@ -0,0 +1,279 @@
+"""
+Synthetic logs in every binary format the parsers read, at any size.
+
+simulate() generates CarDB snapshots of a car lapping a closed track, with
+whole-array numpy: speed follows the track, throttle and brake follow the
+acceleration it needs, the motor, pack current and voltage, cells, wheels and
+IMU follow from those, and temperatures and SOC drift over 30-minute stints.
+Every value is a function of the snapshot index (plus seeded noise per chunk),
+so any range of a log can be generated on its own and the log is continuous
+across chunks. The formats then encode those snapshots exactly as the loggers
+lay them out:
+
+    NFR25 0.0.1 / 0.0.2 .bin   the parsers' BULK_LAYOUT (their LINE_FMT), after the 9-byte header
+    telem .daq                 embedded config, then bit-packed frames (TelemFrameDecoder.encode)
+
+    write_log("big.bin", FORMATS["0.0.2"], 2_000_000)
+
+Parsing a synthetic log gives back the simulated channels the format carries
+(rounded to the format's types); values a format doesn't carry are zero.
+
+Units: time in ms (unix in s), speeds in km/h (air speed m/s), accelerations
+in g, pressures in psi, temperatures in degrees C, SOC as a fraction, rpm.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Dict
+
+import numpy as np
+
+from analysis.common.car_db import CarDB, car_snapshot_dtype, channel_paths
+from analysis.common.profiling import Progress, stage
+
+CHUNK_SNAPSHOTS = 1 << 15  # snapshots simulated and encoded at a time
+PERIOD_MS = 100  # the front-daq loggers write 10 snapshots a second
+START_MS = 5000  # startup clock of the first snapshot
+UNIX_START = 1749571200  # 2025-06-10 16:00 UTC
+TELEM_CONFIG = "mappings/2025_6_10.telem"
+TELEM_MAPPING = "mappings/2025_6_10.yml"
+
+# ——— The car and the track ———
+LAP_S = 60.0
+STINT_S = 1800.0  # SOC and temperatures reset every stint (a charge and cool-down)
+LAUNCH_S = 10.0  # speed ramps up from standstill over the first seconds
+MASS_KG = 300.0
+WHEEL_RADIUS_M = 0.2
+GEAR_RATIO = 3.5
+N_CELLS_V, N_CELLS_T = 140, 80
+CAPACITY_AH = 14.0
+R_CELL_OHM = 0.0015
+ORIGIN = (42.0565, -87.6753)  # lat, lon of the track centre
+TRACK_M = (120.0, 60.0)  # semi-axes of the (elliptic) track
+
+
+def _ocv(soc: np.ndarray) -> np.ndarray:
+    """Open-circuit cell voltage over SOC."""
+    return 3.3 + 0.75 * soc + 0.15 * soc**2
+
+
+def simulate(start: int, n: int, period_ms: int = PERIOD_MS, seed: int = 0) -> CarDB:
+    """Snapshots start .. start + n - 1 of the synthetic drive."""
+    rng = np.random.default_rng([seed, start])
+    noise = lambda scale, *shape: rng.standard_normal((n, *shape), dtype=np.float32) * np.float32(scale)
+    db = CarDB.from_array(np.zeros(n, dtype=car_snapshot_dtype))
+    ch = db.channel
+
+    t_ms = START_MS + (start + np.arange(n, dtype=np.int64)) * period_ms
+    t = (t_ms - START_MS) / 1000.0
+
+    # speed (m/s) along the lap, its acceleration, and the corners in between
+    w = 2 * np.pi / LAP_S
+    phase = (t % LAP_S) * w
+    ramp = np.clip(t / LAUNCH_S, 0, 1)
+    lap_v = 15 + 7 * np.sin(4 * phase) + 3 * np.sin(9 * phase + 0.7)
+    lap_a = 28 * w * np.cos(4 * phase) + 27 * w * np.cos(9 * phase + 0.7)
+    v = ramp * lap_v
+    a = ramp * lap_a + np.where(t < LAUNCH_S, lap_v / LAUNCH_S, 0)
+    drag = 0.15 + 0.0012 * v**2
+    corner = np.where(np.floor(4 * phase / (2 * np.pi)) % 2 == 0, 1.0, -1.0)
+    curvature = 0.04 * np.clip(-np.sin(4 * phase), 0, 1) * corner
+    lateral = v**2 * curvature
+
+    throttle = np.clip((a + drag) / 4.5, 0, 1)
+    brake = np.clip(-(a + drag) / 6.0, 0, 1)
+
+    # pack and motor: mechanical power in, electrical power out (10% regen while braking)
+    stint = (t % STINT_S) / STINT_S
+    soc = 0.95 - 0.6 * stint
+    p_mech = MASS_KG * (a + drag) * v
+    p_elec = np.where(p_mech > 0, p_mech / 0.9, 0.1 * p_mech)
+    ocv_cell = _ocv(soc)
+    current = p_elec / (ocv_cell * N_CELLS_V)
+    cell_offsets = np.random.default_rng(seed).normal(0, 0.004, N_CELLS_V).astype(np.float32)
+    cells_v = (ocv_cell - current * R_CELL_OHM)[:, None] + cell_offsets + noise(0.001, N_CELLS_V)
+    heat = 25 + 15 * stint + 0.02 * np.abs(current)
+    cells_t = heat[:, None] + np.linspace(-2, 2, N_CELLS_T, dtype=np.float32) + noise(0.1, N_CELLS_T)
+    rpm = v / WHEEL_RADIUS_M * 60 / (2 * np.pi) * GEAR_RATIO
+
+    # ——— time ———
+    unix = UNIX_START + t_ms // 1000
+    ch("time.time_since_startup")[:] = t_ms
+    ch("time.unix_time")[:] = unix
+    ch("time.hour")[:] = unix // 3600 % 24
+    ch("time.minute")[:] = unix // 60 % 60
+    ch("time.second")[:] = unix % 60
+    ch("time.millis")[:] = t_ms % 1000
+
+    # ——— wheels: inner/outer speed from the corner, load transfer into the dampers ———
+    kmh = v * 3.6
+    long_g, lat_g = a / 9.81, lateral / 9.81
+    for c, (side, axle) in enumerate([(1, 1), (-1, 1), (1, -1), (-1, -1)]):  # fl, fr, rl, rr
+        slip = 1 + 0.02 * throttle * (axle < 0)
+        ch(f"corners[{c}].wheel_speed")[:] = kmh * (1 - 0.03 * side * curvature / 0.04) * slip + noise(0.1)
+        travel = 12 - 3 * axle * long_g + 4 * side * lat_g + noise(0.2)
+        ch(f"corners[{c}].raw_sus_displacement")[:] = travel * 1.3
+        ch(f"corners[{c}].wheel_displacement")[:] = travel
+        ch(f"corners[{c}].pr_strain")[:] = travel * 45 + noise(5)
+        ch(f"corners[{c}].wheel_temperature")[:] = (40 + 25 * stint + 20 * brake * (axle > 0))[:, None] + noise(0.5, 8)
+
+    # ——— dynamics ———
+    x, y = TRACK_M[0] * np.cos(phase), TRACK_M[1] * np.sin(phase)
+    ch("dynamics.air_speed")[:] = v[:, None] + noise(0.3, 8)
+    ch("dynamics.coolant_temps")[:] = np.stack([35 + 30 * stint, 30 + 25 * stint], axis=1) + noise(0.2, 2)
+    ch("dynamics.coolant_flow")[:] = 8 + noise(0.1)
+    ch("dynamics.steering_angle")[:] = np.degrees(curvature * 1.55) * 8 + noise(0.3)
+    ch("dynamics.imu.accel")[:] = np.stack([long_g, lat_g, -np.ones(n)], axis=1) + noise(0.02, 3)
+    ch("dynamics.imu.vel")[:] = np.stack([v, v * curvature, np.zeros(n)], axis=1)
+    ch("dynamics.imu.pos")[:] = np.stack([x, y, np.zeros(n)], axis=1)
+    ch("dynamics.imu.orientation")[:] = np.stack([np.zeros(n), np.zeros(n), np.degrees(phase) % 360], axis=1)
+    ch("dynamics.gps_location")[:] = np.stack(
+        [ORIGIN[0] + y / 111_111, ORIGIN[1] + x / (111_111 * np.cos(np.radians(ORIGIN[0])))], axis=1
+    )
+
+    # ——— BMS ———
+    ch("bms.cell_voltages")[:] = cells_v
+    ch("bms.cell_temps")[:] = cells_t
+    ch("bms.battery_voltage")[:] = cells_v.sum(axis=1)
+    ch("bms.battery_current")[:] = current
+    ch("bms.battery_temp")[:] = cells_t.mean(axis=1)
+    ch("bms.soc")[:] = soc
+    ch("bms.max_cell_voltage")[:] = cells_v.max(axis=1)
+    ch("bms.min_cell_voltage")[:] = cells_v.min(axis=1)
+    ch("bms.max_cell_temp")[:] = cells_t.max(axis=1)
+    ch("bms.min_cell_temp")[:] = cells_t.min(axis=1)
+    ch("bms.max_discharge_current")[:] = 135 - 40 * np.clip(stint - 0.75, 0, 1)
+    ch("bms.max_regen_current")[:] = 40
+    ch("bms.bms_state")[:] = 2
+    ch("bms.imd_state")[:] = 1
+
+    # ——— PDM ———
+    ch("pdm.bat_voltage")[:] = 21.0 - 0.5 * stint + noise(0.01)
+    ch("pdm.fan_amps")[:] = np.where(stint > 0.3, 7.4, 0) + noise(0.01)
+    ch("pdm.pump_amps")[:] = 2.1 + noise(0.05)
+
+    # ——— inverter ———
+    ch("inverter.rpm")[:] = rpm
+    ch("inverter.motor_current")[:] = np.abs(p_mech) / np.maximum(rpm * 2 * np.pi / 60, 10) * 1.2
+    ch("inverter.dc_voltage")[:] = cells_v.sum(axis=1)
+    ch("inverter.dc_current")[:] = current
+    ch("inverter.igbt_temp")[:] = 30 + 25 * stint + 10 * throttle
+    ch("inverter.motor_temp")[:] = 30 + 40 * stint
+    drawn_ah = (0.95 - soc) * CAPACITY_AH  # counters restart with every stint
+    ch("inverter.ah_drawn")[:] = drawn_ah
+    ch("inverter.ah_charged")[:] = drawn_ah * 0.05
+    ch("inverter.wh_drawn")[:] = drawn_ah * ocv_cell * N_CELLS_V
+    ch("inverter.wh_charged")[:] = drawn_ah * 0.05 * ocv_cell * N_CELLS_V
+
+    # ——— ECU: pedals and brakes follow the acceleration ———
+    pedal = throttle * 100
+    front_psi = brake * 1200 + np.abs(noise(5))
+    ch("ecu.apps1_throttle")[:] = pedal + noise(0.3)
+    ch("ecu.apps2_throttle")[:] = pedal * 1.01 + noise(0.3)
+    ch("ecu.apps_positions")[:] = np.stack([pedal, pedal * 1.01], axis=1)
+    ch("ecu.front_brake_pressure")[:] = front_psi
+    ch("ecu.rear_brake_pressure")[:] = front_psi * 0.6
+    ch("ecu.brake_pressures")[:] = np.stack([front_psi, front_psi * 0.6], axis=1)
+    ch("ecu.brake_pressed")[:] = front_psi > 50
+    ch("ecu.drive_state")[:] = np.where(t < 2, 1, 2)
+    ch("ecu.bms_command")[:] = 1
+    ch("ecu.active_aero_state")[:] = v > 15
+    ch("ecu.active_aero_position")[:] = np.where(v > 15, 1950, 1200)
+    ch("ecu.pump_duty_cycle")[:] = 60
+    ch("ecu.fan_duty_cycle")[:] = np.clip((30 + 40 * stint - 40) * 3, 0, 100)
+    ch("ecu.set_current")[:] = throttle * 220
+    ch("ecu.set_current_brake")[:] = brake * 40
+    ch("ecu.accel_lut_id_response")[:] = 1
+    ch("ecu.torque_status")[:] = 1
+    return db
+
+
+# ——— Formats ———
+class FrontDAQFormat:
+    """NFR25 front-daq .bin: magic, version, record size mod 256, then the parser's fixed records."""
+
+    suffix = ".bin"
+
+    def __init__(self, version: str):
+        from analysis.common.parser_registry import ParserRegistry, ParserVersion
+
+        major, minor, patch = (int(x) for x in version.split("."))
+        requested = ParserVersion("NFR25", major, minor, patch)
+        if ParserRegistry.resolve(requested) != requested:
+            raise ValueError(f"No parser for NFR25 {version}")
+        self.parser = ParserRegistry.get_parser(requested)()
+        if self.parser.BULK_LAYOUT is None:
+            raise ValueError(f"NFR25 {version} has no fixed record layout to write")
+        self.header = b"NFR25" + bytes([major, minor, patch, self.parser.RECORD_SIZE % 256])
+        self.record_size = self.parser.RECORD_SIZE
+
+    def encode(self, db: CarDB) -> bytes:
+        return self.parser.BULK_LAYOUT.encode(db)
+
+
+class TelemFormat:
+    """telem .daq: "NFR25100", the telemetry config, 4 bytes, then one bit-packed frame per snapshot."""
+
+    suffix = ".daq"
+
+    def __init__(self, config_path: str = TELEM_CONFIG, mapping_path: str = TELEM_MAPPING):
+        from analysis.common.parsers.telem.frame_decoder import TelemFrameDecoder
+        from analysis.common.parsers.telem.telem_base_parser import YamlDataMapper, build_telem_config
+
+        with open(config_path) as f:
+            config = f.read()
+        self.encoder = TelemFrameDecoder(build_telem_config(config))
+        mapper = YamlDataMapper(mapping_path)
+        known = set(channel_paths())
+        self.targets: Dict[str, str] = {}  # signal key -> CarDB channel
+        for c in self.encoder.signals:
+            target = mapper.target_path(c.key)
+            if target in known:
+                self.targets[c.key] = target
+        # the logger writes CRLF lines; 0xFF is never UTF-8, so the config scan stops right there
+        self.header = b"NFR25100\r\n" + config.replace("\r\n", "\n").rstrip("\n").replace("\n", "\r\n").encode() + b"\r\n" + b"\xff" * 4
+        self.record_size = self.encoder.frame_size
+
+    def encode(self, db: CarDB) -> bytes:
+        columns = {key: db.channel(path) for key, path in self.targets.items()}
+        columns["time.time_since_startup"] = db.channel("time.time_since_startup")
+        columns["time.unix_time"] = db.channel("time.unix_time")
+        return self.encoder.encode(columns, len(db))
+
+
+FORMATS = {
+    "0.0.1": lambda: FrontDAQFormat("0.0.1"),
+    "0.0.2": lambda: FrontDAQFormat("0.0.2"),
+    "telem": lambda: TelemFormat(),
+}
+
+
+def get_format(name: str):
+    if name not in FORMATS:
+        raise ValueError(f"Unknown format '{name}', expected one of {', '.join(FORMATS)}")
+    return FORMATS[name]()
+
+
+# ——— Writing ———
+def write_log(path: str, fmt, n: int, period_ms: int = PERIOD_MS, seed: int = 0, chunk: int = CHUNK_SNAPSHOTS) -> int:
+    """Write an n-snapshot synthetic log in fmt to path; returns its size in bytes."""
+    if n < 0 or chunk <= 0 or period_ms <= 0:
+        raise ValueError("n must be >= 0, chunk and period_ms positive")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    progress = Progress("  snapshots", total=n)
+    with stage("synth", records=n) as span, open(path, "wb") as f:
+        f.write(fmt.header)
+        for start in range(0, n, chunk):
+            k = min(chunk, n - start)
+            f.write(fmt.encode(simulate(start, k, period_ms, seed)))
+            if start + k >= progress.due:
+                progress.report(start + k)
+        span.bytes = f.tell()
+    progress.finish(n)
+    return len(fmt.header) + n * fmt.record_size
+
+
+def snapshots_for_size(fmt, size_bytes: int) -> int:
+    """How many snapshots make a log of about size_bytes in fmt."""
+    return max(0, (size_bytes - len(fmt.header)) // fmt.record_size)
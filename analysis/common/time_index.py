@@ -0,0 +1,125 @@
+"""
+Sorted time index over a log's clock, for O(log n) time lookups.
+
+The loggers store time.time_since_startup as u4 milliseconds and time.unix_time
+as u4 seconds (0 until the GPS provides a clock). The index turns either into a
+validated, non-decreasing int64 millisecond axis:
+
+- a drop of more than half the u4 range is a counter wraparound and is unwrapped;
+- any other drop is a logger reset: the new run is placed right after the
+  previous one (one typical sample period later) and its position is kept in
+  `resets`.
+
+Lookups are np.searchsorted over that axis.
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+
+CLOCKS = {
+    "startup": "time.time_since_startup",  # ms since the logger booted
+    "unix": "time.unix_time",  # s since the epoch, indexed in ms
+}
+U4_RANGE = 1 << 32
+
+
+class TimeIndex:
+    def __init__(self, clock: str, times: np.ndarray, resets: np.ndarray, wraps: np.ndarray):
+        self.clock = clock
+        self.times = times  # int64 ms, non-decreasing
+        self.resets = resets  # first snapshot of every run after a logger reset
+        self.wraps = wraps  # first snapshot after every u4 wraparound
+        self.times.flags.writeable = False
+
+    def __len__(self):
+        return len(self.times)
+
+    def __repr__(self):
+        return f"TimeIndex({self.clock!r}, {len(self)} snapshots, {len(self.resets)} reset(s), {len(self.wraps)} wrap(s))"
+
+    @property
+    def start_ms(self) -> Optional[int]:
+        return int(self.times[0]) if len(self) else None
+
+    @property
+    def end_ms(self) -> Optional[int]:
+        return int(self.times[-1]) if len(self) else None
+
+    @staticmethod
+    def from_startup(raw: np.ndarray) -> "TimeIndex":
+        """Index a time_since_startup (u4 ms) channel."""
+        raw = np.asarray(raw).astype(np.int64)
+        if len(raw) < 2:
+            return TimeIndex("startup", raw.copy(), np.empty(0, np.int64), np.empty(0, np.int64))
+
+        steps = np.diff(raw)
+        wrapped = steps < -(U4_RANGE // 2)
+        reset = (steps < 0) & ~wrapped
+        steps[wrapped] += U4_RANGE
+        if reset.any():
+            forward = steps[steps > 0]
+            steps[reset] = int(np.median(forward)) if len(forward) else 0
+
+        times = np.empty_like(raw)
+        times[0] = raw[0]
+        np.cumsum(steps, out=times[1:])
+        times[1:] += raw[0]
+        return TimeIndex("startup", times, np.flatnonzero(reset) + 1, np.flatnonzero(wrapped) + 1)
+
+    @staticmethod
+    def from_unix(unix_s: np.ndarray, startup: "TimeIndex") -> "TimeIndex":
+        """
+        Index the unix clock in ms. unix_time only has 1 s resolution and is 0 before
+        the first GPS fix, so it is derived from the startup index plus the offset
+        between the two clocks, measured per logger run where the seconds tick over.
+        """
+        unix_ms = np.asarray(unix_s).astype(np.int64) * 1000
+        valid = unix_ms > 0
+        if not valid.any():
+            raise ValueError("Log has no unix time (no GPS clock was recorded)")
+
+        offsets = unix_ms - startup.times
+        # right after a tick the true unix time is within one sample period of unix_ms
+        tick = np.zeros_like(valid)
+        tick[1:] = valid[1:] & valid[:-1] & (unix_ms[1:] != unix_ms[:-1])
+
+        def estimate(a, b):
+            run_offsets, run_tick = offsets[a:b], tick[a:b]
+            if run_tick.any():
+                return np.median(run_offsets[run_tick])
+            return np.median(run_offsets[valid[a:b]]) + 500  # truncated seconds: aim for the middle
+
+        global_offset = estimate(0, len(startup))
+        bounds = np.concatenate([[0], startup.resets, [len(startup)]])
+        times = np.empty_like(startup.times)
+        for a, b in zip(bounds[:-1], bounds[1:]):
+            offset = estimate(a, b) if valid[a:b].any() else global_offset
+            times[a:b] = startup.times[a:b] + int(offset)
+        if np.any(times[1:] < times[:-1]):
+            raise ValueError("unix_time is not monotonic across logger resets")
+        return TimeIndex("unix", times, startup.resets, startup.wraps)
+
+    def slice(self, start_ms: Optional[float] = None, end_ms: Optional[float] = None) -> slice:
+        """Snapshots with start_ms <= t < end_ms (either bound may be None)."""
+        lo = 0 if start_ms is None else int(np.searchsorted(self.times, start_ms, side="left"))
+        hi = len(self) if end_ms is None else int(np.searchsorted(self.times, end_ms, side="left"))
+        return slice(lo, max(lo, hi))
+
+    def subset(self, s: slice) -> "TimeIndex":
+        """The index of snapshots s (a step-1 slice), on the same time axis."""
+        lo, hi, _ = s.indices(len(self))
+        inside = lambda idx: idx[(idx > lo) & (idx < hi)] - lo
+        return TimeIndex(self.clock, self.times[lo:hi], inside(self.resets), inside(self.wraps))
+
+    def index_at(self, t):
+        """
+        Index of the last snapshot at or before t (a scalar or an array), i.e. the
+        values that were current at time t. Raises ValueError for t before the log.
+        """
+        idx = np.searchsorted(self.times, t, side="right") - 1
+        if np.any(idx < 0):
+            raise ValueError(f"Time {t} is before the start of the log ({self.start_ms} ms)")
+        return idx
@@ -0,0 +1,301 @@
+"""
+Per-chunk zone maps for pruning cross-log searches.
+
+For every CarDB channel and every chunk of CHUNK_RECORDS snapshots a zone map
+keeps the min, max, NaN count and number of value changes. A predicate such as
+"bms.max_cell_temp > 55" or "bms.imd_state changed" can then rule out whole
+chunks (and, through the catalog's per-log stats, whole logs) without looking
+at a single sample. Zone maps are stored next to the transformed output
+(log_836.csv -> log_836.zones.npz).
+"""
+
+from __future__ import annotations
+
+import operator
+import os
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from analysis.common.car_db import CarDB, channel_paths
+
+ZONE_SUFFIX = ".zones.npz"
+CHUNK_RECORDS = 1024
+ROW_CHUNK = 1 << 13  # snapshots of a channel block converted to float64 at a time, bounds peak memory
+
+
+def zone_path(output_path: str) -> str:
+    """Sidecar path for a transformed output, e.g. out/day/log_1.csv -> out/day/log_1.zones.npz"""
+    return os.path.splitext(output_path)[0] + ZONE_SUFFIX
+
+
+# ——— Statistics ———
+class ZoneStats:
+    """
+    min/max/nulls/changes per row for a set of channels. A row is a chunk of one
+    log (ZoneMap) or a whole log (the catalog's channel_stats table).
+    """
+
+    def __init__(self, channels: List[str], mins, maxs, nulls, changes):
+        self.channels = list(channels)
+        self.mins = mins  # (rows, channels)
+        self.maxs = maxs
+        self.nulls = nulls
+        self.changes = changes
+        self._index: Dict[str, int] = {c: i for i, c in enumerate(self.channels)}
+
+    def __len__(self):
+        return self.mins.shape[0]
+
+    def has(self, channel: str) -> bool:
+        return channel in self._index
+
+    def column(self, stat: str, channel: str) -> np.ndarray:
+        return getattr(self, stat)[:, self._index[channel]]
+
+
+def changes(a: np.ndarray) -> np.ndarray:
+    """
+    True where a sample differs from the previous one along the first axis (never
+    at the first sample). NaN -> NaN is not a change, NaN <-> number is: the one
+    rule both the zone maps' change counts and changed() in queries follow.
+    """
+    a = np.asarray(a)
+    out = np.zeros(a.shape, dtype=bool)
+    if len(a) > 1:
+        out[1:] = a[1:] != a[:-1]
+        if a.dtype.kind == "f":
+            out[1:] &= ~(np.isnan(a[1:]) & np.isnan(a[:-1]))
+    return out
+
+
+def _chunk_stats(block: np.ndarray, chunk: int, prev: Optional[np.ndarray] = None):
+    """
+    min/max/nulls/changes of a (n, C) float block per chunk of rows. prev is the
+    row just before the block, if any, so a change at its first row is counted.
+    """
+    n, c = block.shape
+    n_chunks = -(-n // chunk)
+    pad = n_chunks * chunk - n
+
+    isnan = np.isnan(block)
+    if prev is None:
+        changed = changes(block)  # a change is attributed to the chunk holding the new value
+    else:
+        changed = changes(np.concatenate([prev[None], block]))[1:]
+
+    if pad:
+        block = np.concatenate([block, np.full((pad, c), np.nan)])
+        isnan = np.concatenate([isnan, np.zeros((pad, c), dtype=bool)])
+        changed = np.concatenate([changed, np.zeros((pad, c), dtype=bool)])
+    shape = (n_chunks, chunk, c)
+    block = block.reshape(shape)
+    return (
+        np.fmin.reduce(block, axis=1),
+        np.fmax.reduce(block, axis=1),
+        isnan.reshape(shape).sum(axis=1).astype(np.int32),
+        changed.reshape(shape).sum(axis=1).astype(np.int32),
+    )
+
+
+class ZoneMap(ZoneStats):
+    def __init__(self, channels, n_snapshots: int, chunk: int, mins, maxs, nulls, changes):
+        super().__init__(channels, mins, maxs, nulls, changes)
+        self.n_snapshots = n_snapshots
+        self.chunk = chunk
+
+    @staticmethod
+    def build(db: CarDB, channels: Optional[List[str]] = None, chunk: int = CHUNK_RECORDS, block: int = 128) -> "ZoneMap":
+        """
+        Build zone maps for every channel (default: all CarDB leaf channels), block
+        channels at a time over ROW_CHUNK snapshots (rounded to whole chunks) at a time.
+        """
+        channels = channel_paths() if channels is None else list(channels)
+        if not channels:
+            raise ValueError("ZoneMap.build needs at least one channel")
+        n = len(db)
+        rows = max(ROW_CHUNK // chunk, 1) * chunk
+        parts = []
+        for b in range(0, len(channels), block):
+            cols = [db.channel(p) for p in channels[b : b + block]]
+            pieces, prev = [], None
+            for r in range(0, n, rows):
+                window = np.column_stack([col[r : r + rows] for col in cols]).astype(np.float64)
+                pieces.append(_chunk_stats(window, chunk, prev))
+                prev = window[-1]
+            if not pieces:  # no snapshots: zero chunks
+                pieces.append(_chunk_stats(np.empty((0, len(cols))), chunk))
+            parts.append([np.concatenate([p[k] for p in pieces]) for k in range(4)])
+        stats = [np.concatenate([p[k] for p in parts], axis=1) for k in range(4)]
+        return ZoneMap(channels, n, chunk, *stats)
+
+    def summary(self) -> ZoneStats:
+        """The same statistics over the whole log (a single row; NaN min/max for a log without snapshots)."""
+        if len(self) == 0:
+            empty = np.full((1, len(self.channels)), np.nan)
+            zeros = np.zeros((1, len(self.channels)), dtype=np.int32)
+            return ZoneStats(self.channels, empty, empty.copy(), zeros, zeros.copy())
+        with np.errstate(invalid="ignore"):
+            return ZoneStats(
+                self.channels,
+                np.fmin.reduce(self.mins, axis=0, keepdims=True),
+                np.fmax.reduce(self.maxs, axis=0, keepdims=True),
+                self.nulls.sum(axis=0, keepdims=True),
+                self.changes.sum(axis=0, keepdims=True),
+            )
+
+    def save(self, path: str) -> None:
+        with open(path, "wb") as f:
+            np.savez_compressed(
+                f,
+                channels=np.array(self.channels),
+                n_snapshots=np.array(self.n_snapshots),
+                chunk=np.array(self.chunk),
+                mins=self.mins,
+                maxs=self.maxs,
+                nulls=self.nulls,
+                changes=self.changes,
+            )
+
+    @staticmethod
+    def load(path: str) -> "ZoneMap":
+        with np.load(path) as z:
+            return ZoneMap(
+                z["channels"].tolist(),
+                int(z["n_snapshots"]),
+                int(z["chunk"]),
+                z["mins"],
+                z["maxs"],
+                z["nulls"],
+                z["changes"],
+            )
+
+    def chunk_ranges(self, mask: np.ndarray) -> List[Tuple[int, int]]:
+        """Merge the chunks selected by mask into (start, stop) snapshot ranges."""
+        ranges: List[Tuple[int, int]] = []
+        for c in np.flatnonzero(mask):
+            start, stop = c * self.chunk, min((c + 1) * self.chunk, self.n_snapshots)
+            if ranges and ranges[-1][1] == start:
+                ranges[-1] = (ranges[-1][0], stop)
+            else:
+                ranges.append((start, stop))
+        return ranges
+
+
+# ——— Predicates ———
+# prune() answers "might any sample in this row match?" for every row of a ZoneStats.
+# It may say yes when the answer is no (the rows are scanned anyway) but never the reverse.
+class Predicate:
+    def channels(self) -> Set[str]:
+        return set()
+
+    def prune(self, stats: ZoneStats) -> np.ndarray:
+        return np.ones(len(stats), dtype=bool)
+
+
+class Compare(Predicate):
+    """channel <op> value, with op one of > >= < <= == !="""
+
+    OPS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le, "==": operator.eq, "!=": operator.ne}
+
+    def __init__(self, channel: str, op: str, value: float):
+        if op not in self.OPS:
+            raise ValueError(f"Unsupported comparison '{op}'")
+        self.channel, self.op, self.value = channel, op, float(value)
+
+    def channels(self) -> Set[str]:
+        return {self.channel}
+
+    def prune(self, stats: ZoneStats) -> np.ndarray:
+        if not stats.has(self.channel):
+            return super().prune(stats)
+        lo, hi = stats.column("mins", self.channel), stats.column("maxs", self.channel)
+        v = self.value
+        with np.errstate(invalid="ignore"):
+            if self.op == ">":
+                hit = hi > v
+            elif self.op == ">=":
+                hit = hi >= v
+            elif self.op == "<":
+                hit = lo < v
+            elif self.op == "<=":
+                hit = lo <= v
+            elif self.op == "==":
+                hit = (lo <= v) & (v <= hi)
+            else:  # NaN != v holds, so only a row of nothing but v can be skipped
+                hit = ~((lo == v) & (hi == v)) | (stats.column("nulls", self.channel) > 0)
+        return hit  # otherwise all-NaN rows compare False and are skipped
+
+    def __repr__(self):
+        return f"{self.channel} {self.op} {self.value:g}"
+
+
+class Changed(Predicate):
+    """The channel's value changes at some sample in the row."""
+
+    def __init__(self, channel: str):
+        self.channel = channel
+
+    def channels(self) -> Set[str]:
+        return {self.channel}
+
+    def prune(self, stats: ZoneStats) -> np.ndarray:
+        if not stats.has(self.channel):
+            return super().prune(stats)
+        return stats.column("changes", self.channel) > 0
+
+    def __repr__(self):
+        return f"changed({self.channel})"
+
+
+class And(Predicate):
+    def __init__(self, *terms: Predicate):
+        self.terms = terms
+
+    def channels(self) -> Set[str]:
+        return set().union(*(t.channels() for t in self.terms))
+
+    def prune(self, stats: ZoneStats) -> np.ndarray:
+        out = np.ones(len(stats), dtype=bool)
+        for t in self.terms:
+            out &= t.prune(stats)
+        return out
+
+    def __repr__(self):
+        return " and ".join(f"({t!r})" for t in self.terms)
+
+
+class Or(Predicate):
+    def __init__(self, *terms: Predicate):
+        self.terms = terms
+
+    def channels(self) -> Set[str]:
+        return set().union(*(t.channels() for t in self.terms))
+
+    def prune(self, stats: ZoneStats) -> np.ndarray:
+        out = np.zeros(len(stats), dtype=bool)
+        for t in self.terms:
+            out |= t.prune(stats)
+        return out
+
+    def __repr__(self):
+        return " or ".join(f"({t!r})" for t in self.terms)
+
+
+# ——— Query layer ———
+def candidate_chunks(zones: ZoneMap, predicate: Predicate) -> List[Tuple[int, int]]:
+    """Snapshot ranges of one log that might satisfy predicate."""
+    return zones.chunk_ranges(predicate.prune(zones))
+
+
+def candidate_logs(catalog, predicate: Predicate, **filters):
+    """
+    Catalog entries that might satisfy predicate, judged from the per-log stats
+    the catalog keeps; `filters` are passed to LogCatalog.query.
+    """
+    entries = catalog.query(**filters)
+    if not entries:
+        return []
+    stats = catalog.channel_stats([e.path for e in entries], sorted(predicate.channels()))
+    keep = predicate.prune(stats)
+    return [e for e, k in zip(entries, keep) if k]
@@ -12,26 +12,8 @@ def main(car_db, filepath):
 
     """
 
-    # Initialize lists to store data
-    brake_pressure1 = []
-    brake_pressure2 = []
-    long_decel = [] #longitudinal deceleration
-
-    # Iterate through all snapshots in the CarDB
-    # duration = len(car_db._db)
-    # print(f"NUMBER OF RECORDS:{duration}")
-    for idx in range(len(car_db._db)):#the numebr of records?
-        snapshot = car_db.raw_record(idx)
-
-        brake_pressure1.append(snapshot['ecu']['brake_pressures'][0])
-        brake_pressure2.append(snapshot['ecu']['brake_pressures'][1])
-        long_decel.append(snapshot['dynamics']['imu']['accel'][1])
-
-
-
-
-    
-    # times = np.arange(0,duration,1)
+    brake_pressure1 = car_db.channel("ecu.brake_pressures[0]")
+    long_decel = car_db.channel("dynamics.long_decel")  # derived channel (analysis/common/derived.py)
 
     fig = go.Figure()
     fig.add_trace(go.Scatter(x=brake_pressure1, y=long_decel, name="Longitudinal Deceleration", mode='lines'))
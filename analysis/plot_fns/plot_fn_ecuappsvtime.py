@@ -15,36 +15,17 @@ def main(car_db, filepath):
 
     """
 
-    # Initialize lists to store data
-    apps1 = []
-    apps2 = []
-    apps_diff = []#as a percentage out of 100%
-
-    # Iterate through all snapshots in the CarDB
-    duration = len(car_db._db)
-   #print(f"NUMBER OF RECORDS:{duration}")
-    for idx in range(len(car_db._db)):#the numebr of records?
-        snapshot = car_db.raw_record(idx)
-        #print(snapshot)
-        #time_since_startup.append(snapshot['time']['time_since_startup'])
-        apps1.append(snapshot['ecu']['apps_positions'][0])
-        apps2.append(snapshot['ecu']['apps_positions'][1])
-        
-
-    times = np.arange(0,duration,1)
-    apps_diff = np.abs(np.subtract(np.array(apps1), np.array(apps2))) #need to convert to out of 100%
-
-    # Find the maximum difference to scale percentages
-    max_apps_diff = np.max(apps_diff)
-    if max_apps_diff > 0:
-        apps_diff_percentage = (apps_diff / max_apps_diff) * 100
-    else:
-        apps_diff_percentage = np.zeros_like(apps_diff) 
-     
+    # whole-channel reads; the disagreement is a derived channel (analysis/common/derived.py)
+    apps1 = car_db.channel("ecu.apps_positions[0]")
+    apps2 = car_db.channel("ecu.apps_positions[1]")
+    apps_diff_percentage = car_db.channel("ecu.apps_diff_pct")
+
+    times = np.arange(0, len(car_db), 1)
+
     fig = go.Figure()
     fig.add_trace(go.Scatter(x=times, y=apps1, name="APPS 1", mode='lines'))
     fig.add_trace(go.Scatter(x=times, y=apps2, name="APPS 2", mode='lines'))
-    fig.add_trace(go.Scatter(x=times, y=apps_diff_percentage, name="APPS diff (out of 100%)", mode='lines'))
+    fig.add_trace(go.Scatter(x=times, y=apps_diff_percentage, name="APPS diff (% of larger APPS)", mode='lines'))
     
     # Update layout
     fig.update_layout(
@@ -0,0 +1,38 @@
+"""
+Small in-memory CarDBs shared by the tests.
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+
+from analysis.common.car_db import CarDB
+
+CLOCK = "time.time_since_startup"
+UNIX = "time.unix_time"
+
+
+def make_db(n: int, channels: Dict[str, object]) -> CarDB:
+    """A CarDB of n snapshots with each channel path set to its value (a scalar or anything that broadcasts to it)."""
+    db = CarDB(n)
+    for path, value in channels.items():
+        db.channel(path)[:] = value
+    return db
+
+
+def clocked_db(n: int, channels: Optional[Dict[str, object]] = None, start_ms: int = 0, period_ms: int = 10, unix_s: int = 0) -> CarDB:
+    """make_db with the clock ticking every period_ms from start_ms, and unix time from unix_s if given."""
+    ticks = np.arange(n) * period_ms
+    clock = {CLOCK: start_ms + ticks, UNIX: unix_s + ticks // 1000} if unix_s else {CLOCK: start_ms + ticks}
+    return make_db(n, {**clock, **(channels or {})})
+
+
+def sample_db(n: int = 100) -> CarDB:
+    """A 10 ms clock, a draining pack with in-range cell voltages, and an inverter drawing a rising current."""
+    return clocked_db(n, {
+        "bms.cell_voltages": 3.5 + (np.arange(n * 140).reshape(n, 140) % 50) * 0.012,
+        "bms.soc": np.linspace(1, 0.5, n),
+        "bms.fault_summary": np.arange(n) % 3 == 0,
+        "inverter.dc_voltage": 400,
+        "inverter.dc_current": np.arange(n),
+    })
@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from analysis.common.archive import ArchiveReader, encode_chunk, decode_chunk, save_archive
+from analysis.common.car_db import channel_paths
+from analysis.tests.helpers import CLOCK, clocked_db
+
+
+def sample(n=1000, seed=0):
+    rng = np.random.default_rng(seed)
+    return clocked_db(n, {
+        "ecu.front_brake_pressure": np.cumsum(rng.normal(size=n)).astype(np.float32),
+        "ecu.drive_state": np.arange(n) // 300,
+        "bms.pec_fault": rng.random(n) < 0.01,
+    }, start_ms=1000)
+
+
+class TestCodecs(unittest.TestCase):
+    def roundtrip(self, a):
+        codec, blob = encode_chunk(a)
+        out = decode_chunk(codec, blob, a.dtype, len(a))
+        self.assertEqual(out.dtype, a.dtype)
+        self.assertEqual(out.tobytes(), a.tobytes())
+        return codec
+
+    def test_exact_roundtrip(self):
+        rng = np.random.default_rng(1)
+        self.assertEqual(self.roundtrip(np.zeros(500, np.float32)), "rle")
+        self.assertEqual(self.roundtrip((np.arange(500) * 7 + 3).astype(np.uint32)), "delta")
+        self.roundtrip(rng.integers(-(2**31), 2**31 - 1, 500, dtype=np.int32))
+        self.roundtrip(np.array([0.0, -0.0, np.nan, np.inf, -np.inf, 1e-45] * 50, np.float32))
+        self.roundtrip(np.cumsum(rng.normal(size=500)))
+        self.roundtrip(rng.random(500) < 0.5)
+        self.roundtrip(np.array([5], np.uint8))
+
+
+class TestArchive(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "log.nfra")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_roundtrip_and_codecs(self):
+        db = sample()
+        save_archive(db, self.path, chunk=256)
+        with ArchiveReader(self.path) as reader:
+            self.assertEqual((len(reader), reader.n_chunks), (1000, 4))
+            for p in channel_paths():
+                self.assertEqual(reader.channel(p).tobytes(), np.ascontiguousarray(db.channel(p)).tobytes(), p)
+            self.assertEqual(set(reader.codecs("bms.pec_fault")), {"rle"})
+            self.assertEqual(set(reader.codecs(CLOCK)), {"delta"})
+            restored = reader.to_db()
+        self.assertEqual(restored._db.tobytes(), db._db.tobytes())
+        self.assertLess(os.path.getsize(self.path), db._db.nbytes / 20)
+
+    def test_window_reads_only_overlapping_chunks(self):
+        db = sample()
+        save_archive(db, self.path, chunk=256)
+        with ArchiveReader(self.path) as reader:
+            self.assertEqual(reader.chunks_between(3600, 4000), [1])  # rows 260-300
+            window = reader.window([CLOCK, "ecu.front_brake_pressure"], 3600, 4000)
+        np.testing.assert_array_equal(window[CLOCK], db.channel(CLOCK)[260:301])
+        np.testing.assert_array_equal(window["ecu.front_brake_pressure"], db.channel("ecu.front_brake_pressure")[260:301])
+
+    def test_rejects_other_files(self):
+        with open(self.path, "wb") as f:
+            f.write(b"PK\x03\x04 not an archive")
+        with self.assertRaises(ValueError):
+            ArchiveReader(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
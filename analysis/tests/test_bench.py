@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+
+from analysis.common.bench import StageResult, compare, format_table, load_results, measure, save_results
+
+
+def result(name, seconds, error=None, calibration=0.0):
+    return StageResult(name, seconds, seconds, 1000, 10**6, 100.0, 1.0, error, calibration)
+
+
+class TestBench(unittest.TestCase):
+    def test_measure(self):
+        calls = []
+
+        def stage():
+            calls.append(1)
+            print("progress output is silenced")
+            return 500, 2 * 10**6
+
+        r = measure("stage", stage, setup=lambda: calls.append(0), repeat=2, min_seconds=0)
+        self.assertIsNone(r.error)
+        self.assertEqual(calls, [0, 1] * 3)  # 2 timed runs + 1 traced run, each after its setup
+        self.assertEqual((r.records, r.bytes), (500, 2 * 10**6))
+        self.assertGreater(r.seconds, 0)
+        self.assertAlmostEqual(r.records_per_s, 500 / r.seconds)
+        self.assertGreater(r.calibration_s, 0)
+
+        calls.clear()
+        measure("stage", stage, setup=lambda: calls.append(0), repeat=2, min_seconds=0.01)
+        self.assertGreater(calls.count(1), 3)  # a stage this short is repeated until 10 ms of runs
+
+        failed = measure("broken", lambda: 1 / 0)
+        self.assertTrue(failed.error.startswith("ZeroDivisionError"))
+
+    def test_compare(self):
+        baseline = {
+            "fast": result("fast", 1.0).to_dict(),
+            "tiny": result("tiny", 0.001).to_dict(),  # 3x slower, but within timer noise
+            "ok": result("ok", 1.0).to_dict(),
+            "broken": result("broken", 0, "ValueError").to_dict(),
+        }
+        regressions = compare(
+            [result("fast", 1.3), result("tiny", 0.003), result("ok", 1.2), result("broken", 0, "ValueError"), result("new", 9.0)],
+            baseline,
+        )
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith("fast:"))
+        self.assertEqual(compare([result("ok", 0, "KeyError")], baseline), ["ok: now fails (KeyError)"])
+        self.assertEqual(compare([result("fast", 1.3)], baseline, threshold=0.5), [])
+
+    def test_compare_scales_by_calibration(self):
+        baseline = {"stage": result("stage", 1.0, calibration=0.01).to_dict()}
+        self.assertEqual(compare([result("stage", 2.2, calibration=0.02)], baseline), [])  # a machine half as fast
+        self.assertEqual(len(compare([result("stage", 1.3, calibration=0.01)], baseline)), 1)
+        self.assertEqual(len(compare([result("stage", 1.3)], baseline)), 1)  # uncalibrated: raw times
+        # a faster calibration never lowers the expectation, so it can't make a regression out of an unchanged stage
+        self.assertEqual(compare([result("stage", 1.1, calibration=0.005)], baseline), [])
+        self.assertEqual(len(compare([result("stage", 1.3, calibration=0.005)], baseline)), 1)
+        # and a 10x slower calibration raises it 2x at most
+        self.assertEqual(len(compare([result("stage", 2.6, calibration=0.1)], baseline)), 1)
+        self.assertIn("1.10x", format_table([result("stage", 2.2, calibration=0.02)], baseline))
+
+    def test_save_load(self):
+        results = [result("a", 0.5), result("b", 0, "ValueError: x")]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench", "baseline.json")
+            save_results(results, path)
+            loaded = load_results(path)
+        self.assertEqual(loaded["a"]["records_per_s"], 2000)
+        self.assertEqual(loaded["b"]["error"], "ValueError: x")
+        self.assertEqual(compare(results, loaded), [])
+        self.assertIn("1.00x", format_table(results, loaded))
+
+
+if __name__ == "__main__":
+    unittest.main()
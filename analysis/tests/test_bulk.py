@@ -0,0 +1,86 @@
+import os
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from analysis.common import parser_registry
+from analysis.common.car_db import CarDB, car_snapshot_dtype, channel_paths
+from analysis.common.parsers.bulk import BulkLayout, struct_values
+from analysis.common.parsers.front_daq_001 import FrontDAQParser
+from analysis.common.parsers.front_daq_002 import FullDAQParser
+
+LOG_002 = "data/front-daq/drake/log_855.bin"
+LOG_001 = "data/front-daq/2025-5-4/log_272.bin"
+
+
+def records_of(path, parser):
+    with open(path, "rb") as f:
+        data = f.read()[parser.HEADER_SIZE :]
+    n = len(data) // parser.RECORD_SIZE
+    return memoryview(data)[: n * parser.RECORD_SIZE], n
+
+
+def per_record(parser, data, n):
+    out = np.zeros(n, dtype=car_snapshot_dtype)
+    size = parser.RECORD_SIZE
+    for i in range(n):
+        parser._decode_record(data[i * size : (i + 1) * size], out[i])
+    return out
+
+
+def bulk(parser, data, n, workers=None):
+    out = np.zeros(n, dtype=car_snapshot_dtype)
+    parser.decode_into(data, out, workers)
+    return out
+
+
+class TestBulkLayout(unittest.TestCase):
+    def test_struct_values(self):
+        values = struct_values("<I2x3h?f")
+        self.assertEqual([(c, o) for c, _, o in values], [("I", 0), ("h", 6), ("h", 8), ("h", 10), ("?", 12), ("f", 13)])
+        self.assertEqual(values[-1][1], np.dtype("<f4"))
+        with self.assertRaises(ValueError):
+            struct_values("I")  # native alignment: no fixed layout
+
+    def test_layout_checks_coverage(self):
+        with self.assertRaises(ValueError):
+            BulkLayout("<I3h", [("time.time_since_startup", 1), (None, 2)])
+        with self.assertRaises(ValueError):
+            BulkLayout("<Ihf", [("time.time_since_startup", 1), ("bms.cell_temps", 2)])  # h then f: not one array
+
+    def test_bools_are_struct_bools(self):
+        layout = BulkLayout("<??I", [("bms.fault_summary", 1), ("time.hour", 1), ("time.time_since_startup", 1)])
+        data = bytes([2, 3, 7, 0, 0, 0]) + bytes([0, 0, 9, 0, 0, 0])  # struct reads any non-zero byte as True
+        db = CarDB(2)
+        layout.decode(data, db._db)
+        self.assertEqual(np.ascontiguousarray(db.channel("bms.fault_summary")).view(np.uint8).tolist(), [1, 0])
+        self.assertEqual(db.channel("time.hour").tolist(), [1, 0])
+        self.assertEqual(db.channel("time.time_since_startup").tolist(), [7, 9])
+
+
+@unittest.skipUnless(os.path.exists(LOG_002) and os.path.exists(LOG_001), "sample logs not present")
+class TestBulkDecode(unittest.TestCase):
+    def assertSameRecords(self, a, b):
+        self.assertEqual(a.tobytes(), b.tobytes())
+
+    def test_matches_per_record_decoding(self):
+        for parser, path in ((FullDAQParser(), LOG_002), (FrontDAQParser(), LOG_001)):
+            data, n = records_of(path, parser)
+            self.assertGreater(n, 0)
+            self.assertSameRecords(bulk(parser, data, n), per_record(parser, data, n))
+
+    def test_parallel_ranges_match(self):
+        parser = FullDAQParser()
+        data, n = records_of(LOG_002, parser)
+        with mock.patch.object(parser_registry, "MIN_RANGE_RECORDS", 10):
+            self.assertSameRecords(bulk(parser, data, n, workers=3), bulk(parser, data, n, workers=1))
+
+    def test_001_logs_parse(self):
+        db = parser_registry.ParserRegistry.parse(LOG_001)
+        self.assertGreater(len(db), 0)
+        self.assertTrue(all(db.channel(p).shape[0] == len(db) for p in channel_paths()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import tempfile
+import unittest
+
+from analysis.common.catalog import LogCatalog
+from analysis.common.parser_registry import ParserVersion
+from analysis.tests.helpers import make_db
+
+
+def sample():
+    return make_db(4, {
+        "time.time_since_startup": [1000, 2000, 3000, 401000],
+        "time.unix_time": [0, 1749500000, 1749500001, 1749500400],
+        "dynamics.gps_location": [[0, 0], [42.05, -87.68], [42.06, -87.67], [0, 0]],
+    })
+
+
+class TestLogCatalog(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, "out")
+        self.src = os.path.join(self.tmp.name, "log_1.bin")
+        self.dst = os.path.join(self.root, "front-daq", "2025-6-10", "log_1.csv")
+        os.makedirs(os.path.dirname(self.dst))
+        with open(self.src, "wb") as f:
+            f.write(b"NFR25\x00\x00\x02" + bytes(64))
+        open(self.dst, "w").close()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_add_and_query(self):
+        with LogCatalog(self.root) as cat:
+            entry = cat.add(self.src, self.dst, sample(), ParserVersion("NFR25", 0, 0, 2))
+            self.assertEqual((entry.log_system, entry.drive_day, entry.name), ("front-daq", "2025-6-10", "log_1"))
+            self.assertEqual(entry.time_span_ms, 400000)
+            self.assertEqual((entry.unix_start, entry.unix_end), (1749500000, 1749500400))
+            self.assertAlmostEqual(entry.lat_min, 42.05)
+            self.assertAlmostEqual(entry.lon_max, -87.67)
+
+            self.assertEqual(len(cat.query(drive_day="2025-6-10", parser_version="0.0.2")), 1)
+            self.assertEqual(len(cat.query(min_duration_s=300)), 1)
+            self.assertEqual(len(cat.query(min_duration_s=600)), 0)
+            self.assertEqual(len(cat.query(parser_version="0.0.1")), 0)
+            self.assertEqual(cat.drive_days("front-daq"), ["2025-6-10"])
+
+    def test_is_current_tracks_changes(self):
+        with LogCatalog(self.root) as cat:
+            self.assertFalse(cat.is_current(self.src))
+            cat.add(self.src, self.dst, sample())
+            self.assertTrue(cat.is_current(self.src))
+
+            # touched but identical content stays current
+            os.utime(self.src, (1, 1))
+            self.assertTrue(cat.is_current(self.src))
+
+            with open(self.src, "ab") as f:
+                f.write(b"\x01")
+            self.assertFalse(cat.is_current(self.src))
+
+            os.remove(self.dst)
+            self.assertFalse(cat.is_current(self.src))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from analysis.common.car_db import CarDB
+from analysis.common import synth
+from analysis.common.compact import ChannelScale, CompactCarDB, flag_bits, scales_for_log
+from analysis.common.parser_registry import ParserRegistry
+from analysis.tests.helpers import sample_db
+
+TELEM_LOG = "data/telem/2025-06-10/log_1.daq"
+LOG_002 = "data/front-daq/drake/log_855.bin"
+
+
+SCALES = {
+    "bms.cell_voltages": ChannelScale("u1", 0.012, 2.0),
+    "inverter.dc_current": ChannelScale("<i2"),
+    "bms.soc": ChannelScale("u1", 0.004),
+}
+
+
+class TestCompactCarDB(unittest.TestCase):
+    def test_scaled_on_access(self):
+        db = sample_db()
+        compact = db.to_compact(SCALES)
+        self.assertEqual(compact.raw_channel("bms.cell_voltages").dtype, np.uint8)
+        self.assertEqual(compact.raw_channel("bms.cell_voltages")[0, 1], 126)  # (3.512 - 2) / 0.012
+        self.assertTrue(np.allclose(compact.channel("bms.cell_voltages[3]"), db.channel("bms.cell_voltages[3]"), atol=1e-6))
+        self.assertEqual(compact.channel("bms.cell_voltages").dtype, np.float32)
+        self.assertTrue(np.allclose(compact.channel("bms.soc"), db.channel("bms.soc"), atol=0.002))  # rounded to 0.004
+        self.assertTrue(np.shares_memory(compact.channel("inverter.dc_voltage"), compact._db))  # unscaled: a view
+        self.assertTrue(np.allclose(compact.channel("inverter.power_kw"), db.channel("inverter.power_kw")))
+        self.assertLess(compact.nbytes, db._db.nbytes * 0.75)  # 140 cells at 1 byte instead of 4
+
+    def test_out_of_range_values_raise(self):
+        db = sample_db()
+        db.channel("bms.cell_voltages")[5, 0] = 1.0  # below the 2.0 V offset
+        with self.assertRaises(ValueError):
+            db.to_compact(SCALES)
+        db.channel("bms.cell_voltages")[5, 0] = np.nan
+        with self.assertRaises(ValueError):
+            db.to_compact(SCALES)
+        with self.assertRaises(ValueError):
+            CompactCarDB(1, {"bms.nope": ChannelScale("u1")})
+
+
+class TestPackedFlags(unittest.TestCase):
+    def setUp(self):
+        self.db = CarDB(300)
+        rng = np.random.default_rng(0)
+        for path in flag_bits():
+            self.db.channel(path)[:] = rng.random(300) < 0.2
+        self.compact = CompactCarDB.from_db(self.db, {})
+
+    def test_one_word_per_subsystem(self):
+        self.assertEqual(flag_bits()["bms.pec_fault"], ("bms.flags", 9))
+        self.assertEqual(self.compact.raw_channel("bms.flags").dtype, np.uint16)
+        self.assertEqual(self.compact.raw_channel("ecu.flags").dtype, np.uint8)
+        self.assertEqual(self.db._db.dtype.itemsize - self.compact._db.dtype.itemsize, 24 - 4)
+        self.assertEqual(self.compact.to_car_db()._db.tobytes(), self.db._db.tobytes())
+        with self.assertRaises(ValueError):
+            CompactCarDB(1, {"bms.pec_fault": ChannelScale("u1")})
+
+    def test_unpacked_on_access(self):
+        for path in ["bms.overcurrent_fault", "pdm.reset_ac_efuse", "ecu.implausibilities", "ecu.implausibilities[3]"]:
+            self.assertEqual(self.compact.channel(path).tolist(), self.db.channel(path).tolist(), path)
+        self.assertEqual(self.compact.flags("ecu")[:, 5].tolist(), self.db.channel("ecu.igbt_temp_limiting").tolist())
+
+    def test_scans_on_words(self):
+        bms = [p for p in flag_bits() if p.startswith("bms.")]
+        self.assertEqual(self.compact.any_flag("bms").tolist(), np.any([self.db.channel(p) for p in bms], axis=0).tolist())
+        implaus = self.db.channel("ecu.implausibilities")
+        rising = np.flatnonzero((implaus[1:] & ~implaus[:-1]).any(axis=1)) + 1
+        falling = np.flatnonzero((~implaus[1:] & implaus[:-1]).any(axis=1)) + 1
+        self.assertEqual(self.compact.flag_edges("ecu.implausibilities").tolist(), rising.tolist())
+        self.assertEqual(self.compact.flag_edges("ecu.implausibilities", rising=False).tolist(), falling.tolist())
+        with self.assertRaises(KeyError):
+            self.compact.any_flag("corners")
+
+
+class TestLogScales(unittest.TestCase):
+    def test_telem_round_trip_is_exact(self):
+        scales = scales_for_log(TELEM_LOG)
+        self.assertEqual(scales["bms.cell_voltages"], ChannelScale("u1", 0.012, 2.0))
+        self.assertNotIn("bms.fault_summary", scales)  # bools are already a byte
+        seg = ParserRegistry.parse(TELEM_LOG, segment=1024)
+        compact = seg.to_compact(scales)
+        self.assertEqual(compact.to_car_db()._db.tobytes(), seg.to_car_db()._db.tobytes())
+        self.assertGreater(seg.to_car_db()._db.nbytes / compact.nbytes, 2)
+
+    def test_telem_float_signals_stay_float(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "log.daq")
+            synth.write_log(path, synth.get_format("telem"), 600)
+            scales = scales_for_log(path)
+            self.assertNotIn("dynamics.steering_angle", scales)  # a 32-bit float signal
+            seg = ParserRegistry.parse(path, segment=256)
+            self.assertEqual(seg.to_compact(scales).to_car_db()._db.tobytes(), seg.to_car_db()._db.tobytes())
+
+    def test_front_daq_integers(self):
+        scales = scales_for_log(LOG_002)
+        self.assertEqual(scales["inverter.rpm"], ChannelScale("<i2"))
+        self.assertNotIn("bms.cell_voltages", scales)  # f4 in the record
+        db = ParserRegistry.parse(LOG_002)
+        self.assertEqual(db.to_compact(scales).to_car_db()._db.tobytes(), db._db.tobytes())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import os
+import subprocess
+import sys
+import unittest
+
+import daq
+from analysis.common.profiling import parse_importtime
+
+ROOT = os.path.join(os.path.dirname(__file__), "..", "..")
+
+
+class TestDispatcher(unittest.TestCase):
+    def test_manifest_from_file_names(self):
+        manifest = daq.tool_manifest()
+        self.assertEqual(manifest["transform"], "analysis.tools.daq_transform")
+        self.assertEqual(manifest["test"], "analysis.tools.daq_test")
+        self.assertTrue(all(m.startswith("analysis.tools.daq_") for m in manifest.values()))
+
+    def test_only_the_selected_tool_is_imported(self):
+        script = (
+            "import sys, daq\n"
+            "sys.argv = ['daq.py', 'test', '--help']\n"
+            "try:\n"
+            "    daq.main()\n"
+            "except SystemExit:\n"
+            "    pass\n"
+            "print(' '.join(sys.modules), file=sys.stderr)\n"
+        )
+        proc = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True)
+        imported = set(proc.stderr.split())
+        self.assertIn("analysis.tools.daq_test", imported)
+        for heavy in ("analysis.tools.daq_transform", "numpy", "pandas", "plotly", "yaml", "jinja2"):
+            self.assertNotIn(heavy, imported)
+
+    def test_parse_importtime(self):
+        text = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       213 |        213 |   _io\n"
+            "import time:      1283 |      93420 | analysis.common.parser_registry\n"
+            "some other output\n"
+        )
+        self.assertEqual(parse_importtime(text), [("_io", 213, 213, 1), ("analysis.common.parser_registry", 1283, 93420, 0)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+
+import numpy as np
+
+from analysis.common.decimate import minmax_decimate, minmax_indices, window_indices
+
+
+class TestMinmaxIndices(unittest.TestCase):
+    def test_keeps_every_bucket_extreme(self):
+        rng = np.random.default_rng(0)
+        y = rng.normal(size=10_007)  # ragged last bucket
+        y[1234], y[8765] = 50, -50
+        idx = minmax_indices(y, 200)
+        self.assertLessEqual(len(idx), 210)
+        self.assertTrue(np.all(np.diff(idx) > 0))
+        self.assertEqual((idx[0], idx[-1]), (0, len(y) - 1))
+        self.assertIn(1234, idx)
+        self.assertIn(8765, idx)
+        bucket = -(-len(y) // 100)
+        for b in (0, 57, 99):
+            chunk = slice(b * bucket, min((b + 1) * bucket, len(y)))
+            self.assertIn(chunk.start + y[chunk].argmax(), idx)
+            self.assertIn(chunk.start + y[chunk].argmin(), idx)
+
+    def test_constant(self):
+        idx = minmax_indices(np.full(1000, 3.5), 100)
+        self.assertLessEqual(len(idx), 100)
+        self.assertEqual((idx[0], idx[-1]), (0, 999))
+
+    def test_nan_does_not_hide_extremes(self):
+        y = np.arange(1000.0)
+        y[[5, 510]] = np.nan
+        y[:200][17] = -1  # the minimum of the first bucket
+        idx = minmax_indices(y, 10)  # buckets of 200
+        self.assertIn(17, idx)
+        self.assertIn(199, idx)
+        self.assertIn(400, idx)  # min of the bucket holding the second NaN
+        self.assertNotIn(510, idx)
+        all_nan = minmax_indices(np.full(1000, np.nan), 10)
+        self.assertEqual((all_nan[0], all_nan[-1]), (0, 999))
+
+    def test_short_and_non_numeric(self):
+        self.assertEqual(minmax_indices(np.arange(5.0), 10).tolist(), list(range(5)))
+        self.assertEqual(minmax_indices(np.array([]), 10).tolist(), [])
+        self.assertEqual(len(minmax_indices(np.arange(100.0), 1)), 2)  # first and last
+        labels = np.array([f"s{i}" for i in range(100)])
+        self.assertEqual(len(minmax_indices(labels, 10)), 10)
+
+    def test_decimate_pairs_x_with_y(self):
+        x = np.arange(1000) * 10
+        y = np.sin(np.arange(1000) / 50)
+        xs, ys = minmax_decimate(x, y, 100)
+        np.testing.assert_array_equal(ys, y[xs // 10])
+        xs, ys = minmax_decimate(x[:3], y[:3], 100)
+        self.assertEqual(xs.tolist(), [0, 10, 20])
+
+
+class TestWindowIndices(unittest.TestCase):
+    def test_sorted_x_is_a_slice(self):
+        x = np.arange(100) * 10.0
+        window = window_indices(x, 95, 200)
+        self.assertEqual(window, slice(10, 21))
+        self.assertEqual(window_indices(x, 2000, 3000), slice(100, 100))
+        self.assertEqual(window_indices(x[:1], 0, 1), slice(0, 1))
+        self.assertEqual(window_indices(x[:0], 0, 1), slice(0, 0))
+
+    def test_unsorted_and_nan_x_is_a_mask(self):
+        x = np.array([3.0, 1.0, np.nan, 2.0, 5.0])
+        self.assertEqual(window_indices(x, 1.5, 3).tolist(), [True, False, False, True, False])
+        self.assertEqual(window_indices(np.full(4, 7.0), 7, 7), slice(0, 4))  # constant is sorted
+        self.assertEqual(window_indices(np.array(["a", "b"]), 0, 1), slice(None))
+
+
+if __name__ == "__main__":
+    unittest.main()
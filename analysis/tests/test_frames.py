@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from analysis.common.car_db import channel_columns
+from analysis.common.columnar import ColumnStore, save_columns
+from analysis.common.frames import select_columns, to_arrow
+from analysis.tests.helpers import sample_db
+
+try:
+    import pandas as pd
+    import pyarrow as pa
+except ImportError:  # optional outputs
+    pd = pa = None
+
+
+class TestColumns(unittest.TestCase):
+    def test_names_match_csv(self):
+        db = sample_db(3)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "log.csv")
+            db.to_csv(path)
+            with open(path) as f:
+                header = set(f.readline().strip().split(","))
+        names = {name for name, _ in select_columns()}
+        # to_csv writes the nested dynamics.imu struct as one column; everything else is the same
+        self.assertEqual(header - names, {"dynamics_imu"})
+        self.assertTrue(all(n.startswith("dynamics_imu_") for n in names - header))
+
+    def test_select_by_name_path_or_derived(self):
+        cols = select_columns(["bms_soc", "corners[1].wheel_speed", "inverter.power_kw"])
+        self.assertEqual(cols, [("bms_soc", "bms.soc"), ("corners1_wheel_speed", "corners[1].wheel_speed"), ("inverter.power_kw", "inverter.power_kw")])
+        with self.assertRaises(KeyError):
+            select_columns(["bms_nope"])
+        self.assertEqual(channel_columns(lists=True)["bms.cell_voltages"], "bms_cell_voltages")
+
+
+@unittest.skipIf(pa is None, "pyarrow and pandas not installed")
+class TestExport(unittest.TestCase):
+    def test_dataframe_views_the_records(self):
+        db = sample_db(50)
+        df = db.to_dataframe()
+        self.assertEqual(len(df), len(db))
+        self.assertTrue(np.shares_memory(df["bms_soc"].to_numpy(), db._db))
+        self.assertEqual(df["bms_cell_voltages_139"].tolist(), db.channel("bms.cell_voltages[139]").tolist())
+        self.assertEqual(df["bms_fault_summary"].dtype, bool)
+
+        power = db.to_dataframe(["inverter.power_kw"])["inverter.power_kw"]
+        self.assertTrue(np.allclose(power, db.channel("inverter.power_kw")))
+
+    def test_arrow_columns_and_lists(self):
+        db = sample_db(50)
+        table = db.to_arrow(["time.time_since_startup", "bms.cell_voltages", "bms_fault_summary"], lists=True)
+        self.assertEqual(table.column_names, ["time_time_since_startup", "bms_cell_voltages", "bms_fault_summary"])
+        self.assertEqual(table.schema.field("bms_cell_voltages").type, pa.list_(pa.float32(), 140))
+        self.assertTrue(np.array_equal(np.stack(table["bms_cell_voltages"].to_numpy(zero_copy_only=False)), db.channel("bms.cell_voltages")))
+        self.assertEqual(table["bms_fault_summary"].to_pylist(), db.channel("bms.fault_summary").tolist())
+        self.assertEqual(db.to_arrow().num_columns, len(channel_columns()))
+
+    def test_contiguous_columns_are_wrapped(self):
+        db = sample_db(50)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "log.columns.npz")
+            save_columns(db, path)
+            store = ColumnStore(path)
+            try:
+                soc = store.channel("bms.soc")
+                table = to_arrow(store, ["bms.soc"])
+                self.assertEqual(table["bms_soc"].chunk(0).buffers()[1].address, soc.ctypes.data)
+                del table, soc
+            finally:
+                store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
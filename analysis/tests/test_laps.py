@@ -0,0 +1,116 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from analysis.common.car_db import CarDB
+from analysis.common.laps import Gate, load_or_build
+
+LAT0, LON0 = 42.0, -87.7
+M_PER_DEG = 6371000.0 * np.pi / 180.0
+
+
+def offset(east_m, north_m):
+    return LAT0 + north_m / M_PER_DEG, LON0 + east_m / (M_PER_DEG * np.cos(np.radians(LAT0)))
+
+
+def circle_db(laps=3.5, lap_s=30.0, rate_hz=10, start_angle=-np.pi / 2 - np.pi / 300):
+    """
+    Counter-clockwise laps of a 50 m circle starting just before the south point, so
+    the east and west gates are crossed halfway between samples (7.55 s, 22.55 s, ...).
+    """
+    n = int(laps * lap_s * rate_hz)
+    t = np.arange(n) / rate_hz
+    angle = start_angle + 2 * np.pi * t / lap_s
+    lat, lon = offset(50 * np.cos(angle), 50 * np.sin(angle))
+    db = CarDB(n)
+    db.channel("time.time_since_startup")[:] = np.round(t * 1000)
+    db.channel("dynamics.gps_location")[:] = np.column_stack([lat, lon])
+    db.channel("ecu.front_brake_pressure")[:] = np.arange(n)
+    return db
+
+
+EAST = Gate(*offset(40, 0), *offset(60, 0))
+WEST = Gate(*offset(-40, 0), *offset(-60, 0))
+
+
+class TestLaps(unittest.TestCase):
+    def test_laps_and_sectors(self):
+        db = circle_db()
+        index = db.detect_laps(EAST, [WEST])
+        # starting at the south point, the east gate is first crossed a quarter lap in
+        self.assertEqual(index.n_laps, 3)
+        np.testing.assert_allclose(index.crossing_ms, [7550, 37550, 67550, 97550], atol=1)
+        np.testing.assert_allclose(index.lap_times_ms(), 30000, atol=1)
+        np.testing.assert_allclose(index.sector_times_ms(), 15000, atol=1)
+
+    def test_lap_is_a_view(self):
+        db = circle_db()
+        db.detect_laps(EAST)
+        lap = db.lap(2)
+        self.assertEqual(len(lap), 300)
+        self.assertEqual(lap.channel("ecu.front_brake_pressure")[0], 376)  # first sample after 37.55 s
+        self.assertTrue(np.shares_memory(lap._db, db._db))
+        self.assertEqual(len(db.lap(0)), 76)  # out-lap
+        with self.assertRaises(ValueError):
+            db.lap(5)
+
+    def test_jitter_and_missing_fix(self):
+        db = circle_db()
+        gps = db.channel("dynamics.gps_location")
+        gps[77:79] = gps[75]  # GPS jitter back over the line right after the 1st crossing
+        index = db.detect_laps(EAST, min_lap_s=10)
+        np.testing.assert_allclose(index.crossing_ms, [7550, 37550, 67550, 97550], atol=1)
+        gps[370:380] = 0  # GPS dropout across the 2nd crossing
+        self.assertEqual(db.detect_laps(EAST).n_laps, 2)
+
+    def test_stored_index_is_reused(self):
+        db = circle_db()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "log.laps.npz")
+            built = load_or_build(lambda: db, path, EAST, [WEST])
+            reused = load_or_build(lambda: self.fail("GPS trace re-scanned"), path, EAST, [WEST])
+            np.testing.assert_array_equal(reused.crossings, built.crossings)
+            self.assertEqual(reused.sectors, [WEST])
+            other = load_or_build(lambda: db, path, WEST)  # different gate: rebuilt
+            self.assertEqual(other.gate, WEST)
+
+    def test_load_or_build_notices_a_changed_log(self):
+        db = circle_db()
+        with tempfile.TemporaryDirectory() as tmp:
+            path, log = os.path.join(tmp, "log.laps.npz"), os.path.join(tmp, "log.bin")
+            with open(log, "wb") as f:
+                f.write(b"x" * 100)
+            built = load_or_build(lambda: db, path, EAST, n_snapshots=len(db), source_path=log)
+            self.assertEqual(built.source, (100, os.path.getmtime(log)))
+            load_or_build(lambda: self.fail("GPS trace re-scanned"), path, EAST, n_snapshots=len(db), source_path=log)
+
+            shorter = circle_db(laps=2.5)
+            rebuilt = load_or_build(lambda: shorter, path, EAST, n_snapshots=len(shorter), source_path=log)
+            self.assertEqual(rebuilt.n_snapshots, len(shorter))
+            with open(log, "ab") as f:
+                f.write(b"more records")
+            rebuilt = load_or_build(lambda: db, path, EAST, n_snapshots=len(db), source_path=log)
+            self.assertEqual(rebuilt.source[0], 112)
+
+            closed = []
+
+            class Store:
+                channel = db.channel
+
+                def close(self):
+                    closed.append(True)
+
+            os.remove(path)
+            load_or_build(Store, path, EAST)
+            self.assertEqual(closed, [True])
+
+    def test_gate_parse(self):
+        self.assertEqual(Gate.parse("1,2,3,4"), Gate(1, 2, 3, 4))
+        with self.assertRaises(ValueError):
+            Gate.parse("1,2,3")
+
+
+if __name__ == "__main__":
+    unittest.main()
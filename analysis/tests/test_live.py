@@ -0,0 +1,105 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from analysis.common.live import REPLAY_RATE_HZ, TelemIngestServer, replay, replay_schedule
+from analysis.common.parsers.telem.frame_decoder import TelemFrameDecoder
+from analysis.common.parsers.telem.telem import TelemBitBuffer, TelemDataParser
+from analysis.common.parsers.telem.telem_base_parser import build_telem_config, split_telem_log
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "mappings", "2025_6_10.telem")
+
+
+def load_config_text():
+    with open(CONFIG_PATH) as f:
+        return f.read()
+
+
+def random_frames(decoder, n, seed=0):
+    rng = np.random.default_rng(seed)
+    frames = np.zeros(n, dtype=decoder.dtype)
+    frames["time_since_startup"] = 1000 + 10 * np.arange(n)
+    frames["unix_time"] = 1718000000 + np.arange(n) // 100
+    frames["slots"] = rng.integers(0, np.iinfo(np.uint64).max, size=(n, decoder.n_slots), dtype=np.uint64, endpoint=True)
+    return frames.tobytes()
+
+
+class TestFrameDecoder(unittest.TestCase):
+    def test_matches_reference_parser(self):
+        config = build_telem_config(load_config_text())
+        decoder = TelemFrameDecoder(config)
+        data = random_frames(decoder, 4)
+        columns = decoder.decode(data)
+
+        reference = TelemDataParser(build_telem_config(load_config_text()))
+        self.assertEqual(decoder.frame_size, 8 + reference.total_bits // 8)
+        for i in range(4):
+            frame = data[i * decoder.frame_size + 8 : (i + 1) * decoder.frame_size]
+            values = reference.parse_snapshot(TelemBitBuffer(bit_size=reference.total_bits, buffer=bytearray(frame)))
+            for key, value in values.items():
+                self.assertAlmostEqual(float(columns[key][i]), float(value), msg=key)
+        self.assertEqual(columns["time.time_since_startup"].tolist(), [1000, 1010, 1020, 1030])
+
+    def test_split_log(self):
+        cfg = load_config_text()
+        raw = b"NFR25100\n" + cfg.encode() + b"\xff\xff\xff\xff" + b"\x01\x02"
+        text, start = split_telem_log(raw)
+        self.assertEqual(build_telem_config(text).boards[0].name, build_telem_config(cfg).boards[0].name)
+        self.assertEqual(raw[start:], b"\x01\x02")
+
+
+class TestIngest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.decoder = TelemFrameDecoder(build_telem_config(load_config_text()))
+        self.data = random_frames(self.decoder, 300)
+        self.path = os.path.join(self.tmp.name, "log_0.daq")
+        with open(self.path, "wb") as f:
+            f.write(b"NFR25100\n" + load_config_text().encode() + b"\xff\xff\xff\xff" + self.data)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    async def roundtrip(self, protocol):
+        server = TelemIngestServer(self.decoder, batch_frames=32)
+        await server.start(**{f"{protocol}_port": 0})
+        queue = server.subscribe()
+        port = server.udp_port if protocol == "udp" else server.tcp_port
+        sent = await replay(self.path, port, protocol=protocol, speed=0)
+        await asyncio.sleep(0.1)
+        await server.close()
+        batches = []
+        while not queue.empty():
+            batches.append(queue.get_nowait())
+        return sent, server.stats, batches
+
+    def check(self, protocol):
+        sent, stats, batches = asyncio.run(self.roundtrip(protocol))
+        self.assertEqual(sent, 300)
+        self.assertEqual(stats.frames, 300)
+        self.assertEqual(sum(len(b) for b in batches), 300)
+        expected = self.decoder.decode(self.data)
+        for key in ("time.time_since_startup", "BMS.BMS_SOE.Battery_Voltage"):
+            got = np.concatenate([b.columns[key] for b in batches])
+            np.testing.assert_array_equal(got, expected[key])
+        self.assertTrue(np.all(np.isfinite(stats.latency_percentiles())))
+
+    def test_udp(self):
+        self.check("udp")
+
+    def test_tcp(self):
+        self.check("tcp")
+
+    def test_replay_schedule(self):
+        uptime = np.array([1000, 1010, 1030], dtype=np.uint32)
+        np.testing.assert_allclose(replay_schedule(uptime, speed=2), [0, 0.005, 0.015])
+        np.testing.assert_allclose(replay_schedule(uptime, rate_hz=100), [0, 0.01, 0.02])
+        np.testing.assert_allclose(replay_schedule(uptime[::-1]), np.arange(3) / REPLAY_RATE_HZ)  # untrustworthy uptime
+        np.testing.assert_array_equal(replay_schedule(uptime, speed=0), [0, 0, 0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import contextlib
+import io
+import os
+import pstats
+import tempfile
+import unittest
+
+from analysis.common import profiling
+from analysis.common.profiling import Progress, run_profiled, stage
+
+
+def busy(n=20000):
+    return sum(i * i for i in range(n))
+
+
+class TestStages(unittest.TestCase):
+    def setUp(self):
+        profiling.reset()
+
+    def tearDown(self):
+        profiling.reset()
+
+    def test_spans_aggregate_by_name(self):
+        for _ in range(3):
+            with stage("parse", bytes=100) as span:
+                with stage("decode", bytes=100, records=10):
+                    busy()
+                span.records = 10
+        parse, decode = profiling.spans()
+        self.assertEqual((parse.name, parse.calls, parse.bytes, parse.records, parse.depth), ("parse", 3, 300, 30, 0))
+        self.assertEqual((decode.name, decode.calls, decode.records, decode.depth), ("decode", 3, 30, 1))
+        self.assertGreaterEqual(parse.seconds, decode.seconds)
+        self.assertIn("  decode", profiling.summary())
+
+    def test_span_recorded_when_block_raises(self):
+        with self.assertRaises(ValueError), stage("broken"):
+            raise ValueError
+        self.assertEqual(profiling.spans()[0].calls, 1)
+        with stage("after"):
+            pass
+        self.assertEqual(profiling.spans()[1].depth, 0)
+
+
+class TestProgress(unittest.TestCase):
+    def test_rate_limited(self):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            progress = Progress("Parsing", total=1000, interval=3600)
+            reports = 0
+            for i in range(1000):
+                if i >= progress.due:
+                    progress.report(i + 1)
+                    reports += 1
+            progress.finish(1000)
+        self.assertEqual(out.getvalue(), "")  # the interval never passed
+        self.assertLess(reports, 50)  # the stride grows with the loop's rate
+
+        with contextlib.redirect_stdout(out):
+            progress = Progress("Parsing", total=10, interval=0)
+            progress.report(5)
+            progress.finish(10)
+        self.assertIn("Parsing: 5/10", out.getvalue())
+        self.assertIn("Parsing: 10 done", out.getvalue())
+
+
+class TestProfile(unittest.TestCase):
+    def test_pstats_and_collapsed(self):
+        with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+            prof = os.path.join(tmp, "run.prof")
+            run_profiled(busy, prof)
+            names = {func[2] for func in pstats.Stats(prof).stats}
+            self.assertIn("busy", names)
+
+            folded = os.path.join(tmp, "run.folded")
+            run_profiled(busy, folded)
+            with open(folded) as f:
+                lines = f.read().splitlines()
+        self.assertTrue(lines)
+        for line in lines:
+            stack, us = line.rsplit(" ", 1)
+            self.assertGreater(int(us), 0)
+        self.assertTrue(any("busy (test_profiling.py" in line for line in lines))
+
+    def test_saved_when_the_run_exits(self):
+        def exits():
+            busy()
+            raise SystemExit(1)
+
+        with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+            path = os.path.join(tmp, "exit.prof")
+            with self.assertRaises(SystemExit):
+                run_profiled(exits, path)
+            self.assertTrue(os.path.exists(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from analysis.common import pyramid
+from analysis.common.pyramid import ChannelPyramid, pyramid_path, write_pyramid
+from analysis.tests.helpers import make_db
+
+
+def sample(n):
+    rng = np.random.default_rng(0)
+    return make_db(n, {
+        "corners[1].wheel_speed": rng.normal(size=n),
+        "bms.cell_temps[3]": np.arange(n),
+        "ecu.brake_pressed": rng.random(n) > 0.9,
+    })
+
+
+class TestChannelPyramid(unittest.TestCase):
+    CHANNELS = ["corners[1].wheel_speed", "bms.cell_temps[3]", "ecu.brake_pressed"]
+
+    def test_levels_match_brute_force(self):
+        n = 1000
+        db = sample(n)
+        pyr = ChannelPyramid.build(db, self.CHANNELS, min_bucket=8)
+        ws = db.channel("corners[1].wheel_speed")
+        for level, bucket in enumerate(pyr.bucket_sizes):
+            mins, maxs, means = pyr.level("corners[1].wheel_speed", level)
+            for b in (0, (n - 1) // bucket):  # first and (ragged) last bucket
+                chunk = ws[b * bucket : (b + 1) * bucket]
+                self.assertAlmostEqual(mins[b], chunk.min(), places=5)
+                self.assertAlmostEqual(maxs[b], chunk.max(), places=5)
+                self.assertAlmostEqual(means[b], chunk.mean(), places=5)
+        self.assertEqual(pyr.level("bms.cell_temps[3]", -1).shape, (3, 1))
+        self.assertEqual(pyr.level("bms.cell_temps[3]", -1)[1, 0], n - 1)
+
+    def test_row_chunks_match_one_pass(self):
+        db = sample(1000)
+        whole = ChannelPyramid.build(db, self.CHANNELS, min_bucket=8)
+        original = pyramid.ROW_CHUNK
+        pyramid.ROW_CHUNK = 100  # not a multiple of the bucket: rounded down to 96
+        try:
+            chunked = ChannelPyramid.build(db, self.CHANNELS, min_bucket=8)
+        finally:
+            pyramid.ROW_CHUNK = original
+        for c in self.CHANNELS:
+            for level in range(len(whole.bucket_sizes)):
+                np.testing.assert_allclose(chunked.level(c, level), whole.level(c, level))
+
+    def test_query_picks_level_and_range(self):
+        db = sample(4096)
+        pyr = ChannelPyramid.build(db, self.CHANNELS, min_bucket=8)
+        self.assertIsNone(pyr.query("bms.cell_temps[3]", 0, 100, max_points=200))
+        sl = pyr.query("bms.cell_temps[3]", 1000, 3000, max_points=100)
+        self.assertLessEqual(len(sl.mins), 102)
+        self.assertEqual(sl.bucket, 32)
+        self.assertLessEqual(sl.starts[0], 1000)
+        self.assertEqual(sl.mins[0], sl.starts[0])
+
+    def test_save_load_roundtrip(self):
+        db = sample(300)
+        pyr = ChannelPyramid.build(db, min_bucket=16)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = pyramid_path(os.path.join(tmp, "log_1.csv"))
+            self.assertTrue(path.endswith("log_1.pyramid.npz"))
+            pyr.save(path)
+            with ChannelPyramid.load(path) as back:
+                self.assertEqual(back.channels, pyr.channels)
+                self.assertEqual(back.bucket_sizes, pyr.bucket_sizes)
+                np.testing.assert_array_equal(back.level("bms.cell_temps[3]", 2), pyr.level("bms.cell_temps[3]", 2))
+                self.assertEqual(list(back._stats), ["bms.cell_temps[3]"])  # members are read when first queried
+
+            write_pyramid(db, path, min_bucket=16)
+            with ChannelPyramid.load(path) as streamed:
+                self.assertIn("inverter.power_kw", streamed.channels)  # derived channels too
+                np.testing.assert_array_equal(streamed.level("corners[1].wheel_speed", 0), pyr.level("corners[1].wheel_speed", 0))
+
+    def test_index_range_of_a_clock(self):
+        db = sample(4096)
+        db.channel("time.time_since_startup")[:] = np.arange(4096) * 10
+        pyr = ChannelPyramid.build(db, ["time.time_since_startup", "corners[1].wheel_speed"], min_bucket=8)
+        start, stop = pyr.index_range("time.time_since_startup", 10_000, 20_000, max_points=100)
+        self.assertLessEqual(start, 1000)
+        self.assertGreaterEqual(stop, 2001)
+        self.assertLess(stop - start, 1001 + 2 * 64)  # bucket precision at the overview level
+        self.assertIsNone(pyr.index_range("corners[1].wheel_speed", 0, 1, max_points=100))
+        empty = ChannelPyramid.build(sample(0), self.CHANNELS)
+        self.assertIsNone(empty.query("bms.cell_temps[3]"))
+        self.assertEqual(empty.index_range("bms.cell_temps[3]", 0, 1), (0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
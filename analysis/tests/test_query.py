@@ -0,0 +1,108 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from analysis.common.columnar import ColumnStore, save_columns
+from analysis.common.query import Expression, LogSource, mask_segments, search, search_log
+from analysis.common.zone_maps import ZoneMap
+from analysis.tests.helpers import clocked_db
+
+
+def sample(n=3000):
+    db = clocked_db(n)
+    brake = db.channel("ecu.front_brake_pressure")
+    brake[100:150] = 1200.0
+    brake[2500:2510] = 1500.0
+    steer = db.channel("dynamics.steering_angle")
+    steer[120:200] = -25.0
+    steer[2505:2600] = 30.0
+    db.channel("bms.imd_state")[2048:] = 1
+    return db
+
+
+class TestExpression(unittest.TestCase):
+    def test_evaluate(self):
+        db = sample()
+        mask = Expression("ecu.front_brake_pressure > 1000 and abs(dynamics.steering_angle) > 20").evaluate(db)
+        np.testing.assert_array_equal(np.flatnonzero(mask), np.r_[120:150, 2505:2510])
+        self.assertEqual(Expression("20 < -dynamics.steering_angle < 30").evaluate(db).sum(), 80)
+        np.testing.assert_array_equal(np.flatnonzero(Expression("changed(bms.imd_state)").evaluate(db)), [2048])
+        # changed() looks one sample back across a range edge
+        self.assertTrue(Expression("changed(bms.imd_state)").evaluate(db, 2048, 3000)[0])
+
+    def test_rejects_unknown_and_unsafe(self):
+        for text in ["ecu.nope > 1", "__import__('os')", "ecu.front_brake_pressure.real > 1", "x if y else z", "a >"]:
+            with self.assertRaises(ValueError):
+                Expression(text)
+
+    def test_predicate(self):
+        p = Expression("ecu.front_brake_pressure > 1000 and abs(dynamics.steering_angle) > 20").predicate()
+        self.assertEqual(p.channels(), {"ecu.front_brake_pressure", "dynamics.steering_angle"})
+        self.assertEqual(repr(Expression("5 < bms.max_cell_temp").predicate()), "bms.max_cell_temp > 5")
+
+    def test_mask_segments(self):
+        starts, stops = mask_segments(np.array([1, 1, 0, 0, 1, 0, 1], dtype=bool))
+        np.testing.assert_array_equal(starts, [0, 4, 6])
+        np.testing.assert_array_equal(stops, [2, 5, 7])
+
+
+class TestSearch(unittest.TestCase):
+    def test_columnar_and_zone_pruned_search_matches_db(self):
+        db = sample()
+        query = "ecu.front_brake_pressure > 1000 and abs(dynamics.steering_angle) > 20"
+        with tempfile.TemporaryDirectory() as tmp:
+            cols, zones = os.path.join(tmp, "log.columns.npz"), os.path.join(tmp, "log.zones.npz")
+            save_columns(db, cols)
+            ZoneMap.build(db, chunk=512).save(zones)
+            with ColumnStore(cols) as store:
+                self.assertEqual(len(store), len(db))
+                np.testing.assert_array_equal(store.channel("dynamics.steering_angle"), db.channel("dynamics.steering_angle"))
+
+            matches = search_log(LogSource("log", "unused", cols, zones), query)
+            self.assertEqual([(m.start_index, m.stop_index) for m in matches], [(120, 150), (2505, 2510)])
+            self.assertEqual((matches[0].start_ms, matches[0].end_ms, matches[0].duration_ms), (1200, 1490, 290))
+
+            long_only = search(query, [LogSource("log", "unused", cols, zones)] * 2, min_duration_ms=100, workers=2)
+            self.assertEqual([m.start_index for m in long_only], [120, 120])
+
+    def test_a_broken_log_is_skipped(self):
+        db = sample()
+        with tempfile.TemporaryDirectory() as tmp:
+            cols, broken = os.path.join(tmp, "log.columns.npz"), os.path.join(tmp, "broken.bin")
+            save_columns(db, cols)
+            with open(broken, "wb") as f:
+                f.write(b"NFR25\x00\x00\x02garbage")
+            sources = [LogSource("good", "unused", cols), LogSource("broken", broken)]
+            for workers in (1, 2):
+                skipped = []
+                matches = search("ecu.front_brake_pressure > 1000", sources, workers=workers, skipped=skipped)
+                self.assertEqual([m.log for m in matches], ["good", "good"])
+                self.assertEqual([label for label, _ in skipped], ["broken"])
+            with self.assertRaises(ValueError):
+                search("ecu.front_brake_pressure > 1000", sources, workers=1)
+
+    def test_pruning_agrees_with_evaluation_on_nan(self):
+        db = sample(2048)
+        temp = db.channel("bms.max_cell_temp")
+        temp[:] = 30.0
+        temp[100:110] = np.nan  # NaN among a constant: != 30 and changed() both hold there
+        temp[600:700] = np.nan
+        temp[1024:] = np.nan  # two chunks of nothing but NaN: no change inside them
+        with tempfile.TemporaryDirectory() as tmp:
+            cols, zones = os.path.join(tmp, "log.columns.npz"), os.path.join(tmp, "log.zones.npz")
+            save_columns(db, cols)
+            ZoneMap.build(db, chunk=512).save(zones)
+            for query in ["bms.max_cell_temp != 30", "changed(bms.max_cell_temp)", "not bms.max_cell_temp == 30"]:
+                with self.subTest(query=query):
+                    pruned = search_log(LogSource("log", "unused", cols, zones), query)
+                    unpruned = search_log(LogSource("log", "unused", cols), query)
+                    self.assertTrue(unpruned)
+                    self.assertEqual([(m.start_index, m.stop_index) for m in pruned], [(m.start_index, m.stop_index) for m in unpruned])
+        changed = Expression("changed(bms.max_cell_temp)").evaluate(db)
+        np.testing.assert_array_equal(np.flatnonzero(changed), [100, 110, 600, 700, 1024])
+
+
+if __name__ == "__main__":
+    unittest.main()
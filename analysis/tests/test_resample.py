@@ -0,0 +1,66 @@
+import unittest
+
+import numpy as np
+
+from analysis.common.car_db import CarDB
+from analysis.common.resample import Resampler, uniform_grid
+from analysis.tests.helpers import make_db
+
+
+def sample(times):
+    return make_db(len(times), {
+        "time.time_since_startup": times,
+        "ecu.front_brake_pressure": np.asarray(times) / 10.0,  # linear in time
+        "bms.imd_state": np.arange(len(times)) % 3,
+    })
+
+
+def irregular_db(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    return sample(1000 + np.cumsum(rng.integers(5, 40, n)))
+
+
+class TestResample(unittest.TestCase):
+    def test_grid(self):
+        np.testing.assert_array_equal(uniform_grid(1005, 1300, 10), [1100, 1200, 1300])
+
+    def test_hold(self):
+        db = sample([0, 30, 120, 250])
+        out = db.resample(10)  # every 100 ms
+        np.testing.assert_array_equal(out.channel("time.time_since_startup"), [0, 100, 200])
+        np.testing.assert_array_equal(out.channel("bms.imd_state"), [0, 1, 2])
+
+    def test_linear(self):
+        out = sample([0, 30, 120, 250]).resample(10, "linear")
+        np.testing.assert_allclose(out.channel("ecu.front_brake_pressure"), [0, 10, 20])
+        np.testing.assert_array_equal(out.channel("bms.imd_state"), [0, 1, 2])  # ints are held
+
+    def test_mean(self):
+        db = sample([0, 20, 40, 250, 260, 410])
+        out = db.resample(10, "mean")
+        np.testing.assert_allclose(out.channel("ecu.front_brake_pressure"), [2, 4, 25.5, 26, 41])
+        # the 100 and 300 buckets are empty and hold the last sample before them
+        np.testing.assert_array_equal(out.channel("time.time_since_startup"), [0, 100, 200, 300, 400])
+
+    def test_streaming_matches_batch(self):
+        db = irregular_db()
+        for method in ("hold", "linear", "mean"):
+            batch = db.resample(25, method)
+            r = Resampler(25, method)
+            parts = [r.feed(CarDB.from_array(db._db[a : a + 777])) for a in range(0, len(db), 777)]
+            parts.append(r.flush())
+            streamed = np.concatenate([p._db for p in parts])
+            self.assertEqual(len(streamed), len(batch), method)
+            for ch in ("time.time_since_startup", "ecu.front_brake_pressure", "bms.imd_state"):
+                np.testing.assert_allclose(CarDB.from_array(streamed).channel(ch), batch.channel(ch), err_msg=f"{method} {ch}")
+
+    def test_bad_arguments(self):
+        db = sample([0, 100])
+        with self.assertRaises(ValueError):
+            db.resample(10, "cubic")
+        with self.assertRaises(ValueError):
+            db.resample(0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import glob
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from analysis.common.car_db import CarDB
+from analysis.common.columnar import ColumnStore
+from analysis.common.ring import RingCarDB
+
+CLOCK = "time.time_since_startup"
+
+
+def batch(start, n, period_ms=10):
+    db = CarDB(n)
+    db.channel(CLOCK)[:] = (np.arange(start, start + n) * period_ms) % (1 << 32)
+    db.channel("ecu.front_brake_pressure")[:] = np.arange(start, start + n)
+    return db
+
+
+def joined(parts, path="ecu.front_brake_pressure"):
+    return np.concatenate([p.channel(path) for p in parts]).tolist() if parts else []
+
+
+class TestRingCarDB(unittest.TestCase):
+    def test_append_wraps_with_constant_memory(self):
+        ring = RingCarDB(100)
+        buffer = ring._db
+        start = 0
+        for n in (30, 50, 7, 64, 1, 99, 13):
+            ring.append(batch(start, n))
+            start += n
+            self.assertIs(ring._db, buffer)
+            parts = ring.latest()
+            self.assertLessEqual(len(parts), 2)
+            self.assertEqual(joined(parts), list(range(max(start - 100, 0), start)))
+        self.assertEqual(len(ring), 100)
+        self.assertEqual(ring.total, start)
+        self.assertEqual(joined(ring.latest(5)), list(range(start - 5, start)))
+
+    def test_last_seconds(self):
+        ring = RingCarDB(100)
+        ring.append(batch(0, 170))  # 10 ms apart, newest at 1690 ms
+        self.assertEqual(joined(ring.last_seconds(0.25)), list(range(144, 170)))
+        self.assertEqual(joined(ring.last_seconds(60)), list(range(70, 170)))
+        np.testing.assert_array_equal(ring.times(0.25), np.arange(144, 170) * 10)
+        copy = ring.copy(0.25)
+        ring.append(batch(170, 100))
+        self.assertEqual(copy.channel("ecu.front_brake_pressure").tolist(), list(range(144, 170)))
+
+    def test_times_stay_continuous_across_u4_wrap(self):
+        ring = RingCarDB(50)
+        start = (1 << 32) // 10 - 20  # the u4 ms clock wraps 20 snapshots in
+        ring.append(batch(start, 15))
+        ring.append(batch(start + 15, 15))
+        times = ring.times()
+        self.assertTrue(np.all(np.diff(times) == 10))
+        self.assertEqual(len(joined(ring.last_seconds(0.05))), 6)  # 50 ms back from the newest, inclusive
+        np.testing.assert_array_equal(ring.times(0.05), times[-6:])
+
+    def test_spill_keeps_the_whole_session(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            ring = RingCarDB(8, spill_dir=tmp, spill_chunk=4)
+            start = 0
+            for n in (3, 5, 9, 1, 6, 20):
+                ring.append(batch(start, n))
+                start += n
+                self.assertEqual(joined(ring.latest()), list(range(max(start - 8, 0), start)))
+            ring.close()
+
+            values = []
+            for path in sorted(glob.glob(os.path.join(tmp, "chunk_*.columns.npz"))):
+                with ColumnStore(path) as store:
+                    values += store.channel("ecu.front_brake_pressure").tolist()
+            self.assertEqual(values, list(range(start)))
+
+    def test_close_after_wrap_writes_each_snapshot_once(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            ring = RingCarDB(8, spill_dir=tmp, spill_chunk=4)
+            for start in range(10):  # head stops mid-chunk after the first spill
+                ring.append(batch(start, 1))
+            ring.close()
+            values = []
+            for path in sorted(glob.glob(os.path.join(tmp, "chunk_*.columns.npz"))):
+                with ColumnStore(path) as store:
+                    values += store.channel(CLOCK).tolist()
+            self.assertEqual(values, list(range(0, 100, 10)))
+
+    def test_rejects_bad_input(self):
+        with self.assertRaises(ValueError):
+            RingCarDB(10, spill_dir=tempfile.gettempdir(), spill_chunk=4)
+        with self.assertRaises(ValueError):
+            RingCarDB(10).append(np.zeros(3))
+
+
+if __name__ == "__main__":
+    unittest.main()
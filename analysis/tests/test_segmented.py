@@ -0,0 +1,101 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from analysis.common.car_db import CarDB
+from analysis.common.parser_registry import ParserRegistry
+from analysis.common.parsers.telem.telem_base_parser import split_telem_log
+from analysis.common.segmented import SegmentedCarDB
+
+CLOCK = "time.time_since_startup"
+SAMPLE_LOG = "data/front-daq/drake/log_855.bin"
+TELEM_LOG = "data/telem/2025-06-10/log_1.daq"
+
+
+def batch(start, n, period_ms=10):
+    db = CarDB(n)
+    db.channel(CLOCK)[:] = np.arange(start, start + n) * period_ms
+    db.channel("ecu.front_brake_pressure")[:] = np.arange(start, start + n)
+    return db
+
+
+class TestSegmentedCarDB(unittest.TestCase):
+    def test_grows_segment_by_segment(self):
+        db = SegmentedCarDB(segment=100)
+        start = 0
+        for n in (30, 70, 1, 150, 49):
+            db.append(batch(start, n))
+            start += n
+        self.assertEqual(len(db), 300)
+        self.assertEqual([len(s) for s in db.segments()], [100, 100, 100])
+        self.assertEqual(db.channel("ecu.front_brake_pressure").tolist(), list(range(300)))
+        self.assertEqual(db[250]["ecu"]["front_brake_pressure"], 250)
+        self.assertEqual(db[-1]["time"]["time_since_startup"], 2990)
+
+        for view in db.channel_views("ecu.front_brake_pressure"):
+            view += 1  # the views write through
+        self.assertEqual(db.to_car_db().channel("ecu.front_brake_pressure").tolist(), list(range(1, 301)))
+
+    def test_slices_and_time_slices_are_views(self):
+        db = SegmentedCarDB(segment=64)
+        db.append(batch(0, 200))
+        view = db[50:150]
+        self.assertEqual(len(view), 100)
+        self.assertEqual([len(s) for s in view.segments()], [14, 64, 22])
+        view.channel_views("ecu.front_brake_pressure")[1][:] = -1
+        self.assertEqual(db.channel("ecu.front_brake_pressure")[64:128].tolist(), [-1] * 64)
+
+        window = db.time_slice(1000, 1500)
+        self.assertEqual(window.channel(CLOCK).tolist(), list(range(1000, 1500, 10)))
+        with self.assertRaises(IndexError):
+            db.raw_record(200)
+
+
+def short_telem_log(path, frames=80):
+    """The sample telem log cut to its first frames (the per-record parse is slow)."""
+    with open(TELEM_LOG, "rb") as f:
+        raw = f.read()
+    _, start = split_telem_log(raw)
+    with open(path, "wb") as f:
+        f.write(raw[: start + frames * 904])  # 904-byte frames in this schema
+
+
+class TestSegmentedParse(unittest.TestCase):
+    def test_same_log_as_contiguous_parse(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        telem = os.path.join(tmp.name, "log_1.daq")
+        short_telem_log(telem)
+        for path in (SAMPLE_LOG, telem):
+            whole = ParserRegistry.parse(path)
+            segmented = ParserRegistry.parse(path, segment=32)
+            self.assertIsInstance(segmented, SegmentedCarDB)
+            self.assertGreater(len(segmented.segments()), 1)
+            self.assertEqual(segmented.to_car_db()._db.tobytes(), whole._db.tobytes(), path)
+
+    def test_telem_partial_last_frame_is_ignored(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            whole, cut = os.path.join(tmp, "whole.daq"), os.path.join(tmp, "cut.daq")
+            short_telem_log(whole, frames=64)
+            short_telem_log(cut, frames=65)
+            with open(cut, "r+b") as f:
+                f.truncate(os.path.getsize(cut) - 300)  # the writer stopped mid-frame
+            segmented = ParserRegistry.parse(cut, segment=32)
+            self.assertEqual(len(segmented), 64)
+            self.assertEqual(segmented.to_car_db()._db.tobytes(), ParserRegistry.parse(whole, segment=32).to_car_db()._db.tobytes())
+
+    def test_to_csv_matches_car_db(self):
+        whole = ParserRegistry.parse(SAMPLE_LOG)
+        segmented = ParserRegistry.parse(SAMPLE_LOG, segment=400)
+        with tempfile.TemporaryDirectory() as tmp:
+            a, b = os.path.join(tmp, "a.csv"), os.path.join(tmp, "b.csv")
+            whole.to_csv(a)
+            segmented.to_csv(b)
+            with open(a) as fa, open(b) as fb:
+                self.assertEqual(fa.read(), fb.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
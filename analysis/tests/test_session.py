@@ -0,0 +1,106 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from analysis.common.car_db import CarDB
+from analysis.common.catalog import LogCatalog
+from analysis.common.columnar import ColumnStore, columns_path, save_columns
+from analysis.common.session import SessionDB
+from analysis.tests.helpers import CLOCK, UNIX, clocked_db
+
+VALUE = "ecu.front_brake_pressure"
+TIMING = dict(start_ms=5000, period_ms=100)  # 100 ms apart from 5 s after startup
+
+
+class CountingLog:
+    """Any channel()/len() source; records which channels were read."""
+
+    def __init__(self, db):
+        self.db = db
+        self.reads = []
+
+    def __len__(self):
+        return len(self.db)
+
+    def channel(self, path):
+        self.reads.append(path)
+        return self.db.channel(path)
+
+
+class TestSessionDB(unittest.TestCase):
+    def test_back_to_back_without_unix_time(self):
+        logs = [clocked_db(n, {VALUE: first + np.arange(n)}, **TIMING) for n, first in [(10, 0), (5, 10), (20, 15)]]
+        session = CarDB.concat(logs, ["log_1", "log_2", "log_3"])
+        self.assertFalse(session.by_unix)
+        self.assertEqual(len(session), 35)
+        self.assertEqual(session.channel(VALUE).tolist(), list(range(35)))
+        self.assertEqual(session.times().tolist(), list(range(0, 3500, 100)))
+        self.assertEqual(session.log_bounds_ms(), [("log_1", 0, 900), ("log_2", 1000, 1400), ("log_3", 1500, 3400)])
+
+        self.assertEqual(session.locate(12), (1, 2))
+        logs, local = session.locate(np.array([0, 9, 10, 15]))
+        self.assertEqual(logs.tolist(), [0, 0, 1, 2])
+        self.assertEqual(local.tolist(), [0, 9, 0, 0])
+        with self.assertRaises(IndexError):
+            session.locate(35)
+
+    def test_ordered_and_placed_by_unix_time(self):
+        early = clocked_db(10, {VALUE: np.arange(10)}, unix_s=1_700_000_000, **TIMING)
+        late = clocked_db(10, {VALUE: 100 + np.arange(10)}, unix_s=1_700_000_060, **TIMING)
+        session = SessionDB([late, early], ["late", "early"])
+        self.assertTrue(session.by_unix)
+        self.assertEqual(session.names, ["early", "late"])
+        bounds = session.log_bounds_ms()
+        self.assertEqual(bounds[0][1], 0)
+        self.assertAlmostEqual(bounds[1][1] - bounds[0][1], 60_000, delta=1000)  # the real gap is kept
+        self.assertEqual(session.channel(VALUE, 8, 12).tolist(), [8, 9, 100, 101])
+
+    def test_ranges_touch_only_their_logs(self):
+        logs = [CountingLog(clocked_db(100, {VALUE: 100 * i + np.arange(100)}, **TIMING)) for i in range(4)]
+        session = SessionDB(logs)
+        for l in logs:
+            l.reads.clear()
+
+        s = session.slice_ms(12_000, 14_000)  # inside the second log (10_000 ms to 19_900 ms)
+        window = session.window([VALUE], 12_000, 14_000)
+        self.assertEqual((s.start, s.stop), (120, 140))
+        self.assertEqual(window["session_ms"].tolist(), list(range(12_000, 14_000, 100)))
+        self.assertEqual(window[VALUE].tolist(), list(range(120, 140)))
+        self.assertEqual([l.reads for l in logs], [[], [VALUE], [], []])
+
+        self.assertEqual(session.slice_ms(None, 0), slice(0, 0))
+        self.assertEqual(session.slice_ms(9_950, 10_050), slice(100, 101))  # between logs: the next one
+        self.assertEqual(session.slice_ms(1e9), slice(400, 400))
+
+    def test_column_stores(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            stores = []
+            for i in range(3):
+                path = os.path.join(tmp, f"log_{i}.columns.npz")
+                save_columns(clocked_db(50, {VALUE: 50 * i + np.arange(50)}, **TIMING), path, [CLOCK, UNIX, VALUE])
+                stores.append(ColumnStore(path))
+            session = SessionDB(stores)
+            self.assertEqual(session.channel(VALUE, 40, 110).tolist(), list(range(40, 110)))
+            for store in stores:
+                store.close()
+
+    def test_from_catalog_closes_its_stores(self):
+        with tempfile.TemporaryDirectory() as tmp, LogCatalog(tmp) as cat:
+            for i in range(2):
+                src, out = os.path.join(tmp, f"log_{i}.bin"), os.path.join(tmp, "front-daq", "day", f"log_{i}.csv")
+                open(src, "wb").close()
+                os.makedirs(os.path.dirname(out), exist_ok=True)
+                db = clocked_db(50, {VALUE: 50 * i + np.arange(50)}, **TIMING)
+                save_columns(db, columns_path(out), [CLOCK, UNIX, VALUE])
+                cat.add(src, out, db)
+            with SessionDB.from_catalog(cat, "front-daq", "day") as session:
+                self.assertEqual(session.names, ["log_0", "log_1"])
+                self.assertEqual(session.channel(VALUE, 45, 55).tolist(), list(range(45, 55)))
+                npzs = [log._npz for log in session.logs]
+            self.assertTrue(all(npz.zip is None for npz in npzs))  # NpzFile.close() drops its zip
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import sys
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from unittest import mock
+
+import numpy as np
+
+from analysis.common import shared
+from analysis.common.car_db import CarDB
+from analysis.common.segmented import SegmentedCarDB
+from analysis.tests.helpers import CLOCK, sample_db
+
+
+def soc_sum(name):
+    with CarDB.attach(name) as attached:
+        return float(attached.db.channel("bms.soc").sum())
+
+
+class TestSharedCarDB(unittest.TestCase):
+    def test_attach_sees_the_same_records(self):
+        db = sample_db(300)
+        with db.to_shared() as owner:
+            attached = CarDB.attach(owner.name)
+            self.assertEqual(len(attached), len(db))
+            self.assertEqual(attached.db._db.tobytes(), db._db.tobytes())
+            with self.assertRaises(ValueError):
+                attached.db.channel("bms.soc")[0] = 1  # read-only by default
+            owner.db.channel("bms.soc")[0] = 1  # the owner's writes show up in every mapping
+            self.assertEqual(attached.db.channel("bms.soc")[0], 1)
+            with self.assertRaises(ValueError):
+                attached.unlink()
+            attached.close()
+        with self.assertRaises(FileNotFoundError):
+            CarDB.attach(owner.name)
+
+    def test_close_needs_views_gone(self):
+        owner = sample_db(300).to_shared()
+        soc = owner.db.channel("bms.soc")
+        with self.assertRaises(ValueError):
+            owner.close()
+        self.assertFalse(owner.closed)  # a refused close leaves the handle usable
+        self.assertEqual(owner.db.channel("bms.soc").tolist(), soc.tolist())
+        del soc
+        owner.close()
+        owner.unlink()
+        self.assertTrue(owner.closed)
+
+    @unittest.skipIf(sys.version_info >= (3, 13), "attaching is untracked without swapping register")
+    def test_attach_swaps_register_under_the_lock(self):
+        real = shared_memory.SharedMemory
+
+        def opened(*args, **kwargs):
+            self.assertTrue(shared._TRACKER_LOCK.locked())  # a create on another thread waits
+            return real(*args, **kwargs)
+
+        with sample_db(10).to_shared() as owner, mock.patch.object(shared_memory, "SharedMemory", opened):
+            CarDB.attach(owner.name).close()
+
+    def test_attach_from_worker_processes(self):
+        db = sample_db(300)
+        with db.to_shared() as owner, ProcessPoolExecutor(max_workers=2) as pool:
+            sums = list(pool.map(soc_sum, [owner.name] * 3))
+            self.assertTrue(np.allclose(sums, float(db.channel("bms.soc").sum())))
+            self.assertEqual(len(owner), len(db))  # workers closing their mappings leave the block alone
+
+    def test_segments_and_foreign_blocks(self):
+        seg = SegmentedCarDB(segment=64)
+        seg.append(sample_db(300))
+        with seg.to_shared() as owner:
+            self.assertEqual(owner.db.channel(CLOCK).tolist(), seg.channel(CLOCK).tolist())
+
+        block = shared_memory.SharedMemory(create=True, size=128)
+        try:
+            with self.assertRaises(ValueError):
+                CarDB.attach(block.name)
+        finally:
+            block.close()
+            block.unlink()
+
+    def test_parallel_csv_matches(self):
+        db = sample_db(500)
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.object(shared, "MIN_CSV_RANGE", 100):
+            serial, parallel = os.path.join(tmp, "serial.csv"), os.path.join(tmp, "parallel.csv")
+            db.to_csv(serial)
+            shared.to_csv(db, parallel, workers=3)
+            with open(serial, "rb") as a, open(parallel, "rb") as b:
+                self.assertEqual(a.read(), b.read())
+            self.assertEqual(sorted(os.listdir(tmp)), ["parallel.csv", "serial.csv"])  # the parts are cleaned up
+
+
+if __name__ == "__main__":
+    unittest.main()
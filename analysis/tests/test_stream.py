@@ -0,0 +1,133 @@
+import os
+import struct
+import tempfile
+import threading
+import time
+import unittest
+
+import numpy as np
+
+from analysis.common import synth
+from analysis.common.parser_registry import ParserRegistry
+from analysis.common.parsers import front_daq_002
+from analysis.common.parsers.front_daq_002 import LINE_FMT, LINE_SIZE
+
+HEADER = b"NFR25" + bytes([0, 0, 2]) + bytes([LINE_SIZE % 256])
+N_VALUES = len(struct.unpack(LINE_FMT, bytes(LINE_SIZE)))
+
+
+def record(t_ms):
+    """A 0.0.2 record that is all zeros apart from its timestamp."""
+    return struct.pack(LINE_FMT, t_ms, *([0] * (N_VALUES - 1)))
+
+
+class TestLogStream(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "log_1.bin")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def append(self, data):
+        with open(self.path, "ab") as f:
+            f.write(data)
+
+    def test_partial_records_wait(self):
+        with ParserRegistry.open_stream(self.path) as stream:
+            self.assertEqual(len(stream.poll()), 0)  # not created yet
+            self.append(HEADER[:4])
+            self.assertEqual(len(stream.poll()), 0)  # header still incomplete
+            self.append(HEADER[4:])
+            self.assertEqual(len(stream.poll()), 0)
+            self.assertEqual(stream.version.patch, 2)
+
+            data = b"".join(record(t) for t in range(0, 50, 10))
+            self.append(data[: LINE_SIZE + 100])
+            chunk = stream.poll()
+            self.assertEqual(chunk.channel("time.time_since_startup").tolist(), [0])
+            self.assertEqual(stream.pending_bytes, 100)
+
+            self.append(data[LINE_SIZE + 100 :])
+            chunk = stream.poll()
+            self.assertEqual(chunk.channel("time.time_since_startup").tolist(), [10, 20, 30, 40])
+            self.assertEqual(stream.pending_bytes, 0)
+            self.assertEqual(len(stream.poll()), 0)
+
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), HEADER + data)
+        full = ParserRegistry.parse(self.path)
+        np.testing.assert_array_equal(stream.db._db, full._db)
+
+    def test_grows_past_capacity(self):
+        self.append(HEADER)
+        stream = ParserRegistry.open_stream(self.path)
+        stream._records = stream._records[:2]  # start tiny so every poll has to grow the buffer
+        total = []
+        for batch in range(5):
+            self.append(b"".join(record(100 * batch + t) for t in range(3)))
+            total += stream.poll().channel("time.time_since_startup").tolist()
+        stream.close()
+        self.assertEqual(total, [100 * b + t for b in range(5) for t in range(3)])
+        self.assertEqual(stream.db.channel("time.time_since_startup").tolist(), total)
+
+    def test_follow_picks_up_appends(self):
+        self.append(HEADER)
+
+        def writer():
+            for t in range(10):
+                self.append(record(t))
+                time.sleep(0.01)
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        seen = []
+        with ParserRegistry.open_stream(self.path) as stream:
+            for chunk in stream.follow(interval=0.01, idle_timeout=0.5):
+                seen += chunk.channel("time.time_since_startup").tolist()
+        thread.join()
+        self.assertEqual(seen, list(range(10)))
+
+    def test_follow_a_growing_telem_log(self):
+        fmt = synth.get_format("telem")
+        full = os.path.join(self.tmp.name, "full.daq")
+        synth.write_log(full, fmt, 40)
+        with open(full, "rb") as f:
+            data = f.read()
+        header, frames = data[: len(fmt.header)], data[len(fmt.header) :]
+        self.path = os.path.join(self.tmp.name, "log_1.daq")
+
+        def writer():
+            self.append(header[:200])  # the config arrives in pieces
+            time.sleep(0.02)
+            self.append(header[200:])
+            for a in range(0, len(frames), 1000):  # not frame-aligned
+                time.sleep(0.005)
+                self.append(frames[a : a + 1000])
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        seen = []
+        with ParserRegistry.open_stream(self.path) as stream:
+            for chunk in stream.follow(interval=0.01, idle_timeout=0.5):
+                seen += chunk.channel("time.time_since_startup").tolist()
+        thread.join()
+        self.assertEqual(stream.offset, len(data))
+        whole = ParserRegistry.parse(full, segment=16).to_car_db()
+        self.assertEqual(seen, whole.channel("time.time_since_startup").tolist())
+        self.assertEqual(stream.db._db.tobytes(), whole._db.tobytes())
+
+    def test_parser_without_fixed_layout(self):
+        self.append(HEADER)
+        stream = ParserRegistry.open_stream(self.path)
+        original = front_daq_002.FullDAQParser.RECORD_SIZE
+        front_daq_002.FullDAQParser.RECORD_SIZE = None
+        try:
+            with self.assertRaises(ValueError):
+                stream.poll()
+        finally:
+            front_daq_002.FullDAQParser.RECORD_SIZE = original
+
+
+if __name__ == "__main__":
+    unittest.main()
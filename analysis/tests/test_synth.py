@@ -0,0 +1,92 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from analysis.common import synth
+from analysis.common.car_db import CarDB
+from analysis.common.parser_registry import ParserRegistry, ParserVersion
+
+CLOCK = "time.time_since_startup"
+SMOOTH = [CLOCK, "time.unix_time", "bms.soc", "inverter.rpm", "ecu.set_current", "ecu.set_current_brake"]  # no noise
+
+
+def write_and_parse(fmt, n, segment=None):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "log" + fmt.suffix)
+        size = synth.write_log(path, fmt, n, chunk=n)
+        assert size == os.path.getsize(path)
+        return ParserRegistry.parse(path, segment)
+
+
+class TestSimulate(unittest.TestCase):
+    def test_chunks_join_up(self):
+        whole = synth.simulate(0, 600)
+        parts = CarDB.concat([synth.simulate(0, 250), synth.simulate(250, 350)])
+        for path in SMOOTH:
+            self.assertTrue(np.allclose(parts.channel(path), whole.channel(path)), path)
+        noisy = "corners[0].wheel_speed"
+        self.assertEqual(synth.simulate(250, 350).channel(noisy).tolist(), parts.channel(noisy)[250:].tolist())  # same seed, same chunk
+        self.assertEqual(np.diff(whole.channel(CLOCK)).tolist(), [synth.PERIOD_MS] * 599)
+
+    def test_channels_are_plausible(self):
+        db = synth.simulate(0, 15_000)  # 25 minutes, inside the first stint
+        throttle, brake = db.channel("ecu.apps1_throttle"), db.channel("ecu.front_brake_pressure")
+        self.assertFalse(np.any((throttle > 20) & (brake > 200)))  # never on both pedals
+        self.assertTrue(np.any(throttle > 80) and np.any(brake > 500))
+        self.assertEqual(db.channel("ecu.brake_pressed").tolist(), (brake > 50).tolist())
+        speed = db.channel("corners[0].wheel_speed")
+        self.assertGreater(np.corrcoef(speed, db.channel("inverter.rpm"))[0, 1], 0.99)
+        self.assertTrue(np.allclose(db.channel("bms.battery_voltage"), db.channel("bms.cell_voltages").sum(axis=1), rtol=1e-5))
+        self.assertTrue(np.all(np.diff(db.channel("bms.soc")) <= 0))
+        self.assertTrue(0.3 < db.channel("bms.soc").min() < db.channel("bms.soc").max() < 1)
+
+
+class TestFormats(unittest.TestCase):
+    def assert_round_trip(self, db, ref, paths):
+        self.assertEqual(len(db), len(ref))
+        for path in paths:
+            parsed, sent = db.channel(path).astype(float), ref.channel(path).astype(float)
+            # a float channel can be stored as an integer field, which truncates it
+            self.assertTrue(np.all(np.abs(parsed - sent) <= np.maximum(1, np.abs(sent) * 1e-6)), path)
+
+    def test_front_daq_round_trip(self):
+        for version in ("0.0.1", "0.0.2"):
+            with self.subTest(version=version):
+                fmt = synth.get_format(version)
+                db = write_and_parse(fmt, 300)
+                paths = [dest for dest, _, _ in fmt.parser.BULK_LAYOUT.targets]
+                self.assert_round_trip(db, synth.simulate(0, 300), paths)
+
+    def test_telem_round_trip(self):
+        fmt = synth.get_format("telem")
+        db = write_and_parse(fmt, 300, segment=128)
+        ref = synth.simulate(0, 300)
+        self.assertEqual(db.channel(CLOCK).tolist(), ref.channel(CLOCK).tolist())
+        signals = {c.key: c.signal for c in fmt.encoder.signals}
+        for key, path in fmt.targets.items():
+            s = signals[key]
+            if s.factor == 0.0:
+                continue  # decodes to its offset whatever is sent
+            sent, parsed = ref.channel(path).astype(float), db.channel(path).astype(float)
+            keep = sent >= 0  # the decoder doesn't sign-extend negative values
+            tol = abs(s.factor) / 2 + 1e-3 + ("int" in s.data_type)
+            self.assertTrue(np.all(np.abs(parsed - sent)[keep] <= tol), key)
+
+    def test_headers_and_sizes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, version in [("0.0.1", (0, 0, 1)), ("0.0.2", (0, 0, 2)), ("telem", (49, 48, 48))]:
+                fmt = synth.get_format(name)
+                path = os.path.join(tmp, name + fmt.suffix)
+                n = synth.snapshots_for_size(fmt, 200_000)
+                synth.write_log(path, fmt, n, chunk=64)
+                self.assertLessEqual(200_000 - fmt.record_size, os.path.getsize(path))
+                self.assertLessEqual(os.path.getsize(path), 200_000)
+                self.assertEqual(ParserRegistry.detect_version(path), ParserVersion("NFR25", *version))
+        with self.assertRaises(ValueError):
+            synth.get_format("0.0.0")
+
+
+if __name__ == "__main__":
+    unittest.main()
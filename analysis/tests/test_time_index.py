@@ -0,0 +1,74 @@
+import unittest
+
+import numpy as np
+
+from analysis.common.time_index import U4_RANGE, TimeIndex
+from analysis.tests.helpers import make_db
+
+
+def sample(times, unix=None):
+    db = make_db(len(times), {"time.time_since_startup": times, "ecu.front_brake_pressure": np.arange(len(times))})
+    if unix is not None:
+        db.channel("time.unix_time")[:] = unix
+    return db
+
+
+class TestTimeIndex(unittest.TestCase):
+    def test_wraparound_is_unwrapped(self):
+        raw = np.array([U4_RANGE - 200, U4_RANGE - 100, 0, 100], dtype=np.uint32)
+        index = TimeIndex.from_startup(raw)
+        np.testing.assert_array_equal(index.times - index.times[0], [0, 100, 200, 300])
+        np.testing.assert_array_equal(index.wraps, [2])
+        self.assertEqual(len(index.resets), 0)
+
+    def test_reset_continues_after_previous_run(self):
+        index = TimeIndex.from_startup(np.array([1000, 1100, 1200, 50, 150]))
+        np.testing.assert_array_equal(index.times, [1000, 1100, 1200, 1300, 1400])
+        np.testing.assert_array_equal(index.resets, [3])
+
+    def test_unix_clock_fills_samples_before_fix(self):
+        startup = TimeIndex.from_startup(np.arange(0, 5000, 500))
+        unix = np.array([0, 0, 1_700_000_001, 1_700_000_001, 1_700_000_002, 1_700_000_002, 1_700_000_003, 1_700_000_003, 1_700_000_004, 1_700_000_004])
+        index = TimeIndex.from_unix(unix, startup)
+        np.testing.assert_array_equal(np.diff(index.times), 500)
+        self.assertEqual(index.times[2] // 1000, 1_700_000_001)
+        with self.assertRaises(ValueError):
+            TimeIndex.from_unix(np.zeros(10), startup)
+
+    def test_unix_clock_per_run(self):
+        # the logger restarts at snapshot 4; each run gets its own clock offset
+        startup = TimeIndex.from_startup(np.array([0, 500, 1000, 1500, 0, 500, 1000, 1500]))
+        unix = np.array([10, 10, 11, 11, 20, 20, 21, 21])
+        index = TimeIndex.from_unix(unix, startup)
+        np.testing.assert_array_equal(index.times, [10000, 10500, 11000, 11500, 20000, 20500, 21000, 21500])
+
+
+class TestCarDBTime(unittest.TestCase):
+    def test_time_slice_is_a_view(self):
+        db = sample(np.arange(100) * 10)
+        part = db.time_slice(200, 300)
+        self.assertEqual(len(part), 10)
+        np.testing.assert_array_equal(part.channel("ecu.front_brake_pressure"), np.arange(20, 30))
+        part.channel("ecu.front_brake_pressure")[0] = -1
+        self.assertEqual(db.channel("ecu.front_brake_pressure")[20], -1)
+        self.assertEqual(part.time_index().start_ms, 200)
+        self.assertEqual(len(db.time_slice(5000, 6000)), 0)
+
+    def test_at_holds_last_sample(self):
+        db = sample(np.arange(100) * 10)
+        self.assertEqual(db.at(255)["ecu"]["front_brake_pressure"], 25)
+        np.testing.assert_array_equal(db.at(np.array([0, 999]))["ecu"]["front_brake_pressure"], [0, 99])
+        with self.assertRaises(ValueError):
+            db.at(-1)
+
+    def test_unix_clock_slice(self):
+        db = sample(np.arange(0, 10_000, 100), unix=1_700_000_000 + np.arange(0, 10_000, 100) // 1000)
+        part = db.time_slice(1_700_000_002_000, 1_700_000_003_000, clock="unix")
+        self.assertEqual(len(part), 10)
+        self.assertEqual(part.channel("time.time_since_startup")[0], 2000)
+        with self.assertRaises(ValueError):
+            db.time_index("gps")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from analysis.common import zone_maps
+from analysis.common.catalog import LogCatalog
+from analysis.common.zone_maps import And, Changed, Compare, Or, ZoneMap, candidate_chunks, candidate_logs
+from analysis.tests.helpers import make_db
+
+CHANNELS = ["bms.max_cell_temp", "bms.imd_state", "ecu.front_brake_pressure"]
+
+
+def sample(n=5000, hot_at=None, imd_flip_at=None):
+    db = make_db(n, {"bms.max_cell_temp": 30.0})
+    if hot_at is not None:
+        db.channel("bms.max_cell_temp")[hot_at] = 60.0
+    if imd_flip_at is not None:
+        db.channel("bms.imd_state")[imd_flip_at:] = 1
+    return db
+
+
+class TestZoneMap(unittest.TestCase):
+    def test_chunk_stats(self):
+        db = sample(hot_at=2500, imd_flip_at=1024)
+        db.channel("ecu.front_brake_pressure")[10] = np.nan
+        zm = ZoneMap.build(db, CHANNELS, chunk=1024)
+        self.assertEqual(len(zm), 5)
+        np.testing.assert_array_equal(zm.column("maxs", "bms.max_cell_temp"), [30, 30, 60, 30, 30])
+        # the flip at exactly a chunk boundary belongs to the chunk holding the new value
+        np.testing.assert_array_equal(zm.column("changes", "bms.imd_state"), [0, 1, 0, 0, 0])
+        np.testing.assert_array_equal(zm.column("nulls", "ecu.front_brake_pressure"), [1, 0, 0, 0, 0])
+        # NaN -> value counts as a change, but not NaN -> NaN
+        self.assertEqual(zm.column("changes", "ecu.front_brake_pressure")[0], 2)
+
+    def test_row_chunks_match_one_pass(self):
+        db = sample(hot_at=2500, imd_flip_at=1536)  # the flip lands on a row-range boundary
+        db.channel("ecu.front_brake_pressure")[1530:1540] = np.nan
+        whole = ZoneMap.build(db, CHANNELS, chunk=256)
+        original = zone_maps.ROW_CHUNK
+        zone_maps.ROW_CHUNK = 600  # not a multiple of the chunk: rounded down to 512
+        try:
+            chunked = ZoneMap.build(db, CHANNELS, chunk=256, block=2)
+        finally:
+            zone_maps.ROW_CHUNK = original
+        for stat in ("mins", "maxs", "nulls", "changes"):
+            np.testing.assert_array_equal(getattr(chunked, stat), getattr(whole, stat))
+        self.assertEqual(chunked.column("changes", "bms.imd_state").sum(), 1)
+
+    def test_predicates_prune_chunks(self):
+        zm = ZoneMap.build(sample(hot_at=2500, imd_flip_at=4500), CHANNELS, chunk=1024)
+        self.assertEqual(candidate_chunks(zm, Compare("bms.max_cell_temp", ">", 55)), [(2048, 3072)])
+        self.assertEqual(candidate_chunks(zm, Changed("bms.imd_state")), [(4096, 5000)])
+        self.assertEqual(
+            candidate_chunks(zm, Or(Compare("bms.max_cell_temp", ">", 55), Changed("bms.imd_state"))),
+            [(2048, 3072), (4096, 5000)],
+        )
+        self.assertEqual(candidate_chunks(zm, And(Compare("bms.max_cell_temp", ">", 55), Changed("bms.imd_state"))), [])
+        self.assertEqual(candidate_chunks(zm, Compare("bms.max_cell_temp", "==", 30)), [(0, 5000)])
+
+    def test_save_load(self):
+        zm = ZoneMap.build(sample(hot_at=3), CHANNELS, chunk=256)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "log.zones.npz")
+            zm.save(path)
+            back = ZoneMap.load(path)
+        self.assertEqual((back.channels, back.chunk, back.n_snapshots), (zm.channels, 256, 5000))
+        np.testing.assert_array_equal(back.maxs, zm.maxs)
+
+    def test_empty_log(self):
+        zm = ZoneMap.build(sample(n=0), CHANNELS)
+        self.assertEqual(len(zm), 0)
+        summary = zm.summary()
+        self.assertTrue(np.isnan(summary.mins).all() and np.isnan(summary.maxs).all())
+        self.assertEqual(summary.changes.tolist(), [[0, 0, 0]])
+        with tempfile.TemporaryDirectory() as tmp:
+            with LogCatalog(tmp) as cat:
+                src = os.path.join(tmp, "empty.bin")
+                open(src, "wb").close()
+                cat.add(src, os.path.join(tmp, "day", "empty.csv"), sample(n=0), zones=zm)
+                self.assertEqual(candidate_logs(cat, Compare("bms.max_cell_temp", ">", 55)), [])
+
+    def test_candidate_logs_from_catalog(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with LogCatalog(tmp) as cat:
+                for name, db in [("hot", sample(hot_at=7)), ("cool", sample()), ("nostats", None)]:
+                    src = os.path.join(tmp, f"{name}.bin")
+                    open(src, "wb").close()
+                    zones = None if db is None else ZoneMap.build(db, CHANNELS)
+                    cat.add(src, os.path.join(tmp, "day", f"{name}.csv"), db or sample(), zones=zones)
+                hits = candidate_logs(cat, Compare("bms.max_cell_temp", ">", 55))
+        # logs without stats can't be ruled out
+        self.assertEqual(sorted(e.name for e in hits), ["hot", "nostats"])
+
+
+if __name__ == "__main__":
+    unittest.main()
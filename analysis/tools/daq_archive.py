@@ -0,0 +1,111 @@
+from analysis.common.archive import CHUNK_SNAPSHOTS, ZLIB_LEVEL, ArchiveReader, archive_path, save_archive
+from analysis.common.car_db import channel_paths
+from analysis.common.parser_registry import ParserRegistry
+
+import os
+import sys
+import tempfile
+import time
+
+PARQUET_CODECS = ("snappy", "zstd")
+
+
+def register_subparser(subparser):
+    subparser.add_argument("input", type=str, help="A raw log or a directory of raw logs")
+    subparser.add_argument("out", type=str, help="The directory to store the archives (<log>.nfra)")
+    subparser.add_argument("--chunk", type=int, default=CHUNK_SNAPSHOTS, help=f"Snapshots per chunk (default: {CHUNK_SNAPSHOTS})")
+    subparser.add_argument("--level", type=int, default=ZLIB_LEVEL, help=f"zlib level, 1-9 (default: {ZLIB_LEVEL})")
+    subparser.add_argument("--no-parquet", action="store_true", help="Don't compare against Parquet")
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def parquet_report(db, tmp):
+    """{codec: (bytes, decode seconds)} of db's channels as a Parquet file, or {} without pyarrow."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        return {}
+    table = pa.table({p: db.channel(p) for p in channel_paths()})
+    report = {}
+    for codec in PARQUET_CODECS:
+        path = os.path.join(tmp, f"log.{codec}.parquet")
+        pq.write_table(table, path, compression=codec)
+        seconds = _timed(lambda: [c.to_numpy() for c in pq.read_table(path).columns])
+        report[codec] = (os.path.getsize(path), seconds)
+    return report
+
+
+def archive_file(input_path, output_path, args, totals):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = ParserRegistry.parse(input_path)
+        if db is None or not len(db):
+            print(f"Nothing to archive in {input_path!r}")
+            return
+        save_archive(db, output_path, chunk=args.chunk, level=args.level)
+
+        def decode():
+            with ArchiveReader(output_path) as reader:
+                for p in reader.channels():
+                    reader.channel(p)
+
+        row = {
+            "raw": os.path.getsize(input_path),
+            "columns": sum(db.channel(p).nbytes for p in channel_paths()),
+            "archive": (os.path.getsize(output_path), _timed(decode)),
+        }
+        if not args.no_parquet:
+            row.update({f"parquet {c}": r for c, r in parquet_report(db, tmp).items()})
+
+    print(f"{os.path.basename(input_path)}: {len(db)} snapshots, {row['raw'] / 1e6:.2f} MB raw, {row['columns'] / 1e6:.2f} MB of columns")
+    for name in [k for k in row if k not in ("raw", "columns")]:
+        size, seconds = row[name]
+        print(
+            f"  {name:<16} {size / 1e3:>10.1f} kB  {row['columns'] / size:>7.1f}x  "
+            f"decode {row['columns'] / 1e6 / seconds:>8.1f} MB/s"
+        )
+        total = totals.setdefault(name, [0, 0.0])
+        total[0] += size
+        total[1] += seconds
+    totals.setdefault("columns", [0, 0.0])[0] += row["columns"]
+    totals.setdefault("raw", [0, 0.0])[0] += row["raw"]
+
+
+def main(args):
+    if not os.path.exists(args.input):
+        print(f"Input path {args.input!r} does not exist!", file=sys.stderr)
+        sys.exit(1)
+    if args.chunk <= 0 or not 1 <= args.level <= 9:
+        print("--chunk must be positive and --level between 1 and 9", file=sys.stderr)
+        sys.exit(1)
+
+    if os.path.isdir(args.input):
+        jobs = [
+            (os.path.join(root, name), os.path.join(args.out, os.path.relpath(os.path.join(root, name), args.input)))
+            for root, _, files in sorted(os.walk(args.input))
+            for name in sorted(files)
+        ]
+    else:
+        jobs = [(args.input, os.path.join(args.out, os.path.basename(args.input)))]
+
+    totals = {}
+    for src, dst in jobs:
+        dst = archive_path(dst)
+        os.makedirs(os.path.dirname(dst) or ".", exist_ok=True)
+        try:
+            archive_file(src, dst, args, totals)
+        except ValueError as e:
+            print(f"Skipping {src!r}: {e}", file=sys.stderr)
+
+    if "archive" not in totals:
+        return
+    columns = totals["columns"][0]
+    print(f"\nTotal: {totals['raw'][0] / 1e6:.2f} MB raw, {columns / 1e6:.2f} MB of columns")
+    for name, (size, seconds) in totals.items():
+        if name not in ("raw", "columns"):
+            print(f"  {name:<16} {size / 1e6:>8.2f} MB  {columns / size:>7.1f}x  decode {columns / 1e6 / seconds:>8.1f} MB/s")
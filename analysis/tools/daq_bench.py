@@ -0,0 +1,211 @@
+from analysis.common.bench import THRESHOLD, compare, format_table, load_results, measure, save_results
+from analysis.common.car_db import CarDB
+from analysis.common.car_db_utils import csv_to_db
+from analysis.common.parser_registry import ParserRegistry
+from analysis.common.parsers.front_daq_002 import LINE_SIZE
+from analysis.common.parsers.telem.frame_decoder import TelemFrameDecoder
+from analysis.common.parsers.telem.telem_base_parser import YamlDataMapper, build_telem_config, split_telem_log
+
+import contextlib
+import glob
+import importlib.util
+import io
+import logging
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+BASELINE = "bench/baseline.json"
+TELEM_CONFIG = "mappings/2025_6_10.telem"
+TELEM_MAPPING = "mappings/2025_6_10.yml"
+PLOT_FNS = "analysis/plot_fns"
+
+
+def register_subparser(subparser):
+    subparser.add_argument("--data", type=str, default="data", help="Sample data folder (default: data)")
+    subparser.add_argument("--synthetic", type=int, default=5000, help="Snapshots in the synthetic 0.0.2 log (default: 5000)")
+    subparser.add_argument("--repeat", type=int, default=3, help="Timed runs per stage; the best one counts (default: 3)")
+    subparser.add_argument("--stages", nargs="*", default=None, help="Only run stages whose name contains one of these")
+    subparser.add_argument("--json", type=str, default=None, help="Write the results to this JSON file")
+    subparser.add_argument("--baseline", type=str, default=BASELINE, help=f"Baseline to compare against (default: {BASELINE})")
+    subparser.add_argument(
+        "--threshold", type=float, default=THRESHOLD, help=f"Slowdown that fails a stage, as a fraction (default: {THRESHOLD})"
+    )
+    subparser.add_argument("--update-baseline", action="store_true", help="Save these results as the new baseline instead of comparing")
+
+
+# ——— Inputs ———
+def _largest_per_version(data_dir):
+    """The largest front-daq sample log of every parser version, by version string."""
+    logs = {}
+    for path in glob.glob(os.path.join(data_dir, "front-daq", "*", "*")):
+        version = ParserRegistry.detect_version(path)
+        if version is not None and os.path.getsize(path) >= os.path.getsize(logs.get(str(version), path)):
+            logs[str(version)] = path
+    return dict(sorted(logs.items()))
+
+
+def _synthetic_log(template: str, path: str, n: int) -> None:
+    """A 0.0.2 log of n snapshots: the records of a real log repeated, with a continuous clock."""
+    with open(template, "rb") as f:
+        header = f.read(9)
+        data = f.read()
+    real = np.frombuffer(data[: len(data) - len(data) % LINE_SIZE], np.uint8).reshape(-1, LINE_SIZE)
+    records = real[np.arange(n) % len(real)].copy()
+    records[:, :4] = (np.arange(n, dtype="<u4") * 10).view(np.uint8).reshape(-1, 4)  # time_since_startup
+    with open(path, "wb") as f:
+        f.write(header)
+        f.write(records.tobytes())
+
+
+def _largest_telem_log(data_dir):
+    best = None
+    for path in glob.glob(os.path.join(data_dir, "telem", "*", "*.daq")):
+        with open(path, "rb") as f:
+            raw = f.read()
+        try:
+            _, start = split_telem_log(raw)
+        except ValueError:
+            continue  # empty or truncated recording
+        if best is None or len(raw) > len(best[1]):
+            best = (path, raw, start)
+    return best
+
+
+def _load_plot_fns():
+    modules = []
+    for path in sorted(glob.glob(os.path.join(PLOT_FNS, "plot_fn_*.py"))):
+        name = os.path.basename(path)[:-3]
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        modules.append((name, module))
+    return modules
+
+
+# ——— Stages ———
+def build_stages(args, tmp):
+    """(name, fn, setup) for every stage; fn returns (records, bytes)."""
+    stages = []
+    add = lambda name, fn, setup=None: stages.append((name, fn, setup))
+
+    every_log = [p for p in glob.glob(os.path.join(args.data, "**", "*"), recursive=True) if os.path.isfile(p)]
+    add("sniff headers", lambda: (sum(ParserRegistry.detect_version(p) is not None for p in every_log), 8 * len(every_log)))
+
+    samples = _largest_per_version(args.data)
+    for version, path in samples.items():
+        add(f"parse {version.split()[-1]}", lambda path=path: (len(ParserRegistry.parse(path)), os.path.getsize(path)))
+
+    template = samples.get("NFR25 0.0.2")
+    if template is not None:
+        synthetic = os.path.join(tmp, "synthetic.bin")
+        _synthetic_log(template, synthetic, args.synthetic)
+        add("parse 0.0.2 synthetic", lambda: (len(ParserRegistry.parse(synthetic)), os.path.getsize(synthetic)))
+
+        db = ParserRegistry.parse(template)
+        csv_path = os.path.join(tmp, "sample.csv")
+
+        def to_csv(db=db, path=csv_path):
+            db.to_csv(path)
+            return len(db), os.path.getsize(path)
+
+        add("to_csv", to_csv)
+        big = ParserRegistry.parse(synthetic)
+        add("to_csv synthetic", lambda: to_csv(big, os.path.join(tmp, "synthetic.csv")))
+        to_csv()
+        add("csv_to_db", lambda: (len(csv_to_db(csv_path)), os.path.getsize(csv_path)))
+
+        plot_fns = _load_plot_fns()
+
+        def plots():
+            for name, module in plot_fns:
+                try:
+                    module.main(db, os.path.join(tmp, f"{name}.html"))
+                except Exception:
+                    pass  # a broken plot costs nothing; the plot tool reports it
+            return len(db) * len(plot_fns), 0
+
+        add("plots", plots)
+
+        try:
+            import app
+
+            for name in list(logging.root.manager.loggerDict):
+                if name.startswith("streamlit"):  # no "missing ScriptRunContext" warnings outside `streamlit run`
+                    logging.getLogger(name).setLevel(logging.ERROR)
+
+            header = app.load_header(csv_path, app.file_mtime(csv_path))
+            wanted = header + app.derived_columns(header)
+            add(
+                "app load columns",
+                lambda: (len(app.load_columns(csv_path, wanted)), os.path.getsize(csv_path)),
+                setup=app.get_column_cache.clear,  # a cold cache, like the first plot of a session
+            )
+        except ImportError as e:
+            print(f"Skipping the app stage: {e}", file=sys.stderr)
+
+    with open(TELEM_CONFIG) as f:
+        config_text = f.read()
+    add("telem schema build", lambda: (len(TelemFrameDecoder(build_telem_config(config_text)).signals), len(config_text)))
+    add("telem mapping load", lambda: (len(YamlDataMapper(TELEM_MAPPING).mapping), os.path.getsize(TELEM_MAPPING)))
+
+    telem = _largest_telem_log(args.data)
+    if telem is not None:
+        _, raw, start = telem
+        decoder = TelemFrameDecoder(build_telem_config(split_telem_log(raw)[0]))
+        frames = raw[start:]
+        n = len(decoder.frames(frames))
+
+        def telem_decode():
+            decoder.decode(frames)
+            return n, len(frames)
+
+        add("telem decode", telem_decode)
+        signals = decoder.decode(frames)
+        mapper = YamlDataMapper(TELEM_MAPPING)
+        add("telem map to CarDB", lambda: (len(mapper.map_columns(signals, CarDB(n))), len(frames)))
+
+    if args.stages:
+        stages = [s for s in stages if any(pattern in s[0] for pattern in args.stages)]
+    return stages
+
+
+def main(args):
+    if not os.path.isdir(args.data):
+        print(f"Sample data folder {args.data!r} does not exist!", file=sys.stderr)
+        sys.exit(1)
+
+    baseline = load_results(args.baseline) if os.path.exists(args.baseline) and not args.update_baseline else None
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        print("Preparing inputs...")
+        with contextlib.redirect_stdout(io.StringIO()):  # parsers and mappers narrate their progress
+            stages = build_stages(args, tmp)
+        for name, fn, setup in stages:
+            print(f"  {name}", end="", flush=True)
+            result = measure(name, fn, setup, args.repeat)
+            print(f": {'failed' if result.error else f'{result.seconds * 1000:.1f} ms'}")
+            results.append(result)
+
+    print()
+    print(format_table(results, baseline))
+    if args.json:
+        save_results(results, args.json)
+        print(f"\nResults written to {args.json}")
+    if args.update_baseline:
+        save_results(results, args.baseline)
+        print(f"\nBaseline updated: {args.baseline}")
+        return
+    if baseline is None:
+        print(f"\nNo baseline at {args.baseline}; run with --update-baseline to store one")
+        return
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} stage(s) regressed by more than {args.threshold:.0%}:", file=sys.stderr)
+        for line in regressions:
+            print(f"  {line}", file=sys.stderr)
+        sys.exit(1)
+    print(f"\nNo stage regressed by more than {args.threshold:.0%} against {args.baseline}")
@@ -0,0 +1,75 @@
+from analysis.common.catalog import LogCatalog, CATALOG_NAME
+from analysis.common.columnar import ColumnStore, columns_path
+from analysis.common.laps import MIN_LAP_S, Gate, laps_path, load_or_build
+from analysis.common.parser_registry import ParserRegistry
+
+import math
+import os
+import sys
+
+
+def register_subparser(subparser):
+    subparser.add_argument(
+        "out", type=str, nargs="?", default="out", help="The transformed output folder holding the catalog (default: out)"
+    )
+    subparser.add_argument("--gate", required=True, type=str, help="Start/finish line as 'lat1,lon1,lat2,lon2'")
+    subparser.add_argument(
+        "--sector", action="append", default=[], type=str, help="A sector line as 'lat1,lon1,lat2,lon2' (repeat, in track order)"
+    )
+    subparser.add_argument("--system", default=None, type=str, help="Only logs from this log system, e.g. front-daq")
+    subparser.add_argument("--driveday", default=None, type=str, help="Only logs from this drive day, e.g. 2025-6-10")
+    subparser.add_argument("--min-lap", default=MIN_LAP_S, type=float, help=f"Shortest plausible lap in seconds (default: {MIN_LAP_S:g})")
+
+
+def _open(entry, output_path):
+    cols = columns_path(output_path)
+    if os.path.exists(cols):
+        return ColumnStore(cols)
+    return ParserRegistry.parse(entry.path)
+
+
+def _fmt(ms):
+    return "-" if ms is None or math.isnan(ms) else f"{ms / 1000:.3f}"
+
+
+def main(args):
+    if not os.path.exists(os.path.join(args.out, CATALOG_NAME)):
+        print(f"No catalog in {args.out!r}. Run 'daq.py transform <data> {args.out}' first.", file=sys.stderr)
+        sys.exit(1)
+    try:
+        gate = Gate.parse(args.gate)
+        sectors = [Gate.parse(s) for s in args.sector]
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+
+    with LogCatalog(args.out) as catalog:
+        entries = catalog.query(log_system=args.system, drive_day=args.driveday)
+
+    n_sectors = len(sectors) + 1
+    header = f"{'log':<24} {'lap':>4} {'lap time':>9}" + "".join(f" {'S' + str(j + 1):>8}" for j in range(n_sectors) if n_sectors > 1)
+    print(header)
+    print("-" * len(header))
+    best = None
+    for e in entries:
+        output_path = os.path.join(args.out, e.output_path)
+        label = "/".join(p for p in (e.drive_day, e.name) if p)
+        # the lap index is stored next to the log, so re-running only re-reads it
+        source = e.path if os.path.exists(e.path) else columns_path(output_path)  # rebuilt when the log changes
+        index = load_or_build(
+            lambda: _open(e, output_path), laps_path(output_path), gate, sectors, args.min_lap, e.record_count, source
+        )
+        lap_times = index.lap_times_ms()
+        sector_times = index.sector_times_ms()
+        for k, lap_ms in enumerate(lap_times):
+            row = f"{label:<24} {k + 1:>4} {_fmt(lap_ms):>9}"
+            if n_sectors > 1:
+                row += "".join(f" {_fmt(s):>8}" for s in sector_times[k])
+            print(row)
+            if best is None or lap_ms < best[2]:
+                best = (label, k + 1, lap_ms)
+
+    if best is None:
+        print("\nNo complete laps found")
+    else:
+        print(f"\nBest lap: {best[0]} lap {best[1]} in {_fmt(best[2])}s")
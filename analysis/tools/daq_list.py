@@ -0,0 +1,46 @@
+from analysis.common.catalog import LogCatalog, CATALOG_NAME
+
+import datetime
+import os
+import sys
+
+
+def register_subparser(subparser):
+    subparser.add_argument(
+        "out", type=str, nargs="?", default="out", help="The transformed output folder holding the catalog (default: out)"
+    )
+    subparser.add_argument("--system", default=None, type=str, help="Only logs from this log system, e.g. front-daq")
+    subparser.add_argument("--driveday", default=None, type=str, help="Only logs from this drive day, e.g. 2025-6-10")
+    subparser.add_argument("--min-duration", default=None, type=float, help="Only logs at least this many seconds long")
+    subparser.add_argument("--parser", default=None, type=str, help="Only logs decoded by this parser version, e.g. 0.0.2")
+
+
+def _fmt_unix(t):
+    if t is None:
+        return "-"
+    return datetime.datetime.fromtimestamp(t, datetime.timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def main(args):
+    if not os.path.exists(os.path.join(args.out, CATALOG_NAME)):
+        print(f"No catalog in {args.out!r}. Run 'daq.py transform <data> {args.out}' first.", file=sys.stderr)
+        sys.exit(1)
+
+    with LogCatalog(args.out) as catalog:
+        entries = catalog.query(
+            log_system=args.system,
+            drive_day=args.driveday,
+            min_duration_s=args.min_duration,
+            parser_version=args.parser,
+        )
+
+    header = f"{'system':<10} {'day':<11} {'log':<9} {'parser':<12} {'records':>8} {'duration':>9} {'start (UTC)':<19} {'gps':<3}  output"
+    print(header)
+    print("-" * len(header))
+    for e in entries:
+        gps = "yes" if e.lat_min is not None else "no"
+        print(
+            f"{e.log_system or '-':<10} {e.drive_day or '-':<11} {e.name:<9} {e.parser_version or '-':<12} "
+            f"{e.record_count:>8} {e.duration_s:>8.1f}s {_fmt_unix(e.unix_start):<19} {gps:<3}  {e.output_path}"
+        )
+    print(f"\n{len(entries)} log(s)")
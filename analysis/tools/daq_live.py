@@ -0,0 +1,104 @@
+from analysis.common.live import HOST, BATCH_FRAMES, BATCH_INTERVAL_S, REPLAY_RATE_HZ, TelemIngestServer, read_frames, replay
+from analysis.common.parser_registry import ParserRegistry
+from analysis.common.parsers.telem.frame_decoder import TelemFrameDecoder
+from analysis.common.parsers.telem.telem_base_parser import TelemDAQParserBase, YamlDataMapper, build_telem_config
+
+import asyncio
+import os
+import sys
+
+DEFAULT_CONFIG = "mappings/2025_6_10.telem"
+DEFAULT_MAPPING = "mappings/2025_6_10.yml"
+
+
+def register_subparser(subparser):
+    subparser.add_argument(
+        "log", type=str, nargs="?", default=None, help="An archived .daq log to replay through the live path (omit with --serve)"
+    )
+    subparser.add_argument("--serve", action="store_true", help="Only run the ingest server, until Ctrl-C")
+    subparser.add_argument("--protocol", choices=("udp", "tcp"), default="udp", help="Transport (default: udp)")
+    subparser.add_argument("--port", type=int, default=0, help="Port to listen on (default: any free port when replaying)")
+    subparser.add_argument("--speed", type=float, default=1.0, help="Replay speed multiple, 0 = as fast as possible (default: 1)")
+    subparser.add_argument(
+        "--rate", type=float, default=None,
+        help=f"Replay at this many frames/s instead of the recorded pace (used anyway, at {REPLAY_RATE_HZ:g}, if the log's uptime is not monotonic)",
+    )
+    subparser.add_argument("--batch", type=int, default=BATCH_FRAMES, help=f"Frames per published batch (default: {BATCH_FRAMES})")
+    subparser.add_argument("--config", type=str, default=DEFAULT_CONFIG, help=f"Telem config for --serve (default: {DEFAULT_CONFIG})")
+    subparser.add_argument("--mapping", type=str, default=None, help="Telem-to-CarDB mapping (default: the log's parser mapping)")
+
+
+def _mapper(args):
+    if args.mapping is not None:
+        return YamlDataMapper(args.mapping)
+    if args.serve:
+        return YamlDataMapper(DEFAULT_MAPPING)
+    parser = ParserRegistry.get_parser(ParserRegistry.resolve(ParserRegistry.detect_version(args.log)))
+    return parser.get_mapper() if issubclass(parser, TelemDAQParserBase) else None
+
+
+async def _consume(queue, totals):
+    while True:
+        batch = await queue.get()
+        totals[0] += len(batch)
+
+
+async def _replay(args, decoder, mapper):
+    server = TelemIngestServer(decoder, mapper, batch_frames=args.batch, batch_interval=BATCH_INTERVAL_S)
+    port_arg = {"udp_port" if args.protocol == "udp" else "tcp_port": args.port}
+    await server.start(HOST, **port_arg)
+    port = server.udp_port if args.protocol == "udp" else server.tcp_port
+    totals = [0]
+    consumer = asyncio.create_task(_consume(server.subscribe(), totals))
+
+    print(f"Replaying {args.log!r} at {'max' if args.speed <= 0 else f'{args.speed:g}x'} speed over {args.protocol} to {HOST}:{port}")
+    sent = await replay(args.log, port, HOST, args.protocol, args.speed, rate_hz=args.rate)
+    await asyncio.sleep(2 * BATCH_INTERVAL_S)  # let the last datagrams and batch land
+    await server.close()
+    await asyncio.sleep(0)
+    consumer.cancel()
+
+    print(f"Sent {sent} frames, subscriber received {totals[0]}")
+    print(server.stats.summary())
+
+
+async def _serve(args, decoder, mapper):
+    server = TelemIngestServer(decoder, mapper, batch_frames=args.batch, batch_interval=BATCH_INTERVAL_S)
+    port_arg = {"udp_port" if args.protocol == "udp" else "tcp_port": args.port}
+    await server.start(HOST, **port_arg)
+    port = server.udp_port if args.protocol == "udp" else server.tcp_port
+    print(f"Listening for {decoder.frame_size}-byte telem frames on {args.protocol} {HOST}:{port} (Ctrl-C to stop)")
+    totals = [0]
+    consumer = asyncio.create_task(_consume(server.subscribe(), totals))
+    try:
+        while True:
+            await asyncio.sleep(1.0)
+            if server.stats.frames:
+                print(server.stats.summary())
+    finally:
+        consumer.cancel()
+        await server.close()
+
+
+def main(args):
+    if args.serve == (args.log is not None):
+        print("Give either a log to replay or --serve", file=sys.stderr)
+        sys.exit(1)
+    path = args.config if args.serve else args.log
+    if not os.path.isfile(path):
+        print(f"{path!r} does not exist!", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        if args.serve:
+            with open(path) as f:
+                decoder = TelemFrameDecoder(build_telem_config(f.read()))
+        else:
+            decoder, _ = read_frames(path)
+        mapper = _mapper(args)
+        asyncio.run(_serve(args, decoder, mapper) if args.serve else _replay(args, decoder, mapper))
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,73 @@
+from analysis.common.catalog import LogCatalog, CATALOG_NAME
+from analysis.common.query import Expression, catalog_sources, file_sources, search
+
+import csv
+import os
+import sys
+import time
+
+
+def register_subparser(subparser):
+    subparser.add_argument(
+        "expression", type=str, help="Condition over channel paths, e.g. \"ecu.front_brake_pressure > 1000 and abs(dynamics.steering_angle) > 20\""
+    )
+    subparser.add_argument(
+        "out", type=str, nargs="?", default="out", help="The transformed output folder holding the catalog (default: out)"
+    )
+    subparser.add_argument("--logs", default=None, type=str, help="Search raw logs under this path instead of the catalog")
+    subparser.add_argument("--system", default=None, type=str, help="Only logs from this log system, e.g. front-daq")
+    subparser.add_argument("--driveday", default=None, type=str, help="Only logs from this drive day, e.g. comp")
+    subparser.add_argument("--min-duration", default=0, type=float, help="Drop segments shorter than this many ms")
+    subparser.add_argument("--workers", default=None, type=int, help="Worker processes (default: one per CPU)")
+    subparser.add_argument("--csv", default=None, type=str, help="Also write the matches to this CSV file")
+
+
+def main(args):
+    try:
+        expression = Expression(args.expression)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+
+    if args.logs is not None:
+        if not os.path.exists(args.logs):
+            print(f"Input path {args.logs!r} does not exist!", file=sys.stderr)
+            sys.exit(1)
+        sources = file_sources(args.logs)
+        total = len(sources)
+    else:
+        if not os.path.exists(os.path.join(args.out, CATALOG_NAME)):
+            print(f"No catalog in {args.out!r}. Run 'daq.py transform <data> {args.out}' first.", file=sys.stderr)
+            sys.exit(1)
+        with LogCatalog(args.out) as catalog:
+            total = len(catalog.query(log_system=args.system, drive_day=args.driveday))
+            sources = catalog_sources(catalog, expression, log_system=args.system, drive_day=args.driveday)
+
+    print(f"Searching {len(sources)} of {total} log(s) for: {expression.text}")
+    t0 = time.perf_counter()
+    skipped = []
+    matches = search(expression, sources, min_duration_ms=args.min_duration, workers=args.workers, skipped=skipped)
+    elapsed = time.perf_counter() - t0
+    for label, error in skipped:
+        print(f"Skipped {label}: {error}", file=sys.stderr)
+
+    header = f"{'log':<24} {'start (s)':>10} {'end (s)':>10} {'duration (s)':>12} {'samples':>8}"
+    print(header)
+    print("-" * len(header))
+    for m in matches:
+        print(
+            f"{m.log:<24} {m.start_ms / 1000:>10.3f} {m.end_ms / 1000:>10.3f} "
+            f"{m.duration_ms / 1000:>12.3f} {m.stop_index - m.start_index:>8}"
+        )
+    print(
+        f"\n{len(matches)} segment(s) in {len({m.log for m in matches})} log(s), {elapsed:.2f}s"
+        + (f" ({len(skipped)} log(s) skipped)" if skipped else "")
+    )
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["log", "start_ms", "end_ms", "duration_ms", "start_index", "stop_index"])
+            for m in matches:
+                writer.writerow([m.log, m.start_ms, m.end_ms, m.duration_ms, m.start_index, m.stop_index])
+        print(f"Matches written to {args.csv!r}")
@@ -0,0 +1,52 @@
+from analysis.common.synth import CHUNK_SNAPSHOTS, FORMATS, PERIOD_MS, get_format, snapshots_for_size, write_log
+
+import os
+import sys
+import time
+
+SIZE_UNITS = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+
+
+def register_subparser(subparser):
+    subparser.add_argument("out", type=str, help="The log file to write")
+    subparser.add_argument("--format", choices=list(FORMATS), default="0.0.2", help="Log format to write (default: 0.0.2)")
+    size = subparser.add_mutually_exclusive_group(required=True)
+    size.add_argument("--snapshots", type=int, help="Number of snapshots to write")
+    size.add_argument("--size", type=str, help="Approximate file size instead, e.g. 500M or 2G")
+    subparser.add_argument("--period-ms", type=int, default=PERIOD_MS, help=f"Logging period in ms (default: {PERIOD_MS})")
+    subparser.add_argument("--seed", type=int, default=0, help="Seed of the sensor noise (default: 0)")
+    subparser.add_argument("--chunk", type=int, default=CHUNK_SNAPSHOTS, help=f"Snapshots generated at a time (default: {CHUNK_SNAPSHOTS})")
+
+
+def parse_size(text: str) -> int:
+    """Bytes in '123', '500M', '2G', ... (binary units)."""
+    text = text.strip().upper().rstrip("B")
+    scale = SIZE_UNITS.get(text[-1:], 1)
+    number = text[:-1] if text[-1:] in SIZE_UNITS else text
+    return int(float(number) * scale)
+
+
+def main(args):
+    if args.period_ms <= 0 or args.chunk <= 0:
+        print("--period-ms and --chunk must be positive", file=sys.stderr)
+        sys.exit(1)
+    fmt = get_format(args.format)
+    if args.size is not None:
+        try:
+            n = snapshots_for_size(fmt, parse_size(args.size))
+        except ValueError:
+            print(f"Can't read size {args.size!r}, expected e.g. 500M or 2G", file=sys.stderr)
+            sys.exit(1)
+    else:
+        n = args.snapshots
+    if n < 0:
+        print("--snapshots must be at least 0", file=sys.stderr)
+        sys.exit(1)
+
+    t0 = time.perf_counter()
+    size = write_log(args.out, fmt, n, args.period_ms, args.seed, args.chunk)
+    seconds = time.perf_counter() - t0
+    print(
+        f"Wrote {n} snapshots ({n * args.period_ms / 60000:.1f} min of driving) to {os.path.abspath(args.out)}: "
+        f"{size / 1e6:.1f} MB in {seconds:.1f} s, {size / 1e6 / max(seconds, 1e-9):.0f} MB/s"
+    )
@@ -1,5 +1,13 @@
 from analysis.common.parser_registry import ParserRegistry
 from analysis.common.car_db import CarDB
+from analysis.common.pyramid import pyramid_path, write_pyramid
+from analysis.common.catalog import LogCatalog
+from analysis.common.zone_maps import ZoneMap, zone_path
+from analysis.common.columnar import save_columns, columns_path
+from analysis.common.stream import POLL_INTERVAL_S
+from analysis.common.profiling import Progress, stage
+from analysis.common.segmented import SEGMENT_SNAPSHOTS
+from analysis.common import shared
 
 import os
 import sys
@@ -10,19 +18,81 @@ def register_subparser(subparser):#takes in the cli args
         "input", type=str, help="The path or directory of the data files"
     )
     subparser.add_argument("out", type=str, help="The directory to store the output")
+    subparser.add_argument(
+        "--force", action="store_true", help="Re-transform logs even if the catalog says they are up to date"
+    )
+    subparser.add_argument(
+        "--follow", action="store_true", help="Keep decoding a single log while it is still being written (Ctrl-C to stop)"
+    )
+    subparser.add_argument(
+        "--jobs", type=int, default=1, help="Processes formatting each log's CSV rows, sharing one copy of the log (default: 1)"
+    )
+    subparser.add_argument(
+        "--idle-timeout", type=float, default=None, help="With --follow, stop after this many seconds without new records"
+    )
 
 
-def transform_file(input_path: str, output_path: str):
+def transform_file(input_path: str, output_path: str, catalog: LogCatalog = None, force: bool = False, jobs: int = 1):
     # make sure the output sub‐directory exists
     os.makedirs(os.path.dirname(output_path), exist_ok=True)#create the output folder
 
+    if catalog is not None and not force and catalog.is_current(input_path):
+        print(f"Skipping {input_path!r} (unchanged since last transform)")
+        return
+
     print(f"Transforming {input_path!r} → {output_path!r}")
-    db = ParserRegistry.parse(input_path) #parse the binary data and store into db
+    # parse the binary data into a SegmentedCarDB, so long logs never need one contiguous block
+    db, version = ParserRegistry.parse_with_version(input_path, SEGMENT_SNAPSHOTS)
     if db == None:
         print(f"Something went wrong while parsing {input_path!r}")
         return
 
-    db.to_csv(output_path)#write db to csv
+    if jobs > 1:
+        shared.to_csv(db, output_path, jobs)#workers attach to one shared memory copy of the log
+    else:
+        db.to_csv(output_path)#write db to csv, one segment at a time
+    write_sidecars(input_path, output_path, db, version, catalog)
+
+
+def write_sidecars(input_path: str, output_path: str, db: CarDB, version, catalog: LogCatalog = None):
+    with stage("pyramid", records=len(db)):
+        write_pyramid(db, pyramid_path(output_path))#min/max overview sidecar the app plots long logs from
+    with stage("zone maps", records=len(db)):
+        zones = ZoneMap.build(db)#per-chunk stats so searches can skip chunks and logs
+        zones.save(zone_path(output_path))
+    save_columns(db, columns_path(output_path))#per-channel arrays so queries don't re-parse the log
+    if catalog is not None:
+        with stage("catalog", records=1):
+            catalog.add(input_path, output_path, db, version, zones)#one row per log for fast discovery
+
+
+def follow_file(input_path: str, output_path: str, catalog: LogCatalog = None, idle_timeout: float = None):
+    """
+    Tail a log that is still being written: newly completed records are appended to
+    the CSV as they arrive, the sidecars and catalog entry are written when following stops.
+    """
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    if os.path.exists(output_path):
+        os.remove(output_path)  # rows are appended from the first record on
+
+    print(f"Following {input_path!r} → {output_path!r} (Ctrl-C to stop)")
+    stream = ParserRegistry.open_stream(input_path)
+    progress = Progress("  snapshots")
+    try:
+        for chunk in stream.follow(POLL_INTERVAL_S, idle_timeout):
+            chunk.to_csv(output_path, append=True)
+            if len(stream) >= progress.due:
+                progress.report(len(stream))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stream.close()
+
+    if not len(stream):
+        print(f"No complete records in {input_path!r}")
+        return
+    progress.finish(len(stream))
+    write_sidecars(input_path, output_path, stream.db, stream.version, catalog)
 
 
 def main(args):
@@ -41,6 +111,26 @@ def main(args):
         )
         sys.exit(1)
 
+    if args.jobs < 1:
+        print("--jobs must be at least 1", file=sys.stderr)
+        sys.exit(1)
+
+    catalog = LogCatalog(output_root)#incrementally updated index of every transformed log
+
+    if args.follow:
+        if not os.path.isfile(data_path):
+            print("--follow needs a single log file, not a directory", file=sys.stderr)
+            sys.exit(1)
+        dst = os.path.join(output_root, os.path.splitext(os.path.basename(data_path))[0] + ".csv")
+        try:
+            follow_file(data_path, dst, catalog, args.idle_timeout)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            sys.exit(1)
+        finally:
+            catalog.close()
+        return
+
     # walk everything under data_path
     if os.path.isdir(data_path):#if the data is a folder
         for root, _, files in os.walk(data_path): #go into all files
@@ -55,7 +145,7 @@ def main(args):
                 # make sure the output subdir exists
                 os.makedirs(os.path.dirname(dst), exist_ok=True)#create the output csv file
 
-                transform_file(src, dst)#transform all binary files one by one to csv
+                transform_file(src, dst, catalog, args.force, args.jobs)#transform all binary files one by one to csv
 
     elif os.path.isfile(data_path):#else if tis just one file, just transform it.
         # change basename to .csv
@@ -65,8 +155,10 @@ def main(args):
         # ensure output directory exists
         os.makedirs(os.path.dirname(dst), exist_ok=True)
 
-        transform_file(data_path, dst)
+        transform_file(data_path, dst, catalog, args.force, args.jobs)
 
     else:
         print(f"Cannot read input {data_path!r}", file=sys.stderr)
         sys.exit(1)#error catching
+
+    catalog.close()
@@ -1,38 +1,319 @@
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
+import numpy as np
 import os
-from typing import List, Dict
+from collections import OrderedDict
+from typing import List, Dict, Optional
 import tempfile
+import threading
+
+from analysis.common import derived
+from analysis.common.car_db import channel_columns
+from analysis.common.catalog import LogCatalog, CATALOG_NAME
+from analysis.common.decimate import minmax_decimate, window_indices
+from analysis.common.parser_registry import ParserRegistry
+from analysis.common.pyramid import ChannelPyramid, pyramid_path
+
+
+# ——— Data loading ———
+INDEX_COLUMN = "Time-index"  # synthetic row-number column offered in the selectors
+PREVIEW_ROWS = 100  # rows shown per preview page
+CACHE_MAX_BYTES = 512 * 1024 * 1024  # memory cap for cached columns, shared by all sessions
+CSV_COLUMNS = channel_columns()  # CarDB channel path -> transformed CSV column name
+COLUMN_PATHS = {column: path for path, column in CSV_COLUMNS.items()}  # and back
+RAW_LOG_SUFFIX = ".bin"  # raw logs are decoded straight into a DataFrame, no transform needed
+
+# ——— Log discovery ———
+@st.cache_data(max_entries=4, show_spinner=False)
+def catalog_listing(data_dir: str, mtime: float) -> Dict[str, Dict[str, List[str]]]:
+    """{log system: {drive day: [csv files]}} from the catalog written by `daq.py transform`."""
+    listing: Dict[str, Dict[str, List[str]]] = {}
+    with LogCatalog(data_dir) as catalog:
+        for entry in catalog.query():
+            if entry.log_system is None or entry.drive_day is None:
+                continue
+            listing.setdefault(entry.log_system, {}).setdefault(entry.drive_day, []).append(
+                os.path.basename(entry.output_path)
+            )
+    return listing
+
+
+def walk_listing(data_dir: str) -> Dict[str, Dict[str, List[str]]]:
+    """Same listing as catalog_listing, built by walking data_dir/<system>/<day>/ for CSVs and raw .bin logs"""
+    listing: Dict[str, Dict[str, List[str]]] = {}
+    for system in os.listdir(data_dir):
+        system_path = os.path.join(data_dir, system)
+        if not os.path.isdir(system_path):
+            continue
+        listing[system] = {}
+        for day in os.listdir(system_path):
+            day_path = os.path.join(system_path, day)
+            if os.path.isdir(day_path):#if its a folder
+                listing[system][day] = [f for f in os.listdir(day_path) if f.endswith((".csv", RAW_LOG_SUFFIX))]
+    return listing
+
+
+def load_listing(data_dir: str) -> Dict[str, Dict[str, List[str]]]:
+    """Queries the catalog when there is one, otherwise walks the folders."""
+    catalog_path = os.path.join(data_dir, CATALOG_NAME)
+    if os.path.exists(catalog_path):
+        listing = catalog_listing(data_dir, file_mtime(catalog_path))
+        if listing:
+            return listing
+    return walk_listing(data_dir)
+
+
+# ——— Plotting ———
+MAX_POINTS_PER_TRACE = 4000  # points sent to the browser per trace after decimation
+WEBGL_THRESHOLD = 5000  # switch to Scattergl above this many points per figure
 
 
-def load_dataframe(filepath: str) ->  pd.DataFrame:
+def file_mtime(filepath: str) -> float:
+    """Modification time of a file, used to key every cache so re-transformed logs reload."""
+    return os.path.getmtime(filepath)
+
+
+@st.cache_resource(max_entries=8, show_spinner="Decoding log...")
+def load_raw_log(filepath: str, mtime: float) -> Optional[pd.DataFrame]:
     """
-    Loads CSV or Excel file into Pandas DataFrame.
+    Decodes a raw log into a DataFrame with the transformed CSV's column names.
+    The columns are views of the parsed records, so nothing goes through text.
 
     Args:
-    filepath: The path to the file to load.
+        filepath: The path to the raw log.
+        mtime: Modification time of the file (cache key only).
     Returns:
-        the corresponding DataFrame.
+        the decoded log, or None if it can't be parsed.
     """
+    try:
+        db = ParserRegistry.parse(filepath)
+    except Exception as e:
+        st.error(f"Error parsing {filepath}: {e}")
+        return None
+    if db is None:
+        st.error(f"Can't parse {filepath}: no parser for its version")
+        return None
+    return db.to_dataframe()
+
 
+@st.cache_data(max_entries=64, show_spinner=False)
+def load_header(filepath: str, mtime: float) -> List[str]:
+    """
+    Loads only the column names of a CSV or Excel file.
+
+    Args:
+        filepath: The path to the file to load.
+        mtime: Modification time of the file (cache key only).
+    Returns:
+        the list of column names, or an empty list if the file can't be read.
+    """
     try:
         if filepath.endswith(".csv"):
-            df = pd.read_csv(filepath)
+            return list(pd.read_csv(filepath, nrows=0).columns)
+        elif filepath.endswith(RAW_LOG_SUFFIX):
+            df = load_raw_log(filepath, mtime)
+            return list(df.columns) if df is not None else []  # load_raw_log has shown the error
         elif filepath.endswith(".xlsx"):
-            df = pd.read_excel(filepath)
+            return list(pd.read_excel(filepath, nrows=0).columns)
         else:
             st.error(f"Unsupported file type: {filepath}")
     except Exception as e:
         st.error(f"Error loading {filepath}: {e}")
+    return []
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def count_rows(filepath: str, mtime: float) -> int:
+    """Counts the data rows of a CSV file without parsing it."""
+    if filepath.endswith(RAW_LOG_SUFFIX):
+        df = load_raw_log(filepath, mtime)
+        return len(df) if df is not None else 0
+    if not filepath.endswith(".csv"):
+        return len(pd.read_excel(filepath, usecols=[0]))
+    lines = 0
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            lines += chunk.count(b"\n")
+    return max(lines - 1, 0)  # minus the header
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def load_preview(filepath: str, mtime: float, page: int, page_size: int = PREVIEW_ROWS) -> pd.DataFrame:
+    """Loads one page of rows for the data preview."""
+    start = page * page_size
+    if filepath.endswith(".csv"):
+        df = pd.read_csv(filepath, skiprows=range(1, start + 1), nrows=page_size)
+    elif filepath.endswith(RAW_LOG_SUFFIX):
+        df = load_raw_log(filepath, mtime)
+        return df.iloc[start : start + page_size].copy() if df is not None else pd.DataFrame()
+    else:
+        df = pd.read_excel(filepath, skiprows=range(1, start + 1), nrows=page_size)
+    df.index = range(start, start + len(df))
     return df
 
 
+class ColumnCache:
+    """
+    Least-recently-used store of single columns keyed on (filepath, mtime, column).
+    Evicts the oldest columns once the total size passes max_bytes.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._columns: "OrderedDict[tuple, pd.Series]" = OrderedDict()
+        self._lock = threading.Lock()  # the cache is shared between sessions
+
+    def get(self, key: tuple) -> Optional[pd.Series]:
+        with self._lock:
+            col = self._columns.get(key)
+            if col is not None:
+                self._columns.move_to_end(key)
+            return col
+
+    def put(self, key: tuple, col: pd.Series) -> None:
+        with self._lock:
+            if key in self._columns:
+                return
+            self._columns[key] = col
+            self.nbytes += col.memory_usage(index=False, deep=True)
+            while self.nbytes > self.max_bytes and len(self._columns) > 1:
+                _, old = self._columns.popitem(last=False)
+                self.nbytes -= old.memory_usage(index=False, deep=True)
+
+
+@st.cache_resource
+def get_column_cache() -> ColumnCache:
+    return ColumnCache(CACHE_MAX_BYTES)
 
 
-def plot_data(data: pd.DataFrame, x_axis: str, y_axes: List[str], plot_title: str, plot_type: str = "Line Plot") -> go.Figure:
+def derived_columns(header: List[str]) -> List[str]:
+    """Derived channels (e.g. inverter.power_kw) whose raw inputs are all in a file's header."""
+    present = set(header)
+    return [p for p in derived.derived_paths() if all(CSV_COLUMNS.get(d) in present for d in derived.dependencies(p))]
+
+
+def load_columns(filepath: str, columns: List[str]) -> pd.DataFrame:
+    """
+    Loads only the requested columns of a CSV or Excel file, reusing any column
+    that is already cached. INDEX_COLUMN is generated rather than read, and
+    derived channels are computed from the raw columns they depend on.
+
+    Args:
+    filepath: The path to the file to load.
+    columns: The column names to load.
+    Returns:
+        a DataFrame with exactly those columns.
+    """
+    mtime = file_mtime(filepath)
+    cache = get_column_cache()
+    wanted = list(dict.fromkeys(columns))  # drop duplicates, keep order
+    loaded = {c: cache.get((filepath, mtime, c)) for c in wanted if c != INDEX_COLUMN}
+    to_derive = [c for c, col in loaded.items() if col is None and derived.is_derived(c)]
+    raw = {c: col for c, col in loaded.items() if not derived.is_derived(c)}
+    for c in to_derive:  # read the inputs of derived channels alongside the requested columns
+        for dep in derived.dependencies(c):
+            raw.setdefault(CSV_COLUMNS[dep], cache.get((filepath, mtime, CSV_COLUMNS[dep])))
+    missing = [c for c, col in raw.items() if col is None]
+
+    if missing:
+        try:
+            if filepath.endswith(".csv"):
+                part = pd.read_csv(filepath, usecols=missing)
+            elif filepath.endswith(RAW_LOG_SUFFIX):
+                df = load_raw_log(filepath, mtime)
+                if df is None:
+                    raise ValueError("the log can't be parsed")
+                # copied so a cached column doesn't keep the whole record array alive
+                part = pd.DataFrame({c: df[c].to_numpy().copy() for c in missing})
+            else:
+                part = pd.read_excel(filepath, usecols=missing)
+        except Exception as e:
+            st.error(f"Error loading {filepath}: {e}")
+            return pd.DataFrame()
+        for c in missing:
+            raw[c] = part[c]
+            cache.put((filepath, mtime, c), part[c])
+
+    def channel(path):
+        if derived.is_derived(path):
+            return derived.compute(path, channel)
+        return raw[CSV_COLUMNS[path]].to_numpy()
+
+    for c in to_derive:
+        loaded[c] = pd.Series(channel(c), name=c)
+        cache.put((filepath, mtime, c), loaded[c])
+    loaded.update({c: raw[c] for c in loaded if c in raw})
+
+    if INDEX_COLUMN in wanted:
+        n_rows = len(next(iter(loaded.values()))) if loaded else count_rows(filepath, mtime)
+        loaded[INDEX_COLUMN] = pd.Series(np.arange(n_rows), name=INDEX_COLUMN)
+    return pd.DataFrame({c: loaded[c] for c in wanted})
+
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def load_pyramid(filepath: str, mtime: float) -> Optional[ChannelPyramid]:
+    """
+    The pyramid sidecar `daq.py transform` wrote next to a CSV (channels are read
+    when first plotted), or None if there is none as new as the CSV.
+    """
+    path = pyramid_path(filepath)
+    if not filepath.endswith(".csv") or not os.path.exists(path) or os.path.getmtime(path) < mtime:
+        return None
+    try:
+        return ChannelPyramid.load(path)
+    except (OSError, ValueError):
+        return None
+
+
+def pyramid_data(filepath: str, x_axis: str, y_axes: List[str], x_range: Optional[tuple] = None) -> Optional[pd.DataFrame]:
+    """
+    The overview of a long log (or of a wide zoom window) straight from its pyramid
+    sidecar: every bucket's min and max, at the bucket's first and last x, so no
+    column has to be loaded. Returns None, for load_columns to be used instead, when
+    there is no sidecar, the x-axis is neither the index nor a clock, or the range is
+    short enough to draw every sample.
+    """
+    pyr = load_pyramid(filepath, file_mtime(filepath))
+    if pyr is None or x_axis in y_axes:
+        return None
+    path_of = lambda column: column if derived.is_derived(column) else COLUMN_PATHS.get(column)
+    paths = [path_of(c) for c in y_axes]
+    if any(p not in pyr.channels for p in paths):
+        return None
+    max_points = MAX_POINTS_PER_TRACE // 2  # two points per bucket
+
+    if x_axis == INDEX_COLUMN:
+        start, stop = (0, pyr.n_snapshots) if x_range is None else (int(np.floor(x_range[0])), int(np.floor(x_range[1])) + 1)
+    else:
+        x_path = path_of(x_axis)
+        if x_path not in pyr.channels:
+            return None
+        span = pyr.index_range(x_path, *(x_range or (-np.inf, np.inf)), max_points=max_points)
+        if span is None:
+            return None  # not a clock, so buckets of snapshots aren't ranges of x
+        start, stop = span
+    if stop - start < max_points * pyr.min_bucket:
+        return None  # even level 0 would draw fewer points than decimating the samples
+    slices = [pyr.query(p, start, stop, max_points) for p in paths]
+
+    if x_axis == INDEX_COLUMN:
+        x_lo = slices[0].starts
+        x_hi = np.minimum(x_lo + slices[0].bucket, pyr.n_snapshots) - 1
+    else:
+        x = pyr.query(x_path, start, stop, max_points)
+        x_lo, x_hi = x.mins, x.maxs
+    data = {x_axis: np.column_stack([x_lo, x_hi]).ravel()}
+    for column, s in zip(y_axes, slices):
+        data[column] = np.column_stack([s.mins, s.maxs]).ravel()
+    return pd.DataFrame(data)
+
+
+def plot_data(data: pd.DataFrame, x_axis: str, y_axes: List[str], plot_title: str, plot_type: str = "Line Plot", x_range: Optional[tuple] = None) -> go.Figure:
     """
     Plots the data based on user selections using Plotly.  Returns the Plotly figure.
+    Long traces are min/max decimated to MAX_POINTS_PER_TRACE and drawn with WebGL.
 
     Args:
         data: The Pandas DataFrame containing the data to plot.
@@ -40,20 +321,33 @@ def plot_data(data: pd.DataFrame, x_axis: str, y_axes: List[str], plot_title: st
         y_axis: The column name for the y-axis.
         plot_title: Title of the plot
         plot_type: The type of plot to create ("Line Plot" or "Scatter Plot").
+        x_range: Optional (x0, x1) window; only samples inside it are sent to the browser.
 
     Returns:
         A Plotly Figure object.
     """
     fig = go.Figure()
 
+    if plot_type == "Line Plot":
+        mode = 'lines'
+    elif plot_type == "Scatter Plot":
+        mode = 'markers'
+    else:
+        st.error(f"Unsupported plot type: {plot_type}")
+        return go.Figure()
+
+    x = data[x_axis].to_numpy()
+    window = slice(None)
+    if x_range is not None:
+        window = window_indices(x, *x_range)
+    x = x[window]
+
+    # WebGL once the browser would otherwise draw a lot of SVG points
+    trace_cls = go.Scattergl if len(x) * len(y_axes) > WEBGL_THRESHOLD else go.Scatter
+
     for y_col in y_axes:
-        if plot_type == "Line Plot":
-            fig.add_trace(go.Scatter(x=data[x_axis], y=data[y_col], mode='lines', name=y_col))
-        elif plot_type == "Scatter Plot":
-            fig.add_trace(go.Scatter(x=data[x_axis], y=data[y_col], mode='markers', name=y_col))
-        else:
-            st.error(f"Unsupported plot type: {plot_type}")
-            return go.Figure()
+        xs, ys = minmax_decimate(x, data[y_col].to_numpy()[window], MAX_POINTS_PER_TRACE)
+        fig.add_trace(trace_cls(x=xs, y=ys, mode=mode, name=y_col))
     legend=dict(
     font=dict(size=14, color="#FFFFFF"),
     bgcolor="rgba(0,0,0,0)",
@@ -69,13 +363,32 @@ def plot_data(data: pd.DataFrame, x_axis: str, y_axes: List[str], plot_title: st
         font_color="#FFFFFF",
         xaxis=dict(gridcolor="#4a4a4a", zerolinecolor="#4a4a4a"),
         yaxis=dict(gridcolor="#4a4a4a", zerolinecolor="#4a4a4a"),
-        legend=legend
-
-
-        
+        legend=legend,
+        dragmode="select",  # drag to pick an x-range, which is re-fetched at full resolution
+        selectdirection="h",
     )
+    if x_range is not None:
+        fig.update_xaxes(range=list(x_range))
     return fig
 
+def apply_zoom(event, view: str) -> None:
+    """
+    Turns a new box selection on a plot into its zoom window and reruns, so the
+    visible x-range is re-fetched from the pyramid, or the cached columns once it is
+    short enough to draw every sample. view names the plot, its file and its x-axis,
+    so a window is never applied to another log or axis.
+    """
+    boxes = (event or {}).get("selection", {}).get("box", [])
+    if not boxes or "x" not in boxes[-1]:
+        return
+    x0, x1 = sorted(boxes[-1]["x"][:2])
+    applied_key = f"applied_selection_{view}"
+    if st.session_state.get(applied_key) == (x0, x1):
+        return  # selection already applied (or cleared by "Reset zoom")
+    st.session_state[applied_key] = (x0, x1)
+    st.session_state[f"zoom_{view}"] = (x0, x1)
+    st.rerun()
+
 def get_plot_download_link(fig, filename="plot.html"):
     """
     Saves a Plotly figure to an HTML file and returns a download link.
@@ -121,30 +434,20 @@ def main():
 
     #Selecting the Drive Day
     DATA_DIR = 'out'#hardcoded for now
-    log_systems = []#list of log systems
-    for folder in os.listdir(DATA_DIR):
-        if os.path.isdir(os.path.join(DATA_DIR,folder)):
-            log_systems.append(folder)
-    log_systems = sorted(log_systems)#sort the folders for easy select
+    listing = load_listing(DATA_DIR)#{log system: {drive day: [csv files]}}
+    log_systems = sorted(listing)#sort the folders for easy select
 
     select_log_system = st.sidebar.selectbox('Select the Log System', log_systems, key='selected_log_system')
 
     if select_log_system:
         folder_path = os.path.join(DATA_DIR, select_log_system)#path to the selected folder
 
-    day_folders = [] #list of driveday folder paths
-    for folder in os.listdir(folder_path):
-        if os.path.isdir(os.path.join(folder_path,folder)):#if its a folder
-            day_folders.append(folder)
-    day_folders = sorted(day_folders)#sort the folders for easy select
+    day_folders = sorted(listing.get(select_log_system, {}))#sort the folders for easy select
     select_day = st.sidebar.selectbox('Select the Drive Day', day_folders, key='selected_day')
     #Selecting the Files
     if select_day:
         folder_path = os.path.join(folder_path, select_day)#path to the selected folder
-        csv_files = []#list of csv files for that day
-        for file in os.listdir(folder_path):
-            if file.endswith(".csv"):
-                csv_files.append(file)
+        csv_files = listing[select_log_system][select_day]#list of csv files for that day
         select_csv = st.sidebar.selectbox("Select Data File", csv_files, key="selected_csv")
 
     st.sidebar.selectbox("Type of Visualizations", ["Linear", "Special"], key="selected_type")
@@ -155,15 +458,21 @@ def main():
         ##
         if select_csv:#if you have selected a csv
             fullfilepath = os.path.join(folder_path,select_csv )
-            df = load_dataframe(filepath=fullfilepath)#load selected csv into dataframe
-            df = df.reset_index(drop=False)
-            df.rename(columns={'index':'Time-index'}, inplace=True)
+            mtime = file_mtime(fullfilepath)
+            # only the header is read up front; columns are loaded when plotted
+            header = load_header(fullfilepath, mtime)
+            if not header:
+                st.stop()  # load_header has already shown why
+            columns = [INDEX_COLUMN] + header + derived_columns(header)
             #timesteps
 
 
             st.write("File uploaded successfully!")
             st.write("Preview of the data:")
-            st.write(df)
+            n_rows = count_rows(fullfilepath, mtime)
+            n_pages = max((n_rows + PREVIEW_ROWS - 1) // PREVIEW_ROWS, 1)
+            page = st.number_input(f"Preview page (of {n_pages}, {n_rows} rows)", min_value=1, max_value=n_pages, value=1, key="preview_page")
+            st.dataframe(load_preview(fullfilepath, mtime, int(page) - 1))
 
             plot_configs = []  # List to store plot configurations
             show_plots = False #flag
@@ -180,8 +489,8 @@ def main():
                         y_axis_key = f"y_axis_{i}"
                         plot_type_key = f"plot_type_{i}"
 
-                        x_axis = st.selectbox(f"Select X-axis variable for Plot {i + 1}", df.columns, key=x_axis_key)
-                        y_axes = st.multiselect(f"Select Y-axis variable for Plot {i + 1}", df.columns, key=y_axis_key)
+                        x_axis = st.selectbox(f"Select X-axis variable for Plot {i + 1}", columns, key=x_axis_key)
+                        y_axes = st.multiselect(f"Select Y-axis variable for Plot {i + 1}", columns, key=y_axis_key)
                         plot_type = st.selectbox(f"Select Plot Type for Plot {i + 1}", ["Line Plot", "Scatter Plot"], key=plot_type_key)
 
                         if y_axes:#only if the user has selected plotting values
@@ -189,14 +498,14 @@ def main():
                                 "x_axis": x_axis,
                                 "y_axis": y_axes,#could be a list
                                 "plot_type": plot_type,
-                                "df": df, #store df
+                                "filepath": fullfilepath, #columns are loaded lazily at plot time
                                 "title": f"{', '.join(y_axes)} vs {x_axis}"
                             })
 
             else:
                 st.subheader("Plot 1")
-                x_axis = st.selectbox("Select X-axis variable for Plot 1", df.columns, key="x_axis_0")
-                y_axes = st.multiselect("Select Y-axis variable for Plot 1", df.columns, key="y_axis_0")
+                x_axis = st.selectbox("Select X-axis variable for Plot 1", columns, key="x_axis_0")
+                y_axes = st.multiselect("Select Y-axis variable for Plot 1", columns, key="y_axis_0")
                 plot_type = st.selectbox("Select Plot Type for Plot 1", ["Line Plot", "Scatter Plot"], key="plot_type_0")
 
                 if y_axes:  # Only if the user has selected plotting values
@@ -204,13 +513,14 @@ def main():
                         "x_axis": x_axis,
                         "y_axis": y_axes,
                         "plot_type": plot_type,
-                        "df": df,
+                        "filepath": fullfilepath,
                         "title": f"{', '.join(y_axes)} vs {x_axis}"
                     })
 
             # Generate Plots Button
             if st.button("Generate Plots"):
-                show_plots = True #set flag
+                st.session_state.show_plots = True #remember across reruns so zooming keeps the plots
+            show_plots = st.session_state.get("show_plots", False)
 
             if show_plots and plot_configs:
                 # Create a 2x2 grid for displaying the plots
@@ -223,8 +533,16 @@ def main():
 
                 for i, config in enumerate(plot_configs):
                     with plot_rows[i]:
-                        fig = plot_data(data=config["df"], x_axis=config["x_axis"], y_axes=config["y_axis"], plot_type=config["plot_type"], plot_title=config['title'])
-                        st.plotly_chart(fig, use_container_width=True)
+                        view = f"{i}_{config['filepath']}_{config['x_axis']}"  # zoom state of this plot, file and x-axis only
+                        zoom_key = f"zoom_{view}"
+                        if st.button("Reset zoom", key=f"reset_zoom_{i}"):
+                            st.session_state[zoom_key] = None
+                        data = pyramid_data(config["filepath"], config["x_axis"], config["y_axis"], st.session_state.get(zoom_key))
+                        if data is None:  # no sidecar, or zoomed in far enough to draw every sample
+                            data = load_columns(config["filepath"], [config["x_axis"]] + config["y_axis"])
+                        fig = plot_data(data=data, x_axis=config["x_axis"], y_axes=config["y_axis"], plot_type=config["plot_type"], plot_title=config['title'], x_range=st.session_state.get(zoom_key))
+                        event = st.plotly_chart(fig, use_container_width=True, key=f"plot_{view}", on_select="rerun", selection_mode="box")
+                        apply_zoom(event, view)
                         get_plot_download_link(fig, filename=f"plot_{i + 1}.html")
     else: #special graphs
 
@@ -1,4 +1,4 @@
-from analysis.common.parser_registry import ParserRegistry
+from analysis.common import profiling
 import argparse
 import sys
 import os
@@ -30,60 +30,81 @@ DDDDDDDDDDDDDDDDDDDDDDDDDDDDDD
 """
 
 
-def main():#runs in the command line
+def tool_manifest():
+    """
+    Map every sub-command to the module that implements it, e.g. 'transform' ->
+    'analysis.tools.daq_transform', from the file names alone: nothing is imported,
+    so startup doesn't pay for tools that won't run.
+    """
     # Path to the 'daq' directory
-    daq_dir = os.path.join(os.path.dirname(__file__), TOOLS_FOLDER)#so this joins the root path to the daq directory t get full path
+    daq_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), TOOLS_FOLDER)#so this joins the root path to the daq directory t get full path
 
-    # Collect all daq_*.py files
-    tool_files = []#init
+    manifest = {}
     # walk recursively through the daq directory to find all the tools
     # tools are python files that start with daq_
     for root, _, files in os.walk(daq_dir):#returns all the files in this folder
-        for file in files:
+        for file in sorted(files):
             if file.startswith("daq_") and file.endswith(".py"):#all files starting with daq_ and ending with .py
                 # get the full path to the file relative to the location of this file
                 tool_path = os.path.relpath(os.path.join(root, file), daq_dir)
-                tool_path = TOOLS_FOLDER + os.path.sep + tool_path#path to this file relative to daq
-                tool_files.append(tool_path)#path to the files in the daq directory
+                tool_name = (TOOLS_FOLDER + os.path.sep + tool_path)[:-3]  # remove .py #analysis/tools/daq_transform
 
-    print(DAQ_ASCII_LOGO)
-    print("DAQ - NFR25 Analysis Tool")#descriptive
+                # Convert 'daq_foo.py' → subcommand name 'foo'
+                # If the tool is in a subdirectory (e.g., daq/utils/daq_bar.py), we only want the final part ('bar') as the subcommand name
+                subcommand_name = os.path.basename(tool_name).replace("daq_", "", 1)
 
-    parser = argparse.ArgumentParser(description="Dispatcher for daq_ sub-tools.")
-    subparsers = parser.add_subparsers(dest="tool", help="Sub-commands")#assigns the args to the cli to the word tool
+                # Build module path: analysis.tools.daq_transform
+                manifest[subcommand_name] = tool_name.replace("/", ".").replace("\\", ".")
+    return dict(sorted(manifest.items()))
 
-    # Keep track of modules
-    modules = {}
 
-    # Dynamically import each sub-tool and let it register its subparser
-    for tool_file in tool_files:#lop through the subpaths
-        tool_name = tool_file[:-3]  # remove .py #daq_transform.py
-        # Convert 'daq_foo.py' → subcommand name 'foo'
-        subcommand_name = tool_name.replace("daq_", "")#remove the daq_
+def add_global_options(parser):
+    parser.add_argument(
+        "--profile", metavar="FILE", default=None,
+        help="Run the sub-command under cProfile and save the profile to FILE (pstats; .folded/.collapsed/.txt for collapsed stacks)",
+    )
+    parser.add_argument(
+        "--timings", action="store_true", help="Print the wall/CPU time, bytes and records of every stage when the sub-command ends"
+    )
+    parser.add_argument(
+        "--import-times", action="store_true", help="Run the sub-command under `python -X importtime` and summarise where startup time goes"
+    )
 
-        # also take only the name of the tool, not the path/to/the/tool
-        ## If the tool is in a subdirectory (e.g., daq/utils/daq_bar.py), we only want the final part ('bar') as the subcommand name
-        subcommand_name = subcommand_name.split(os.path.sep)[-1]#bar
 
-        # Build module path:toolname: analysis/common/daq_transform
-        module_path = tool_name.replace("/", ".")#analysis.common.daq_transform
-        module_path = module_path.replace("\\", ".")
-        print(f"Importing module: {module_path}")#so this helps you load the files by converting the paths to modules
+def main():#runs in the command line
+    manifest = tool_manifest()
 
-        # Import the modules
-        module = importlib.import_module(module_path)
+    # Find the sub-command before building the full parser, so only its module is imported
+    pre = argparse.ArgumentParser(add_help=False)
+    add_global_options(pre)
+    pre.add_argument("tool", nargs="?")
+    known, _ = pre.parse_known_args()
 
-        # We expect each module to define a function `register_subparser`
-        # to let the module configure the argparse options it needs.
+    if known.import_times:
+        argv = [a for a in sys.argv[1:] if a != "--import-times"]
+        sys.exit(profiling.import_time_report(os.path.abspath(__file__), argv))
+
+    print(DAQ_ASCII_LOGO)
+    print("DAQ - NFR25 Analysis Tool")#descriptive
+
+    parser = argparse.ArgumentParser(description="Dispatcher for daq_ sub-tools.")
+    add_global_options(parser)
+    subparsers = parser.add_subparsers(dest="tool", help="Sub-commands")#assigns the args to the cli to the word tool
+
+    tool_module = None
+    for subcommand_name, module_path in manifest.items():
         subparser = subparsers.add_parser(subcommand_name)#each funciton gets its own parser for its args
+        if subcommand_name != known.tool:
+            continue
 
+        # Import only the selected module
+        tool_module = importlib.import_module(module_path)
 
-        # The module can define how it wants to configure the parser
+        # We expect each module to define a function `register_subparser`
+        # to let the module configure the argparse options it needs.
         # e.g. add arguments, etc.
-        if hasattr(module, "register_subparser"):
-            module.register_subparser(subparser)#each module gets its own subparser with its own args 
-
-        modules[subcommand_name] = module#add that module with the "key" and value is the module itself
+        if hasattr(tool_module, "register_subparser"):
+            tool_module.register_subparser(subparser)#each module gets its own subparser with its own args
 
     args = parser.parse_args()#get the user input into cli terminal
 
@@ -96,19 +117,27 @@ def main():#runs in the command line
 
     # Dispatch to the appropriate module’s `main` function
     # We expect each sub-tool to define a `main(args)` function
-    tool_module = modules[args.tool]#get the module associated with that command
-    if hasattr(tool_module, "main"):
-        tool_module.main(args)#run that module with the given args. sicne we created a subparser for each module with the args it expects, you can pass in the user input
-    else:
+    if not hasattr(tool_module, "main"):
         print(f"Error: The tool {args.tool} has no main() function.")
         sys.exit(1)
 
+    run = lambda: tool_module.main(args)#run that module with the given args. sicne we created a subparser for each module with the args it expects, you can pass in the user input
+    try:
+        if args.profile:
+            profiling.run_profiled(run, args.profile)#profile is saved even if the tool exits early
+        else:
+            run()
+    finally:
+        if args.timings:
+            print("\nStage timings:")
+            print(profiling.summary())
+
 
 if __name__ == "__main__":
     main()
 
     #tldr: 
     #this function handles all the cli prompts.
-    # it goes through all the 'tools' which i guess could be our plot functions, assigns parsers to each (to parse the cli prompts) then stores the file as a module with that parser. 
-    # All modules are stroed in a dictionary so the cli call is the key and the module is the value. 
-    # Now we can just pass in the cli prompts, get respective module and call it with the user args given.
+    # it finds all the 'tools' (analysis/tools/daq_*.py) by file name and gives each a sub-command.
+    # Only the module of the sub-command that was asked for is imported and registers its args,
+    # then we pass in the cli prompts and call its main with the user args given.